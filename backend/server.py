@@ -1,23 +1,43 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, BackgroundTasks, HTTPException, Depends, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.routing import APIRoute
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
+from starlette.datastructures import MutableHeaders
 from starlette.middleware.cors import CORSMiddleware
+from bson import json_util
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, DeleteMany, IndexModel, ReplaceOne, ReturnDocument, UpdateOne, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pydantic import ValidationError
 import os
 import asyncio
+import base64
+import binascii
+import contextvars
+import csv
+import io
+import functools
+import hashlib
+import hmac
+import json
 import logging
+import threading
+import time
+import unicodedata
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from enum import Enum
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import uuid
 from datetime import datetime, date, timedelta
-import jwt
-import bcrypt
-from bson import ObjectId
+# bcrypt et jwt (qui charge cryptography) sont importés à la première utilisation :
+# ils pèsent lourd au démarrage à froid et /health ou les preflight CORS n'en ont pas besoin.
 
 
 ROOT_DIR = Path(__file__).parent
@@ -32,6 +52,19 @@ JWT_SECRET = (
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
 
+# Cache mémoire des utilisateurs authentifiés (évite un find_one par requête)
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', '60'))
+USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', '512'))
+
+# Mode "claims autoportés" : le token embarque tout ce dont get_current_user a besoin
+# (rôle, noms, must_change_password), ce qui évite toute lecture Mongo par requête.
+# La révocation repose sur un compteur token_version par utilisateur, vérifié paresseusement.
+JWT_SELF_CONTAINED_CLAIMS = os.environ.get('JWT_SELF_CONTAINED_CLAIMS', 'false').lower() in ('1', 'true', 'yes')
+TOKEN_VERSION_CHECK_SECONDS = float(os.environ.get('TOKEN_VERSION_CHECK_SECONDS', '30'))
+
+# Nombre maximum de hachages bcrypt exécutés en parallèle (hors boucle asyncio)
+PASSWORD_HASH_MAX_WORKERS = max(1, int(os.environ.get('PASSWORD_HASH_MAX_WORKERS', '2')))
+
 ENVIRONMENT = os.environ.get('ENVIRONMENT', 'production')
 ADMIN_RESET_TOKEN = os.environ.get('ADMIN_RESET_TOKEN')  # à définir dans Vercel (backend)
 FRONTEND_URL = os.environ.get('FRONTEND_URL', 'https://basketball-manager-msoh.vercel.app')
@@ -40,11 +73,176 @@ FRONTEND_URL = os.environ.get('FRONTEND_URL', 'https://basketball-manager-msoh.v
 mongo_url = os.environ['MONGO_URL']
 DB_NAME = os.environ['DB_NAME']
 
+# Réglages du pool de connexions Mongo
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '10'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '2'))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '60000'))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '10000'))
+
+# Ajoute l'en-tête Server-Timing (auth / mongo / app / serialize) aux réponses
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Nombre de commandes Mongo par requête au-delà duquel on journalise un avertissement (N+1...)
+MONGO_QUERY_BUDGET = int(os.environ.get('MONGO_QUERY_BUDGET', '25'))
+# Ajoute l'en-tête X-Mongo-Query-Count aux réponses
+MONGO_QUERY_DEBUG_HEADER = os.environ.get('MONGO_QUERY_DEBUG_HEADER', 'true').lower() in ('1', 'true', 'yes')
+
+# Photos (GridFS) : URL publique du backend utilisée pour construire les liens d'images
+# (sinon déduite des en-têtes X-Forwarded-* de la requête), et taille maximale acceptée.
+PUBLIC_BACKEND_URL = os.environ.get('PUBLIC_BACKEND_URL', '').rstrip('/')
+MEDIA_MAX_BYTES = int(os.environ.get('MEDIA_MAX_BYTES', str(10 * 1024 * 1024)))
+
 # --- Shared Mongo client (serverless-safe, reused across warm invocations) ---
 # On garde une seule connexion ouverte tant que l'instance serverless reste "chaude",
 # au lieu d'en recréer une nouvelle (coûteuse en latence) à chaque requête.
 # On la recrée uniquement si elle n'existe pas encore ou si la boucle asyncio a changé
 # (ce qui peut arriver entre deux invocations serverless froides).
+class PoolCheckoutListener(monitoring.ConnectionPoolListener):
+    """Mesure le temps d'attente pour obtenir une connexion du pool.
+
+    pymongo émet "check out started" puis "checked out" dans le même thread,
+    on mémorise donc le début dans un stockage local au thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.failures = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.open_connections = 0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        if started is None:
+            return
+        waited = time.perf_counter() - started
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        with self._lock:
+            self.failures += 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_pool_size": MONGO_MAX_POOL_SIZE,
+                "min_pool_size": MONGO_MIN_POOL_SIZE,
+                "open_connections": self.open_connections,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.failures,
+                "average_checkout_wait_ms": round(self.total_wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0,
+                "max_checkout_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            }
+
+pool_listener = PoolCheckoutListener()
+
+# --- Mesures par requête (Server-Timing + histogrammes par route) ---
+class RequestMetrics:
+    """Temps passés par une requête HTTP, répartis entre auth, Mongo, calcul Python et sérialisation."""
+
+    def __init__(self, method: str):
+        self.method = method
+        self.route = None  # modèle de route (ex. "/api/players/{player_id}"), renseigné par TimedRoute
+        self.started = time.perf_counter()
+        self.auth_seconds = 0.0
+        self.mongo_seconds = 0.0
+        self.mongo_auth_seconds = 0.0  # part des requêtes Mongo faites pendant l'auth
+        self.mongo_commands = 0
+        self.mongo_by_command = {}  # nom de commande (find, aggregate...) -> [nombre, durée]
+        self.endpoint_seconds = 0.0
+        self.endpoint_finished = None
+        self.phases = None
+        self._lock = threading.Lock()  # les événements Mongo arrivent depuis les threads de Motor
+
+    def count_mongo_command(self, command_name: str):
+        with self._lock:
+            self.mongo_commands += 1
+            self.mongo_by_command.setdefault(command_name, [0, 0.0])[0] += 1
+
+    def add_mongo(self, command_name: str, seconds: float):
+        with self._lock:
+            self.mongo_seconds += seconds
+            self.mongo_by_command.setdefault(command_name, [0, 0.0])[1] += seconds
+
+    def finish(self) -> dict:
+        """Fige la répartition au moment où la réponse commence à partir."""
+        if self.phases is None:
+            now = time.perf_counter()
+            mongo = max(0.0, self.mongo_seconds - self.mongo_auth_seconds)
+            self.phases = {
+                "auth": self.auth_seconds,
+                "mongo": mongo,
+                "app": max(0.0, self.endpoint_seconds - mongo),
+                "serialize": now - self.endpoint_finished if self.endpoint_finished else 0.0,
+                "total": now - self.started,
+            }
+        return self.phases
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.finish().items())
+
+_request_metrics = contextvars.ContextVar("request_metrics", default=None)
+
+class MongoCommandTimingListener(monitoring.CommandListener):
+    """Impute chaque commande Mongo et sa durée à la requête HTTP en cours.
+
+    Motor exécute pymongo dans ses threads en propageant le contexte (contextvars),
+    donc _request_metrics est lisible ici."""
+
+    def __init__(self):
+        self.unattributed = 0  # commandes hors requête HTTP (démarrage, tâches de fond)
+
+    def started(self, event):
+        metrics = _request_metrics.get()
+        if metrics is None:
+            self.unattributed += 1
+        else:
+            metrics.count_mongo_command(event.command_name)
+
+    def succeeded(self, event):
+        metrics = _request_metrics.get()
+        if metrics is not None:
+            metrics.add_mongo(event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        self.succeeded(event)
+
+command_listener = MongoCommandTimingListener()
+
 _mongo_client = None
 _mongo_client_loop = None
 
@@ -52,16 +250,35 @@ def _get_mongo_client():
     global _mongo_client, _mongo_client_loop
     current_loop = asyncio.get_event_loop()
     if _mongo_client is None or _mongo_client_loop is not current_loop:
+        # L'ancien client est lié à une boucle qui n'existe plus : on le ferme
+        # pour libérer ses sockets au lieu de le laisser fuir.
+        if _mongo_client is not None:
+            _mongo_client.close()
         _mongo_client = AsyncIOMotorClient(
             mongo_url,
-            maxPoolSize=10,
-            minPoolSize=0,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
             serverSelectionTimeoutMS=8000,
             connectTimeoutMS=8000,
+            event_listeners=[pool_listener, command_listener],
         )
         _mongo_client_loop = current_loop
     return _mongo_client
 
+async def warm_mongo_pool():
+    """Ouvre dès le démarrage les MONGO_MIN_POOL_SIZE connexions (TCP + TLS + auth),
+    pour que les premières requêtes n'aient pas à payer la poignée de main."""
+    if MONGO_MIN_POOL_SIZE <= 0:
+        return
+    database = _get_mongo_client()[DB_NAME]
+    started = time.perf_counter()
+    # Des pings simultanés obligent le pool à ouvrir une connexion chacun
+    await asyncio.gather(*[database.command("ping") for _ in range(MONGO_MIN_POOL_SIZE)])
+    logger.info("Pool Mongo préchauffé (%d connexions) en %.0f ms",
+                MONGO_MIN_POOL_SIZE, (time.perf_counter() - started) * 1000)
+
 # DB ping helper for health endpoint
 async def db_ping():
     try:
@@ -80,8 +297,217 @@ async def get_database():
     client_local = _get_mongo_client()
     yield client_local[DB_NAME]
 
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class RouteLatencyMetrics:
+    """Histogrammes de latence par (méthode, route), exposés au format texte Prometheus."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._routes = {}  # (method, route) -> {"buckets": [...], "sum", "count", "phases", "statuses"}
+
+    def observe(self, metrics: RequestMetrics, status: int):
+        phases = metrics.finish()
+        key = (metrics.method, metrics.route or "unmatched")
+        entry = self._routes.get(key)
+        if entry is None:
+            entry = self._routes[key] = {
+                "buckets": [0] * len(self.buckets),
+                "sum": 0.0,
+                "count": 0,
+                "phases": {name: 0.0 for name in phases if name != "total"},
+                "statuses": {},
+                "mongo_commands": 0,
+                "over_budget": 0,
+            }
+        total = phases["total"]
+        for i, bound in enumerate(self.buckets):
+            if total <= bound:
+                entry["buckets"][i] += 1
+        entry["sum"] += total
+        entry["count"] += 1
+        for name in entry["phases"]:
+            entry["phases"][name] += phases[name]
+        entry["statuses"][status] = entry["statuses"].get(status, 0) + 1
+        entry["mongo_commands"] += metrics.mongo_commands
+        if metrics.mongo_commands > MONGO_QUERY_BUDGET:
+            entry["over_budget"] += 1
+
+    def render_prometheus(self) -> List[str]:
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), entry in sorted(self._routes.items()):
+            labels = f'method="{method}",route="{route}"'
+            for bound, count in zip(self.buckets, entry["buckets"]):
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {entry["count"]}')
+            lines.append(f'http_request_duration_seconds_sum{{{labels}}} {entry["sum"]:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{{labels}}} {entry["count"]}')
+        lines += [
+            "# HELP http_request_phase_seconds_total Time spent per request phase (auth, mongo, app, serialize).",
+            "# TYPE http_request_phase_seconds_total counter",
+        ]
+        for (method, route), entry in sorted(self._routes.items()):
+            for phase, seconds in entry["phases"].items():
+                lines.append(f'http_request_phase_seconds_total{{method="{method}",route="{route}",phase="{phase}"}} {seconds:.6f}')
+        lines += [
+            "# HELP http_requests_total Requests by route and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route), entry in sorted(self._routes.items()):
+            for status, count in sorted(entry["statuses"].items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+        lines += [
+            "# HELP mongo_commands_total Mongo commands issued, by route.",
+            "# TYPE mongo_commands_total counter",
+        ]
+        for (method, route), entry in sorted(self._routes.items()):
+            lines.append(f'mongo_commands_total{{method="{method}",route="{route}"}} {entry["mongo_commands"]}')
+        lines += [
+            "# HELP mongo_query_budget_exceeded_total Requests that exceeded MONGO_QUERY_BUDGET, by route.",
+            "# TYPE mongo_query_budget_exceeded_total counter",
+        ]
+        for (method, route), entry in sorted(self._routes.items()):
+            lines.append(f'mongo_query_budget_exceeded_total{{method="{method}",route="{route}"}} {entry["over_budget"]}')
+        return lines
+
+route_metrics = RouteLatencyMetrics()
+
+def _timed_endpoint(endpoint, path: str):
+    """Enveloppe un endpoint pour mesurer son temps propre (le reste = dépendances + sérialisation)."""
+    if getattr(endpoint, "_timed", False):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        metrics = _request_metrics.get()
+        if metrics is None:
+            return await endpoint(*args, **kwargs)
+        metrics.route = path
+        started = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            metrics.endpoint_finished = time.perf_counter()
+            metrics.endpoint_seconds += metrics.endpoint_finished - started
+
+    wrapper._timed = True
+    wrapper._route_path = path
+    return wrapper
+
+class TimedRoute(APIRoute):
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint, path), **kwargs)
+
+class ServerTimingMiddleware:
+    """Middleware ASGI : mesure chaque requête, ajoute l'en-tête Server-Timing
+    et alimente les histogrammes par route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics(scope["method"])
+        token = _request_metrics.set(metrics)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                if SERVER_TIMING_ENABLED:
+                    headers.append("Server-Timing", metrics.server_timing())
+                if MONGO_QUERY_DEBUG_HEADER:
+                    headers.append("X-Mongo-Query-Count", str(metrics.mongo_commands))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_metrics.reset(token)
+            if metrics.route is None:
+                # Endpoint jamais atteint (ex. 401 dans une dépendance) : le routeur
+                # a tout de même renseigné scope["endpoint"]
+                metrics.route = getattr(scope.get("endpoint"), "_route_path", None)
+            route_metrics.observe(metrics, status)
+            if metrics.mongo_commands > MONGO_QUERY_BUDGET:
+                breakdown = ", ".join(
+                    f"{name}={count}" for name, (count, _) in
+                    sorted(metrics.mongo_by_command.items(), key=lambda item: -item[1][0])
+                )
+                logger.warning(
+                    "%s %s : %d commandes Mongo (budget %d) en %.0f ms [%s]",
+                    metrics.method, metrics.route or scope.get("path"), metrics.mongo_commands,
+                    MONGO_QUERY_BUDGET, metrics.mongo_seconds * 1000, breakdown
+                )
+
 # Create the main app without a prefix
+class LazyAPIRouter(APIRouter):
+    """Routeur dont les routes ne sont construites qu'au premier appel de leur domaine.
+
+    Construire une APIRoute (analyse des dépendances, champs des modèles de réponse) est
+    l'essentiel du temps d'import de server.py après FastAPI lui-même. Les décorateurs
+    enregistrent seulement les routes, regroupées par domaine (premier segment après le
+    préfixe : players, evaluations, reports...) ; LazyRoutesMiddleware ajoute à l'application
+    les routes du domaine appelé juste avant le routage. Un démarrage à froid ne construit
+    donc que les routes de la requête qui l'a déclenché, et chaque route une seule fois
+    (include_router les reconstruisait toutes une seconde fois).
+    """
+
+    def __init__(self, target: APIRouter, **kwargs):
+        super().__init__(**kwargs)
+        self.target = target
+        self.pending = OrderedDict()  # domaine -> [(chemin, endpoint, options)]
+
+    def add_api_route(self, path: str, endpoint, **kwargs):
+        self.pending.setdefault(path.lstrip("/").split("/", 1)[0], []).append((path, endpoint, kwargs))
+
+    def include_domain(self, domain: str):
+        # Synchrone (aucun await) : deux requêtes concurrentes ne peuvent pas construire le même domaine
+        for path, endpoint, kwargs in self.pending.pop(domain, []):
+            self.target.add_api_route(self.prefix + path, endpoint, **kwargs)
+
+    def include_request_domain(self, path: str):
+        if self.pending and path.startswith(self.prefix + "/"):
+            self.include_domain(path[len(self.prefix) + 1:].split("/", 1)[0])
+
+    def include_all(self):
+        for domain in list(self.pending):
+            self.include_domain(domain)
+
+class LazyRoutesMiddleware:
+    def __init__(self, app, router: LazyAPIRouter):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            self.router.include_request_domain(scope["path"])
+        await self.app(scope, receive, send)
+
 app = FastAPI()
+app.router.route_class = TimedRoute
+
+# Create a router with the /api prefix (routes construites par domaine au premier appel)
+api_router = LazyAPIRouter(app.router, prefix="/api")
+# Ajouté en premier = le plus interne : Server-Timing compte la construction des routes
+app.add_middleware(LazyRoutesMiddleware, router=api_router)
+
+_build_openapi = app.openapi
+
+def openapi_with_all_routes():
+    # Le schéma (/docs, /openapi.json) décrit toutes les routes, pas seulement celles déjà appelées
+    api_router.include_all()
+    return _build_openapi()
+
+app.openapi = openapi_with_all_routes
 
 # --- CORS (vercel + local) ---
 from starlette.middleware.cors import CORSMiddleware
@@ -109,8 +535,9 @@ app.add_middleware(
 from starlette.middleware.gzip import GZipMiddleware
 app.add_middleware(GZipMiddleware, minimum_size=500)
 
-# Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+# Ajouté en dernier = le plus externe : mesure aussi la compression
+app.add_middleware(ServerTimingMiddleware)
+
 
 # Lightweight health endpoint for debugging
 @app.get("/api/health")
@@ -141,6 +568,7 @@ class User(BaseModel):
     must_change_password: bool = False  # Force password change on first login
     created_at: datetime = Field(default_factory=datetime.utcnow)
     last_login: Optional[datetime] = None
+    token_version: int = 0  # Incrémenté à chaque changement de mot de passe (révoque les anciens tokens)
 
 class UserCreate(BaseModel):
     email: str
@@ -189,7 +617,7 @@ class Player(BaseModel):
     position: str
     team: Optional[TeamType] = None
     coach_referent: Optional[str] = None
-    photo: Optional[str] = None  # Base64 encoded photo
+    photo: Optional[str] = None  # URL signée de la photo (stockée dans GridFS)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     # Fiche joueur - projet individuel
     objectives: Optional[str] = None  # Objectifs du joueur
@@ -232,6 +660,7 @@ class Session(BaseModel):
     content_details: str  # Detailed content from coaches
     notes: Optional[str] = None
     exercise_ids: Optional[List[str]] = Field(default_factory=list)  # Exercices de la bibliothèque liés à la séance
+    trainer_ids: List[str] = Field(default_factory=list)  # Coachs reconnus parmi `trainers` (calculé côté serveur)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class SessionCreate(BaseModel):
@@ -265,7 +694,9 @@ class Coach(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     first_name: str
     last_name: str
-    photo: Optional[str] = None  # Base64 encoded photo
+    full_name: Optional[str] = None  # "Prénom Nom", calculé à l'écriture
+    slug: Optional[str] = None  # nom complet normalisé (minuscules, sans accents), indexé
+    photo: Optional[str] = None  # URL signée de la photo (stockée dans GridFS)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class CoachCreate(BaseModel):
@@ -329,6 +760,9 @@ class EvaluationCreate(BaseModel):
     evaluation_date: Optional[datetime] = None
     evaluation_type: Optional[str] = "initial"
 
+class EvaluationBatchCreate(BaseModel):
+    evaluations: List[EvaluationCreate]
+
 class EvaluationUpdate(BaseModel):
     themes: Optional[List[EvaluationTheme]] = None
     notes: Optional[str] = None
@@ -403,7 +837,7 @@ class Exercise(BaseModel):
     key_instructions: Optional[str] = None  # Consignes clés
     notes: Optional[str] = None
     variants: Optional[str] = None
-    diagram: Optional[str] = None  # Schéma, encodé en base64
+    diagram: Optional[str] = None  # URL signée du schéma (stocké dans GridFS)
     video_url: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -513,21 +947,86 @@ class MatchParticipationBatchRequest(BaseModel):
 
 # Authentication functions
 def hash_password(password: str) -> str:
+    import bcrypt
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
 def verify_password(password: str, hashed_password: str) -> bool:
+    import bcrypt
     return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
 
+# bcrypt prend ~200 ms par appel : exécuté directement dans un handler async, il
+# bloque toute la boucle uvicorn. On le délègue à un pool de threads dédié et borné
+# (bcrypt relâche le GIL), ce qui laisse les autres requêtes avancer pendant les
+# vagues de connexions.
+_password_executor = None
+_password_stats = {
+    "in_flight": 0,  # tâches soumises et pas encore terminées
+    "peak_queue_depth": 0,
+    "completed": 0,
+    "total_wait_seconds": 0.0,
+}
+
+def _get_password_executor() -> ThreadPoolExecutor:
+    global _password_executor
+    if _password_executor is None:
+        _password_executor = ThreadPoolExecutor(
+            max_workers=PASSWORD_HASH_MAX_WORKERS,
+            thread_name_prefix="bcrypt",
+        )
+    return _password_executor
+
+def password_queue_depth() -> int:
+    """Nombre de hachages en attente d'un thread libre."""
+    return max(0, _password_stats["in_flight"] - PASSWORD_HASH_MAX_WORKERS)
+
+async def _run_password_task(func, *args):
+    loop = asyncio.get_running_loop()
+    _password_stats["in_flight"] += 1
+    _password_stats["peak_queue_depth"] = max(_password_stats["peak_queue_depth"], password_queue_depth())
+    started = time.perf_counter()
+    try:
+        return await loop.run_in_executor(_get_password_executor(), func, *args)
+    finally:
+        _password_stats["in_flight"] -= 1
+        _password_stats["completed"] += 1
+        _password_stats["total_wait_seconds"] += time.perf_counter() - started
+
+async def hash_password_async(password: str) -> str:
+    return await _run_password_task(hash_password, password)
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    return await _run_password_task(verify_password, password, hashed_password)
+
+def password_hashing_stats() -> dict:
+    completed = _password_stats["completed"]
+    return {
+        "max_workers": PASSWORD_HASH_MAX_WORKERS,
+        "in_flight": _password_stats["in_flight"],
+        "queue_depth": password_queue_depth(),
+        "peak_queue_depth": _password_stats["peak_queue_depth"],
+        "completed": completed,
+        "average_seconds": round(_password_stats["total_wait_seconds"] / completed, 4) if completed else 0,
+    }
+
 def create_token(user_data: dict) -> str:
     payload = {
         'user_id': user_data['id'],
         'email': user_data['email'],
         'role': user_data['role'],
+        'tv': user_data.get('token_version', 0),
         'exp': datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS)
     }
+    if JWT_SELF_CONTAINED_CLAIMS:
+        payload.update({
+            'first_name': user_data['first_name'],
+            'last_name': user_data['last_name'],
+            'must_change_password': user_data.get('must_change_password', False),
+        })
+    import jwt
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 def decode_token(token: str) -> dict:
+    import jwt
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         return payload
@@ -536,17 +1035,145 @@ def decode_token(token: str) -> dict:
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+class UserCache:
+    """Cache LRU + TTL des utilisateurs authentifiés, clé = (user_id, hash du token).
+
+    Propre à chaque instance : toute écriture sur un utilisateur doit appeler
+    invalidate() pour que la modification soit visible immédiatement."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (user_id, token_hash) -> (expires_at, User)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def token_hash(token: str) -> str:
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get(self, user_id: str, token_hash: str) -> Optional["User"]:
+        key = (user_id, token_hash)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, user_id: str, token_hash: str, user: "User"):
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        key = (user_id, token_hash)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, user)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[str]):
+        if not user_id:
+            return
+        for key in [k for k in self._entries if k[0] == user_id]:
+            del self._entries[key]
+        self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0,
+        }
+
+user_cache = UserCache(USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_ENTRIES)
+
+# Dernière token_version connue par utilisateur : user_id -> (vérifiée_à, version ou None si supprimé).
+# Relue dans Mongo au plus une fois toutes les TOKEN_VERSION_CHECK_SECONDS par utilisateur.
+_token_versions = {}
+_token_version_stats = {"checks": 0, "revoked": 0}
+
+async def _current_token_version(database, user_id: str) -> Optional[int]:
+    cached = _token_versions.get(user_id)
+    now = time.monotonic()
+    if cached is not None and now - cached[0] < TOKEN_VERSION_CHECK_SECONDS:
+        return cached[1]
+    _token_version_stats["checks"] += 1
+    user = await database.users.find_one({"id": user_id}, {"_id": 0, "token_version": 1})
+    version = user.get("token_version", 0) if user else None
+    _token_versions[user_id] = (now, version)
+    return version
+
+def _user_from_claims(payload: dict) -> "User":
+    return User(
+        id=payload["user_id"],
+        email=payload["email"],
+        password_hash="",  # jamais dans le token : relu en base quand il est nécessaire
+        role=payload["role"],
+        first_name=payload["first_name"],
+        last_name=payload["last_name"],
+        must_change_password=payload.get("must_change_password", False),
+        token_version=payload.get("tv", 0),
+    )
+
+def invalidate_user_auth(user_id: Optional[str]):
+    """À appeler après toute écriture sur un utilisateur (mot de passe, suppression...)."""
+    user_cache.invalidate(user_id)
+    _token_versions.pop(user_id, None)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    metrics = _request_metrics.get()
+    if metrics is None:
+        return await _authenticate(credentials)
+    started = time.perf_counter()
+    mongo_before = metrics.mongo_seconds
+    try:
+        return await _authenticate(credentials)
+    finally:
+        metrics.auth_seconds += time.perf_counter() - started
+        metrics.mongo_auth_seconds += metrics.mongo_seconds - mongo_before
+
+async def _authenticate(credentials: Optional[HTTPAuthorizationCredentials]) -> "User":
     if not credentials or not credentials.scheme or not credentials.credentials:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    database = _get_mongo_client()[DB_NAME]
     try:
         payload = decode_token(credentials.credentials)
-        user = await database.users.find_one({"id": payload["user_id"]})
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        return User(**user)
+        token_version = payload.get("tv", 0)
+        database = _get_mongo_client()[DB_NAME]
+
+        # Token autoporté : aucune lecture Mongo hors vérification périodique de la version
+        if JWT_SELF_CONTAINED_CLAIMS and "first_name" in payload:
+            current_version = await _current_token_version(database, payload["user_id"])
+            if current_version is None:
+                raise HTTPException(status_code=401, detail="User not found")
+            if current_version != token_version:
+                _token_version_stats["revoked"] += 1
+                raise HTTPException(status_code=401, detail="Token revoked")
+            return _user_from_claims(payload)
+
+        token_hash = UserCache.token_hash(credentials.credentials)
+        user_obj = user_cache.get(payload["user_id"], token_hash)
+        if user_obj is None:
+            user = await database.users.find_one({"id": payload["user_id"]})
+            if not user:
+                raise HTTPException(status_code=401, detail="User not found")
+            user_obj = User(**user)
+            user_cache.set(user_obj.id, token_hash, user_obj)
+        if user_obj.token_version != token_version:
+            _token_version_stats["revoked"] += 1
+            raise HTTPException(status_code=401, detail="Token revoked")
+        return user_obj
     except HTTPException:
         # Laisse passer les 401/403 proprement (CORS s'appliquera)
         raise
@@ -565,7 +1192,7 @@ async def get_admin_user(current_user: User = Depends(get_current_user)):
 async def login(login_data: UserLogin, database = Depends(get_database)):
     try:
         user = await database.users.find_one({"email": login_data.email})
-        if not user or not verify_password(login_data.password, user['password_hash']):
+        if not user or not await verify_password_async(login_data.password, user['password_hash']):
             raise HTTPException(status_code=401, detail="Invalid email or password")
 
         # Update last login
@@ -622,7 +1249,7 @@ async def dev_reset_admin(body: ResetAdminBody, request: Request, database = Dep
         if not ADMIN_RESET_TOKEN or request.headers.get("x-admin-reset") != ADMIN_RESET_TOKEN:
             raise HTTPException(status_code=403, detail="Forbidden")
 
-        pwd_hash = hash_password(body.password)
+        pwd_hash = await hash_password_async(body.password)
         now = datetime.utcnow()
         existing = await database.users.find_one({"email": body.email})
         data = {
@@ -635,7 +1262,10 @@ async def dev_reset_admin(body: ResetAdminBody, request: Request, database = Dep
             "last_login": None,
         }
         if existing:
-            await database.users.update_one({"email": body.email}, {"$set": data})
+            await database.users.update_one(
+                {"email": body.email},
+                {"$set": data, "$inc": {"token_version": 1}}
+            )
             user_id = existing.get("id")
             action = "updated"
         else:
@@ -644,6 +1274,7 @@ async def dev_reset_admin(body: ResetAdminBody, request: Request, database = Dep
             user_id = new_user["id"]
             action = "created"
 
+        invalidate_user_auth(user_id)
         logger.info("Admin %s via dev endpoint for email=%s", action, body.email)
         return {"ok": True, "action": action, "user_id": user_id}
     except HTTPException:
@@ -672,7 +1303,7 @@ async def create_user(user_data: UserCreate, current_user: User = Depends(get_cu
         raise HTTPException(status_code=400, detail="User with this email already exists")
     
     # Create new user with must_change_password = True
-    password_hash = hash_password(user_data.password)
+    password_hash = await hash_password_async(user_data.password)
     user_dict = user_data.dict()
     user_dict['password_hash'] = password_hash
     user_dict['must_change_password'] = True  # Force password change on first login
@@ -680,6 +1311,7 @@ async def create_user(user_data: UserCreate, current_user: User = Depends(get_cu
     
     user_obj = User(**user_dict)
     await database.users.insert_one(user_obj.dict())
+    invalidate_user_auth(user_obj.id)
     
     return UserResponse(
         id=user_obj.id,
@@ -710,6 +1342,7 @@ async def delete_user(user_id: str, current_user: User = Depends(get_current_use
         raise HTTPException(status_code=400, detail="Cannot delete your own account")
     
     result = await database.users.delete_one({"id": user_id})
+    invalidate_user_auth(user_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -729,52 +1362,761 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 @api_router.post("/auth/change-password")
 async def change_password(password_data: ChangePasswordRequest, current_user: User = Depends(get_current_user), database = Depends(get_database)):
-    # Verify current password
-    if not verify_password(password_data.current_password, current_user.password_hash):
+    # Verify current password (en mode claims autoportés le hash n'est pas dans le token)
+    password_hash = current_user.password_hash
+    if not password_hash:
+        stored_user = await database.users.find_one({"id": current_user.id}, {"_id": 0, "password_hash": 1})
+        password_hash = stored_user.get("password_hash", "") if stored_user else ""
+    if not password_hash or not await verify_password_async(password_data.current_password, password_hash):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
     # Hash new password
-    new_password_hash = hash_password(password_data.new_password)
+    new_password_hash = await hash_password_async(password_data.new_password)
     
-    # Update user password and remove must_change_password flag
+    # Update user password, remove must_change_password flag and revoke existing tokens
     await database.users.update_one(
         {"id": current_user.id},
-        {"$set": {
-            "password_hash": new_password_hash,
-            "must_change_password": False
-        }}
+        {
+            "$set": {
+                "password_hash": new_password_hash,
+                "must_change_password": False
+            },
+            "$inc": {"token_version": 1}
+        }
     )
+    invalidate_user_auth(current_user.id)
     
     return {"message": "Password changed successfully"}
 
+# Compteurs internes (cache, etc.) pour vérifier le comportement en production
+def _prometheus_gauges() -> List[str]:
+    cache = user_cache.stats()
+    hashing = password_hashing_stats()
+    pool = pool_listener.stats()
+    values = [
+        ("user_cache_hits_total", "counter", cache["hits"]),
+        ("user_cache_misses_total", "counter", cache["misses"]),
+        ("user_cache_entries", "gauge", cache["size"]),
+        ("password_hash_queue_depth", "gauge", hashing["queue_depth"]),
+        ("password_hash_in_flight", "gauge", hashing["in_flight"]),
+        ("password_hash_completed_total", "counter", hashing["completed"]),
+        ("mongo_pool_open_connections", "gauge", pool["open_connections"]),
+        ("mongo_pool_checkouts_total", "counter", pool["checkouts"]),
+        ("mongo_pool_checkout_failures_total", "counter", pool["checkout_failures"]),
+        ("mongo_pool_checkout_wait_seconds_max", "gauge", pool["max_checkout_wait_ms"] / 1000),
+    ]
+    lines = []
+    for name, kind, value in values:
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {value}")
+    return lines
+
+@api_router.get("/admin/metrics", response_class=PlainTextResponse)
+async def get_prometheus_metrics(current_user: User = Depends(get_admin_user)):
+    """Histogrammes de latence par route et compteurs internes, au format texte Prometheus."""
+    lines = route_metrics.render_prometheus() + _prometheus_gauges()
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+@api_router.get("/admin/stats")
+async def get_runtime_stats(current_user: User = Depends(get_admin_user)):
+    return {
+        "user_cache": user_cache.stats(),
+        "password_hashing": password_hashing_stats(),
+        "mongo_pool": pool_listener.stats(),
+        "token_versions": {
+            "self_contained_claims": JWT_SELF_CONTAINED_CLAIMS,
+            "tracked_users": len(_token_versions),
+            **_token_version_stats,
+        },
+    }
+
+# --- Photos et schémas (GridFS) ---
+# Les images ne sont plus stockées en base64 dans les documents : à l'envoi, elles sont
+# déclinées en quelques tailles fixes (WebP) rangées dans le bucket GridFS "media", sous
+# l'empreinte sha256 de l'image envoyée (un même fichier n'est traité et stocké qu'une fois).
+# Les réponses de l'API ne portent plus qu'une URL signée, que le navigateur peut charger
+# sans en-tête Authorization et mettre en cache.
+MEDIA_BUCKET = "media"
+# taille -> (côté maximal en pixels, recadrage carré)
+MEDIA_RENDITIONS = {
+    "avatar": (160, True),
+    "card": (480, False),
+    "full": (1600, False),
+}
+# champ exposé par l'API -> champ stocké (identifiant du média)
+MEDIA_FIELDS = {"photo": "photo_media_id", "diagram": "diagram_media_id"}
+
+def _media_bucket(database):
+    from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+    return AsyncIOMotorGridFSBucket(database, bucket_name=MEDIA_BUCKET)
+
+def decode_data_url(value: str):
+    """Décode une data URL (FileReader.readAsDataURL) en (octets, type MIME)."""
+    header, _, payload = value.partition(",")
+    content_type = header[len("data:"):].split(";")[0] or "application/octet-stream"
+    if not content_type.startswith("image/") or ";base64" not in header:
+        raise HTTPException(status_code=400, detail="Unsupported image format")
+    try:
+        data = base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid image data")
+    if len(data) > MEDIA_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Image too large")
+    return data, content_type
+
+def render_renditions(data: bytes) -> Optional[dict]:
+    """Décline l'image aux tailles de MEDIA_RENDITIONS, en WebP. None si Pillow n'est pas installé."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            # Les photos de téléphone sont souvent tournées via l'EXIF
+            image = ImageOps.exif_transpose(source)
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+    except (OSError, ValueError, Image.DecompressionBombError):
+        raise HTTPException(status_code=400, detail="Invalid image data")
+
+    renditions = {}
+    for size, (max_side, square) in MEDIA_RENDITIONS.items():
+        if square:
+            resized = ImageOps.fit(image, (max_side, max_side), Image.LANCZOS)
+        else:
+            resized = image.copy()
+            resized.thumbnail((max_side, max_side), Image.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, "WEBP", quality=80, method=4)
+        renditions[size] = buffer.getvalue()
+    return renditions
+
+async def _upload_media(database, file_id: str, data: bytes, content_type: str):
+    try:
+        await _media_bucket(database).upload_from_stream_with_id(
+            file_id, file_id, data, metadata={"content_type": content_type}
+        )
+    except DuplicateKeyError:
+        pass  # envoyée en parallèle par une autre requête : même contenu
+
+async def store_image(database, data: bytes, content_type: str) -> str:
+    """Enregistre les déclinaisons de l'image (si elles n'existent pas déjà) et renvoie son identifiant."""
+    media_id = hashlib.sha256(data).hexdigest()
+    existing = await database[f"{MEDIA_BUCKET}.files"].find_one(
+        {"_id": {"$in": [f"{media_id}:full", media_id]}}, {"_id": 1}
+    )
+    if existing:
+        return media_id
+    # Redimensionnement hors de la boucle d'événements (plusieurs centaines de ms pour une photo de téléphone)
+    renditions = await asyncio.get_running_loop().run_in_executor(None, render_renditions, data)
+    if renditions is None:
+        # Sans Pillow, l'image d'origine est servie pour toutes les tailles
+        await _upload_media(database, media_id, data, content_type)
+        return media_id
+    # "full" en dernier : sa présence indique que toutes les tailles sont écrites
+    for size, rendition in renditions.items():
+        await _upload_media(database, f"{media_id}:{size}", rendition, "image/webp")
+    return media_id
+
+async def read_media(database, media_id: str, size: str):
+    """Renvoie (octets, type MIME) de la taille demandée, ou de l'image d'origine à défaut ; None sinon."""
+    import gridfs
+    bucket = _media_bucket(database)
+    for file_id in (f"{media_id}:{size}", media_id):
+        try:
+            stream = await bucket.open_download_stream(file_id)
+        except gridfs.errors.NoFile:
+            continue
+        data = await stream.read()
+        return data, (stream.metadata or {}).get("content_type", "application/octet-stream")
+    return None
+
+def _media_signature(path: str, media_id: str) -> str:
+    message = f"{path}/{media_id}".encode("utf-8")
+    return hmac.new(JWT_SECRET.encode("utf-8"), message, hashlib.sha256).hexdigest()[:32]
+
+def get_public_base_url(request: Request) -> str:
+    if PUBLIC_BACKEND_URL:
+        return PUBLIC_BACKEND_URL
+    proto = request.headers.get("x-forwarded-proto", request.url.scheme).split(",")[0].strip()
+    host = request.headers.get("x-forwarded-host") or request.headers.get("host") or request.url.netloc
+    return f"{proto}://{host.split(',')[0].strip()}"
+
+def media_url(base_url: str, path: str, media_id: str, size: str) -> str:
+    # La signature ne couvre pas `size` : toutes les tailles d'une image autorisée sont accessibles
+    return f"{base_url}/api/{path}?v={media_id}&size={size}&sig={_media_signature(path, media_id)}"
+
+def with_media_urls(document: dict, kind: str, base_url: str, size: str) -> dict:
+    """Document tel que renvoyé par l'API : `photo` / `diagram` deviennent l'URL de l'image."""
+    data = {k: v for k, v in document.items() if k != "_id" and k not in MEDIA_FIELDS.values()}
+    for field, id_field in MEDIA_FIELDS.items():
+        if document.get(id_field):
+            data[field] = media_url(base_url, f"{kind}/{document['id']}/{field}", document[id_field], size)
+    return data
+
+async def resolve_media_update(database, field: str, value: Optional[str]):
+    """Traduit la valeur d'image envoyée par le frontend en champs à écrire : ($set, $unset).
+    - data URL : nouvelle image, déclinée et stockée dans GridFS
+    - chaîne vide : suppression de l'image
+    - autre valeur (l'URL renvoyée telle quelle par le formulaire) : inchangée"""
+    if value is None:
+        return {}, {}
+    if value == "":
+        return {field: None}, {MEDIA_FIELDS[field]: ""}
+    if value.startswith("data:"):
+        data, content_type = decode_data_url(value)
+        media_id = await store_image(database, data, content_type)
+        return {field: None, MEDIA_FIELDS[field]: media_id}, {}
+    return {}, {}
+
+async def serve_media(request: Request, database, path: str, v: str, size: str, sig: str) -> Response:
+    if not hmac.compare_digest(sig, _media_signature(path, v)):
+        raise HTTPException(status_code=403, detail="Invalid signature")
+    if size not in MEDIA_RENDITIONS:
+        raise HTTPException(status_code=400, detail="Unknown size")
+    headers = {
+        "ETag": f'"{v}:{size}"',
+        # Contenu adressé par son empreinte : l'URL change si l'image change
+        "Cache-Control": "private, max-age=31536000, immutable",
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    media = await read_media(database, v, size)
+    if media is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    data, content_type = media
+    return Response(content=data, media_type=content_type, headers=headers)
+
+# --- Champs partiels (?fields=) ---
+# Les listes renvoient les documents complets par défaut (les formulaires d'édition s'en
+# servent). ?fields=summary, ou une liste explicite ?fields=id,first_name,team, ne lit
+# que ces champs dans Mongo (projection) : c'est ce qu'utilisent sélecteurs et listes déroulantes.
+FIELD_PRESETS = {
+    "players": ["id", "first_name", "last_name", "position", "team", "coach_referent", "photo"],
+    "exercises": ["id", "name", "category", "positions", "duration_minutes", "diagram"],
+    "sessions": ["id", "player_ids", "session_date", "themes", "trainers"],
+    "matches": ["id", "team", "opponent", "match_date", "match_time", "location", "is_home",
+                "competition", "final_score_us", "final_score_opponent"],
+}
+# Champs des anciens formats de séance dont dépendent les champs actuels (cf. get_sessions)
+LEGACY_SOURCE_FIELDS = {
+    "sessions": {"themes": "content", "trainers": "trainer", "content_details": "results", "player_ids": "player_id"},
+}
+
+def parse_fields(collection: str, fields: Optional[str], model) -> Optional[List[str]]:
+    """Champs demandés via ?fields=, ou None pour le document complet."""
+    if not fields or fields == "full":
+        return None
+    if fields == "summary":
+        names = FIELD_PRESETS[collection]
+    else:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(model.model_fields))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(["id", *names]))
+
+def fields_projection(collection: str, names: List[str]) -> dict:
+    projection = {"_id": 0}
+    legacy = LEGACY_SOURCE_FIELDS.get(collection, {})
+    for name in names:
+        projection[name] = 1
+        if name in MEDIA_FIELDS:
+            projection[MEDIA_FIELDS[name]] = 1
+        if name in legacy:
+            projection[legacy[name]] = 1
+    return projection
+
+def sparse_response(documents: List[dict], names: List[str], headers: Optional[dict] = None) -> JSONResponse:
+    # Documents partiels : pas de validation par le modèle complet (champs requis absents)
+    return JSONResponse(jsonable_encoder([{k: doc[k] for k in names if k in doc} for doc in documents]), headers=headers)
+
+# --- Pagination par curseur (?limit=&cursor=) ---
+# Sans `limit`, les listes renvoient tout (plus de troncature silencieuse à 100 ou 1000).
+# Avec `limit`, on lit au plus limit + 1 documents triés sur (clé de tri, id) et l'en-tête
+# X-Next-Cursor porte les valeurs du dernier document renvoyé : la page suivante reprend
+# juste après lui (keyset, sans skip), en s'appuyant sur les index (clé de tri, id).
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '500'))
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def _keyset_filter(sort: list, values: list) -> dict:
+    # (a, b, id) après (va, vb, vid) : a > va, ou a = va et b > vb, ou ... (selon le sens du tri)
+    clauses = []
+    for index, (field, direction) in enumerate(sort):
+        clause = {previous: value for (previous, _), value in zip(sort[:index], values[:index])}
+        clause[field] = {"$gt" if direction == ASCENDING else "$lt": values[index]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+async def paginate(collection, query: dict, sort: list, limit: Optional[int], cursor: Optional[str], projection: Optional[dict] = None):
+    """Renvoie (documents, curseur de la page suivante ou None). `sort` se termine par l'id."""
+    if cursor:
+        query = {"$and": [query, _keyset_filter(sort, decode_cursor(cursor, len(sort)))]}
+    if projection and any(value for key, value in projection.items() if key != "_id"):
+        # Projection par inclusion : les clés de tri sont nécessaires pour construire le curseur
+        projection = {**projection, **{field: 1 for field, _ in sort}}
+    find = collection.find(query, projection).sort(sort)
+    if not limit:
+        return await find.to_list(None), None
+    documents = await find.limit(limit + 1).to_list(limit + 1)
+    if len(documents) <= limit:
+        return documents, None
+    documents = documents[:limit]
+    return documents, encode_cursor([documents[-1].get(field) for field, _ in sort])
+
+def _field_value(document: dict, path: str):
+    for part in path.split("."):
+        document = (document or {}).get(part)
+    return document
+
+async def paginate_pipeline(collection, pipeline: list, sort: list, limit: Optional[int], cursor: Optional[str]):
+    """Comme paginate, pour un pipeline d'agrégation (tri sur un champ joint par $lookup, ex. "session.session_date")."""
+    stages = list(pipeline)
+    if cursor:
+        stages.append({"$match": _keyset_filter(sort, decode_cursor(cursor, len(sort)))})
+    stages.append({"$sort": {field: direction for field, direction in sort}})
+    if limit:
+        stages.append({"$limit": limit + 1})
+    documents = await collection.aggregate(stages, allowDiskUse=True).to_list(None)
+    if not limit or len(documents) <= limit:
+        return documents, None
+    documents = documents[:limit]
+    return documents, encode_cursor([_field_value(documents[-1], field) for field, _ in sort])
+
+def page_headers(next_cursor: Optional[str]) -> dict:
+    return {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
+# --- Upsert atomique sur clé naturelle ---
+# Évaluations, présences et participations : un document par clé naturelle (joueur + type,
+# joueur + séance, joueur + match), garanti par un index unique. Un seul find_one_and_update
+# remplace l'ancien enchaînement find_one -> update_one/insert_one -> find_one.
+def upsert_update(key: dict, document: dict, update_fields, unset: Optional[dict] = None) -> dict:
+    """Opérateurs de mise à jour d'atomic_upsert (réutilisés tels quels dans un UpdateOne upsert)."""
+    update = {
+        "$set": {field: document[field] for field in update_fields},
+        "$setOnInsert": {field: value for field, value in document.items() if field not in key and field not in update_fields},
+    }
+    if unset:
+        update["$unset"] = unset
+    return update
+
+async def atomic_upsert(collection, key: dict, document: dict, update_fields, unset: Optional[dict] = None,
+                        return_document=ReturnDocument.AFTER):
+    """Crée `document` ou met à jour `update_fields` du document existant pour la clé `key`.
+
+    Les autres champs de `document` (id, created_at...) ne sont écrits qu'à la création.
+    Renvoie le document après écriture, ou avant (None s'il vient d'être créé) avec
+    return_document=ReturnDocument.BEFORE.
+    """
+    update = upsert_update(key, document, update_fields, unset)
+    for attempt in range(2):
+        try:
+            return await collection.find_one_and_update(
+                key, update, projection={"_id": 0}, upsert=True, return_document=return_document
+            )
+        except DuplicateKeyError:
+            # Deux créations simultanées : l'index unique en rejette une, qui retrouve
+            # au second essai le document inséré par l'autre et le met à jour
+            if attempt:
+                raise
+
+# --- Versions de collection et GET conditionnel ---
+# Les listes de référence changent rarement mais sont rechargées sur presque tous les écrans.
+# Chaque écriture incrémente un compteur par collection (collection_versions) ; l'ETag en
+# découle, et un If-None-Match identique renvoie 304 sans lancer la requête Mongo.
+VERSIONED_COLLECTIONS = ("players", "coaches", "exercises", "exercise_categories")
+
+async def bump_collection_version(database, *names: str):
+    """À appeler APRÈS l'écriture : un lecteur qui voit la nouvelle version voit aussi les nouvelles données."""
+    await asyncio.gather(*(
+        database.collection_versions.update_one({"_id": name}, {"$inc": {"version": 1}}, upsert=True)
+        for name in names
+    ))
+
+async def collection_etag(database, name: str, request: Request, base_url: str = "") -> str:
+    doc = await database.collection_versions.find_one({"_id": name})
+    version = doc["version"] if doc else 0
+    # La réponse dépend aussi des paramètres (fields, limit, cursor...) et de l'URL publique (liens d'images)
+    variant = hashlib.sha256(f"{base_url}?{sorted(request.query_params.multi_items())}".encode("utf-8")).hexdigest()[:16]
+    return f'"{name}-{version}-{variant}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+
+def etag_headers(etag: str) -> dict:
+    # no-cache : le navigateur garde la réponse mais la revalide à chaque fois (304 le plus souvent)
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+# --- Suppressions en cascade (tâches de fond) ---
+# Supprimer un joueur, un match ou une séance collective doit aussi nettoyer les données
+# qui y font référence. La requête supprime le document racine puis renvoie tout de suite ;
+# le nettoyage est consigné dans cascade_jobs et exécuté en tâche de fond, étape par étape.
+# Chaque étape est idempotente (delete_many / $pull) et marquée terminée une fois faite :
+# une tâche interrompue (crash, fin d'invocation) est simplement rejouée au démarrage suivant.
+CASCADE_STEPS = {
+    "player": [
+        # Séances individuelles dont il était le seul joueur (y compris l'ancien format player_id)
+        ("sessions_solo", lambda db, target: db.sessions.delete_many(
+            {"$or": [{"player_ids": [target]}, {"player_id": target, "player_ids": {"$exists": False}}]})),
+        # Séances partagées : on le retire simplement de la liste
+        ("sessions_shared", lambda db, target: db.sessions.update_many(
+            {"player_ids": target}, {"$pull": {"player_ids": target}})),
+        ("attendances", lambda db, target: db.attendances.delete_many({"player_id": target})),
+        # Avant les évaluations : retire sa contribution des moyennes poste / équipe / club
+        ("evaluation_rollups", lambda db, target: remove_player_rollup(db, target)),
+        ("evaluations", lambda db, target: db.evaluations.delete_many({"player_id": target})),
+        ("match_participations", lambda db, target: db.match_participations.delete_many({"player_id": target})),
+        ("root", lambda db, target: db.players.delete_one({"id": target})),
+    ],
+    "match": [
+        ("match_participations", lambda db, target: db.match_participations.delete_many({"match_id": target})),
+        ("root", lambda db, target: db.matches.delete_one({"id": target})),
+    ],
+    "collective_session": [
+        ("attendances", lambda db, target: db.attendances.delete_many({"collective_session_id": target})),
+        ("root", lambda db, target: db.collective_sessions.delete_one({"id": target})),
+    ],
+}
+# Au-delà, une tâche "running" est considérée abandonnée et peut être reprise
+CASCADE_LEASE_SECONDS = 120
+
+def affected_count(result) -> int:
+    for attribute in ("deleted_count", "modified_count"):
+        if hasattr(result, attribute):
+            return getattr(result, attribute)
+    return 0
+
+async def enqueue_cascade(database, kind: str, target_id: str, root, current_user: User) -> dict:
+    """Consigne la tâche, puis supprime le document racine (404 s'il n'existe pas).
+
+    La tâche est écrite AVANT la suppression : si le processus s'arrête entre les deux,
+    la reprise au démarrage termine le travail au lieu de laisser des orphelins.
+    """
+    now = datetime.utcnow()
+    job = {
+        "id": str(uuid.uuid4()),
+        "kind": kind,
+        "target_id": target_id,
+        "status": "pending",
+        "steps": [{"name": name, "done": False, "affected": 0} for name, _ in CASCADE_STEPS[kind]],
+        "created_by": current_user.id,
+        "created_at": now,
+        "updated_at": now,
+        "lease_until": None,
+    }
+    await database.cascade_jobs.insert_one(job)
+    result = await root.delete_one({"id": target_id})
+    if result.deleted_count == 0:
+        await database.cascade_jobs.delete_one({"id": job["id"]})
+        return None
+    job.pop("_id", None)
+    return job
+
+async def run_cascade_job(database, job_id: str):
+    now = datetime.utcnow()
+    # Prise de bail : une seule exécution à la fois, sauf bail expiré (instance disparue)
+    job = await database.cascade_jobs.find_one_and_update(
+        {"id": job_id, "status": {"$in": ["pending", "running"]},
+         "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]},
+        {"$set": {"status": "running", "lease_until": now + timedelta(seconds=CASCADE_LEASE_SECONDS), "updated_at": now}},
+        return_document=True,
+    )
+    if not job:
+        return False
+    steps = dict(CASCADE_STEPS[job["kind"]])
+    try:
+        for index, step in enumerate(job["steps"]):
+            if step["done"]:
+                continue
+            result = await steps[step["name"]](database, job["target_id"])
+            now = datetime.utcnow()
+            await database.cascade_jobs.update_one({"id": job_id}, {"$set": {
+                f"steps.{index}.done": True,
+                f"steps.{index}.affected": affected_count(result),
+                "lease_until": now + timedelta(seconds=CASCADE_LEASE_SECONDS),
+                "updated_at": now,
+            }})
+        await database.cascade_jobs.update_one(
+            {"id": job_id},
+            {"$set": {"status": "done", "lease_until": None, "updated_at": datetime.utcnow()}, "$unset": {"error": ""}},
+        )
+        logger.info(f"🧹 Cascade {job['kind']} {job['target_id']} terminée")
+        return True
+    except Exception as e:
+        # Le bail est libéré : la tâche sera reprise au prochain démarrage
+        logger.error(f"Erreur lors de la cascade {job['kind']} {job['target_id']}: {e}")
+        await database.cascade_jobs.update_one(
+            {"id": job_id},
+            {"$set": {"status": "pending", "lease_until": None, "error": str(e), "updated_at": datetime.utcnow()}},
+        )
+        return False
+
+async def resume_cascade_jobs(database):
+    """Relance les tâches restées en suspens (appelé au démarrage)."""
+    jobs = await database.cascade_jobs.find(
+        {"status": {"$in": ["pending", "running"]}}, {"_id": 0, "id": 1}
+    ).to_list(None)
+    resumed = 0
+    for job in jobs:
+        resumed += await run_cascade_job(database, job["id"])
+    if resumed:
+        logger.info(f"🧹 {resumed} cascade(s) reprise(s) au démarrage")
+
+def cascade_progress(job: dict) -> dict:
+    done = sum(1 for step in job["steps"] if step["done"])
+    return {
+        "id": job["id"],
+        "kind": job["kind"],
+        "target_id": job["target_id"],
+        "status": job["status"],
+        "progress": round(done / len(job["steps"]), 2),
+        "steps": job["steps"],
+        "error": job.get("error"),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+async def delete_with_cascade(kind: str, target_id: str, root, background_tasks: BackgroundTasks, database, current_user: User):
+    job = await enqueue_cascade(database, kind, target_id, root, current_user)
+    if job is None:
+        return None
+    background_tasks.add_task(run_cascade_job, database, job["id"])
+    return {"cascade_job_id": job["id"]}
+
+@api_router.get("/cascade-jobs/{job_id}")
+async def get_cascade_job(job_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+    job = await database.cascade_jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Cascade job not found")
+    return cascade_progress(job)
+
 # Player endpoints (with auth protection)
 @api_router.post("/players", response_model=Player)
-async def create_player(player_data: PlayerCreate, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+async def create_player(player_data: PlayerCreate, current_user: User = Depends(get_current_user), database = Depends(get_database), base_url: str = Depends(get_public_base_url)):
     player_dict = player_data.dict()
+    photo = player_dict.pop("photo", None)
     player_obj = Player(**player_dict)
     
     # Convert date objects to ISO format strings for MongoDB storage
     player_dict_for_db = player_obj.dict()
     if isinstance(player_dict_for_db["date_of_birth"], date):
         player_dict_for_db["date_of_birth"] = player_dict_for_db["date_of_birth"].isoformat()
+    photo_fields, _ = await resolve_media_update(database, "photo", photo)
+    player_dict_for_db.update(photo_fields)
     
     await database.players.insert_one(player_dict_for_db)
-    return player_obj
+    await bump_collection_version(database, "players")
+    return Player(**with_media_urls(player_dict_for_db, "players", base_url, "card"))
+
+# --- Import en masse ---
+# Le corps est lu en flux (CSV ou JSON Lines) et validé ligne par ligne : seul un
+# lot de PLAYER_IMPORT_CHUNK_SIZE joueurs est gardé en mémoire avant insert_many.
+PLAYER_IMPORT_CHUNK_SIZE = 500
+PLAYER_IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/json-lines": "jsonl",
+}
+
+def decode_body_line(line: bytes, first: bool):
+    try:
+        return line.decode("utf-8-sig" if first else "utf-8").rstrip("\r")
+    except UnicodeDecodeError as e:
+        return ValueError(f"Invalid UTF-8 at byte {e.start}: {e.reason}")
+
+async def iter_body_lines(request: Request):
+    """Découpe le corps de la requête en lignes au fil de la réception.
+
+    Une ligne qui n'est pas de l'UTF-8 valide est produite sous forme de ValueError.
+    """
+    buffer = b""
+    first = True
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield decode_body_line(line, first)
+            first = False
+    if buffer:
+        yield decode_body_line(buffer, first)
+
+async def iter_import_rows(request: Request, import_format: str):
+    """Produit (numéro de ligne, dict) ; les lignes vides sont ignorées.
+
+    En CSV, la première ligne donne les noms de champs et un champ entre
+    guillemets peut contenir des retours à la ligne.
+    """
+    header = None
+    pending, start = "", 0
+    line_number = 0
+    async for line in iter_body_lines(request):
+        line_number += 1
+        if isinstance(line, ValueError):
+            if import_format == "csv" and header is None:
+                # Sans noms de champs, aucune ligne suivante ne peut être lue
+                raise HTTPException(status_code=400, detail=f"Line {line_number}: {line}")
+            # Un champ entre guillemets en cours est abandonné avec la ligne illisible
+            yield (start if pending else line_number), line
+            pending = ""
+            continue
+        if import_format == "jsonl":
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, ValueError(f"Invalid JSON: {e.msg}")
+            continue
+        pending, start = (f"{pending}\n{line}", start) if pending else (line, line_number)
+        if pending.count('"') % 2:
+            continue  # guillemet ouvert : le champ continue sur la ligne suivante
+        record, pending = pending, ""
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        # Cellule vide = champ non renseigné
+        yield start, {name: value.strip() for name, value in zip(header, values) if value.strip()}
+    if pending:
+        yield start, ValueError("Unterminated quoted field")
+
+def player_identity(player: dict):
+    return (player["first_name"], player["last_name"], player["date_of_birth"])
+
+async def flush_player_import(database, batch, report):
+    """Insère un lot après avoir écarté les joueurs déjà présents en base."""
+    existing = set()
+    cursor = database.players.find(
+        {"$or": [
+            {"first_name": p["first_name"], "last_name": p["last_name"], "date_of_birth": p["date_of_birth"]}
+            for _, p in batch
+        ]},
+        {"_id": 0, "first_name": 1, "last_name": 1, "date_of_birth": 1},
+    )
+    async for player in cursor:
+        existing.add(player_identity(player))
+
+    to_insert = []
+    for line, player in batch:
+        if player_identity(player) in existing:
+            report["duplicates"].append({"line": line, "reason": "already exists"})
+        else:
+            to_insert.append((line, player))
+    if not to_insert:
+        return
+
+    try:
+        # Non ordonné : une ligne en erreur n'empêche pas l'insertion des autres
+        result = await database.players.insert_many([p for _, p in to_insert], ordered=False)
+        report["inserted"] += len(result.inserted_ids)
+    except BulkWriteError as e:
+        report["inserted"] += e.details.get("nInserted", 0)
+        for error in e.details.get("writeErrors", []):
+            report["errors"].append({"line": to_insert[error["index"]][0], "errors": [error.get("errmsg", "write error")]})
+
+@api_router.post("/players/import")
+async def import_players(request: Request, format: Optional[str] = Query(None, pattern="^(csv|jsonl)$"), current_user: User = Depends(get_current_user), database = Depends(get_database)):
+    """Crée des joueurs depuis un CSV ou un fichier JSON Lines.
+
+    Les lignes invalides et les doublons (prénom, nom, date de naissance) sont
+    signalés dans le rapport sans interrompre l'import.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    import_format = format or PLAYER_IMPORT_FORMATS.get(content_type)
+    if import_format is None:
+        raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson, or pass ?format=csv|jsonl")
+
+    report = {"inserted": 0, "duplicates": [], "errors": []}
+    seen = set()
+    batch = []
+    async for line, row in iter_import_rows(request, import_format):
+        if isinstance(row, Exception):
+            report["errors"].append({"line": line, "errors": [str(row)]})
+            continue
+        if not isinstance(row, dict):
+            report["errors"].append({"line": line, "errors": ["Expected an object"]})
+            continue
+        row.pop("photo", None)  # les photos passent par la fiche joueur
+        try:
+            player_data = PlayerCreate(**row)
+        except ValidationError as e:
+            report["errors"].append({
+                "line": line,
+                "errors": [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()],
+            })
+            continue
+
+        player = Player(**player_data.dict(exclude={"photo"})).dict()
+        player["date_of_birth"] = player["date_of_birth"].isoformat()
+        identity = player_identity(player)
+        if identity in seen:
+            report["duplicates"].append({"line": line, "reason": "duplicate in file"})
+            continue
+        seen.add(identity)
+        batch.append((line, player))
+        if len(batch) >= PLAYER_IMPORT_CHUNK_SIZE:
+            await flush_player_import(database, batch, report)
+            batch = []
+    if batch:
+        await flush_player_import(database, batch, report)
+
+    if report["inserted"]:
+        await bump_collection_version(database, "players")
+    logger.info(
+        f"📥 Import joueurs ({import_format}) : {report['inserted']} créés, "
+        f"{len(report['duplicates'])} doublons, {len(report['errors'])} erreurs"
+    )
+    return report
 
 @api_router.get("/players", response_model=List[Player])
-async def get_players(current_user: User = Depends(get_current_user), database = Depends(get_database)):
-    players = await database.players.find().to_list(1000)
-    return [Player(**{k: v for k, v in player.items() if k != "_id"}) for player in players]
+async def get_players(request: Request, response: Response, fields: Optional[str] = None, limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, current_user: User = Depends(get_current_user), database = Depends(get_database), base_url: str = Depends(get_public_base_url)):
+    etag = await collection_etag(database, "players", request, base_url)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=etag_headers(etag))
+    names = parse_fields("players", fields, Player)
+    projection = fields_projection("players", names) if names else None
+    players, next_cursor = await paginate(
+        database.players, {}, [("created_at", ASCENDING), ("id", ASCENDING)], limit, cursor, projection
+    )
+    players = [with_media_urls(player, "players", base_url, "avatar") for player in players]
+    headers = {**page_headers(next_cursor), **etag_headers(etag)}
+    if names:
+        return sparse_response(players, names, headers)
+    response.headers.update(headers)
+    return [Player(**player) for player in players]
 
 @api_router.get("/players/{player_id}", response_model=Player)
-async def get_player(player_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+async def get_player(player_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database), base_url: str = Depends(get_public_base_url)):
     player = await database.players.find_one({"id": player_id})
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
-    return Player(**{k: v for k, v in player.items() if k != "_id"})
+    return Player(**with_media_urls(player, "players", base_url, "card"))
+
+@api_router.get("/players/{player_id}/photo")
+async def get_player_photo(player_id: str, v: str, sig: str, request: Request, size: str = "card", database = Depends(get_database)):
+    # Pas d'en-tête Authorization sur une balise <img> : l'URL est signée à la place
+    return await serve_media(request, database, f"players/{player_id}/photo", v, size, sig)
 
 @api_router.put("/players/{player_id}", response_model=Player)
-async def update_player(player_id: str, player_data: PlayerUpdate, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+async def update_player(player_id: str, player_data: PlayerUpdate, current_user: User = Depends(get_current_user), database = Depends(get_database), base_url: str = Depends(get_public_base_url)):
     update_data = {k: v for k, v in player_data.dict().items() if v is not None}
     if not update_data:
         raise HTTPException(status_code=400, detail="No data to update")
@@ -782,62 +2124,176 @@ async def update_player(player_id: str, player_data: PlayerUpdate, current_user:
     # Convert date objects to ISO format strings for MongoDB storage
     if "date_of_birth" in update_data and isinstance(update_data["date_of_birth"], date):
         update_data["date_of_birth"] = update_data["date_of_birth"].isoformat()
-    
-    result = await database.players.update_one({"id": player_id}, {"$set": update_data})
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Player not found")
+    photo_fields, unset_fields = await resolve_media_update(database, "photo", update_data.pop("photo", None))
+    update_data.update(photo_fields)
+    
+    update = {"$set": update_data} if update_data else {}
+    if unset_fields:
+        update["$unset"] = unset_fields
+    if update:
+        result = await database.players.update_one({"id": player_id}, update)
+        if result.matched_count == 0:
+            raise HTTPException(status_code=404, detail="Player not found")
+        await bump_collection_version(database, "players")
     
     updated_player = await database.players.find_one({"id": player_id})
-    return Player(**{k: v for k, v in updated_player.items() if k != "_id"})
+    if not updated_player:
+        raise HTTPException(status_code=404, detail="Player not found")
+    if "position" in update_data or "team" in update_data:
+        await move_player_rollup(database, updated_player)
+    return Player(**with_media_urls(updated_player, "players", base_url, "card"))
 
 @api_router.delete("/players/{player_id}")
-async def delete_player(player_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
-    result = await database.players.delete_one({"id": player_id})
-    if result.deleted_count == 0:
+async def delete_player(player_id: str, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+    # Séances, présences, évaluations et participations sont nettoyées en tâche de fond
+    cascade = await delete_with_cascade("player", player_id, database.players, background_tasks, database, current_user)
+    if cascade is None:
         raise HTTPException(status_code=404, detail="Player not found")
-    
-    # Also delete all sessions for this player
-    await database.sessions.delete_many({"player_id": player_id})
-    return {"message": "Player deleted successfully"}
+    await bump_collection_version(database, "players")
+    return {"message": "Player deleted successfully", **cascade}
+
+# --- Identité des coachs ---
+# Les séances citent leurs entraîneurs par un nom libre ("Loan", "Léo Martin"...). Chaque coach
+# porte un slug (nom complet normalisé) et des name_keys (slugs du nom complet, du prénom et du
+# nom), indexés : un nom se résout en identifiant par simple égalité, sans $expr ni scan.
+def name_slug(text: Optional[str]) -> str:
+    ascii_text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    return "-".join("".join(c if c.isalnum() else " " for c in ascii_text.lower()).split())
+
+def coach_identity(first_name: Optional[str], last_name: Optional[str]) -> dict:
+    full_name = " ".join(part.strip() for part in (first_name, last_name) if part and part.strip())
+    keys = {name_slug(full_name), name_slug(first_name), name_slug(last_name)} - {""}
+    return {"full_name": full_name, "slug": name_slug(full_name), "name_keys": sorted(keys)}
+
+def match_coach(coaches: list, name: str) -> Optional[dict]:
+    """Coach désigné par `name` : le nom complet prime, sinon prénom ou nom s'il est sans ambiguïté."""
+    key = name_slug(name)
+    if not key:
+        return None
+    candidates = [coach for coach in coaches if coach.get("slug") == key]
+    if not candidates:
+        candidates = [coach for coach in coaches if key in coach.get("name_keys", [])]
+    return candidates[0] if len(candidates) == 1 else None
+
+def match_trainer_ids(coaches: list, trainers: Optional[List[str]]) -> List[str]:
+    trainer_ids = []
+    for trainer in trainers or []:
+        coach = match_coach(coaches, trainer)
+        if coach and coach["id"] not in trainer_ids:
+            trainer_ids.append(coach["id"])
+    return trainer_ids
+
+def trainer_keys(trainers: Optional[List[str]]) -> List[str]:
+    """Noms d'entraîneurs normalisés (name_slug), stockés dans sessions.trainer_keys."""
+    return sorted({name_slug(trainer) for trainer in trainers or []} - {""})
+
+async def resolve_trainer_ids(database, trainers: Optional[List[str]]) -> List[str]:
+    keys = trainer_keys(trainers)
+    if not keys:
+        return []
+    coaches = await database.coaches.find(
+        {"name_keys": {"$in": keys}}, {"_id": 0, "id": 1, "slug": 1, "name_keys": 1}
+    ).to_list(None)
+    return match_trainer_ids(coaches, trainers)
+
+async def link_coach_sessions(database, coach: dict):
+    """Après création ou renommage d'un coach, rattache les séances qui le citent déjà par son nom.
+
+    Les séances candidates sont trouvées par nom normalisé (trainer_keys, insensible aux accents
+    et à la casse), puis départagées en mémoire avec la liste des coachs chargée une seule fois.
+    Les rattachements existants sont conservés : une séance reste liée au coach renommé.
+    """
+    keys = coach.get("name_keys") or coach_identity(coach.get("first_name"), coach.get("last_name"))["name_keys"]
+    if not keys:
+        return
+    coaches = None
+    operations = []
+    async for session in database.sessions.find(
+        {"trainer_keys": {"$in": keys}, "trainer_ids": {"$ne": coach["id"]}}, {"_id": 0, "id": 1, "trainers": 1}
+    ):
+        if coaches is None:
+            # Tous les coachs : un prénom partagé par deux coachs reste ambigu (cf. match_coach)
+            coaches = await database.coaches.find({}, {"_id": 0, "id": 1, "slug": 1, "name_keys": 1}).to_list(None)
+        if coach["id"] in match_trainer_ids(coaches, session.get("trainers")):
+            operations.append(UpdateOne({"id": session["id"]}, {"$addToSet": {"trainer_ids": coach["id"]}}))
+        if len(operations) >= MIGRATION_BATCH_SIZE:
+            await database.sessions.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        await database.sessions.bulk_write(operations, ordered=False)
 
 # Coach endpoints (with auth protection)
 @api_router.post("/coaches", response_model=Coach)
-async def create_coach(coach_data: CoachCreate, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+async def create_coach(coach_data: CoachCreate, current_user: User = Depends(get_current_user), database = Depends(get_database), base_url: str = Depends(get_public_base_url)):
     coach_dict = coach_data.dict()
-    coach_obj = Coach(**coach_dict)
-    await database.coaches.insert_one(coach_obj.dict())
-    return coach_obj
+    photo = coach_dict.pop("photo", None)
+    coach_dict_for_db = Coach(**coach_dict).dict()
+    coach_dict_for_db.update(coach_identity(coach_dict_for_db["first_name"], coach_dict_for_db["last_name"]))
+    photo_fields, _ = await resolve_media_update(database, "photo", photo)
+    coach_dict_for_db.update(photo_fields)
+    await database.coaches.insert_one(coach_dict_for_db)
+    await bump_collection_version(database, "coaches")
+    await link_coach_sessions(database, coach_dict_for_db)
+    return Coach(**with_media_urls(coach_dict_for_db, "coaches", base_url, "card"))
 
 @api_router.get("/coaches", response_model=List[Coach])
-async def get_coaches(current_user: User = Depends(get_current_user), database = Depends(get_database)):
+async def get_coaches(request: Request, response: Response, current_user: User = Depends(get_current_user), database = Depends(get_database), base_url: str = Depends(get_public_base_url)):
+    etag = await collection_etag(database, "coaches", request, base_url)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=etag_headers(etag))
+    response.headers.update(etag_headers(etag))
     coaches = await database.coaches.find().to_list(1000)
-    return [Coach(**coach) for coach in coaches]
+    return [Coach(**with_media_urls(coach, "coaches", base_url, "avatar")) for coach in coaches]
 
 @api_router.get("/coaches/{coach_id}", response_model=Coach)
-async def get_coach(coach_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+async def get_coach(coach_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database), base_url: str = Depends(get_public_base_url)):
     coach = await database.coaches.find_one({"id": coach_id})
     if not coach:
         raise HTTPException(status_code=404, detail="Coach not found")
-    return Coach(**coach)
+    return Coach(**with_media_urls(coach, "coaches", base_url, "card"))
+
+@api_router.get("/coaches/{coach_id}/photo")
+async def get_coach_photo(coach_id: str, v: str, sig: str, request: Request, size: str = "card", database = Depends(get_database)):
+    return await serve_media(request, database, f"coaches/{coach_id}/photo", v, size, sig)
 
 @api_router.put("/coaches/{coach_id}", response_model=Coach)
-async def update_coach(coach_id: str, coach_data: CoachUpdate, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+async def update_coach(coach_id: str, coach_data: CoachUpdate, current_user: User = Depends(get_current_user), database = Depends(get_database), base_url: str = Depends(get_public_base_url)):
     update_data = {k: v for k, v in coach_data.dict().items() if v is not None}
     if not update_data:
         raise HTTPException(status_code=400, detail="No data to update")
-    
-    result = await database.coaches.update_one({"id": coach_id}, {"$set": update_data})
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Coach not found")
+    photo_fields, unset_fields = await resolve_media_update(database, "photo", update_data.pop("photo", None))
+    update_data.update(photo_fields)
+    renamed = "first_name" in update_data or "last_name" in update_data
+    if renamed:
+        current = await database.coaches.find_one({"id": coach_id}, {"_id": 0, "first_name": 1, "last_name": 1})
+        if not current:
+            raise HTTPException(status_code=404, detail="Coach not found")
+        update_data.update(coach_identity(
+            update_data.get("first_name", current["first_name"]), update_data.get("last_name", current["last_name"])
+        ))
+    
+    update = {"$set": update_data} if update_data else {}
+    if unset_fields:
+        update["$unset"] = unset_fields
+    if update:
+        result = await database.coaches.update_one({"id": coach_id}, update)
+        if result.matched_count == 0:
+            raise HTTPException(status_code=404, detail="Coach not found")
+        await bump_collection_version(database, "coaches")
     
     updated_coach = await database.coaches.find_one({"id": coach_id})
-    return Coach(**updated_coach)
+    if not updated_coach:
+        raise HTTPException(status_code=404, detail="Coach not found")
+    if renamed:
+        await link_coach_sessions(database, updated_coach)
+    return Coach(**with_media_urls(updated_coach, "coaches", base_url, "card"))
 
 @api_router.delete("/coaches/{coach_id}")
 async def delete_coach(coach_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
     result = await database.coaches.delete_one({"id": coach_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Coach not found")
+    await bump_collection_version(database, "coaches")
     return {"message": "Coach deleted successfully"}
 
 # Exercise Library endpoints (bibliothèque d'exercices)
@@ -845,10 +2301,15 @@ async def delete_coach(coach_id: str, current_user: User = Depends(get_current_u
 async def create_exercise_category(category_data: ExerciseCategoryCreate, current_user: User = Depends(get_current_user), database = Depends(get_database)):
     category_obj = ExerciseCategory(**category_data.dict())
     await database.exercise_categories.insert_one(category_obj.dict())
+    await bump_collection_version(database, "exercise_categories")
     return category_obj
 
 @api_router.get("/exercise-categories", response_model=List[ExerciseCategory])
-async def get_exercise_categories(current_user: User = Depends(get_current_user), database = Depends(get_database)):
+async def get_exercise_categories(request: Request, response: Response, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+    etag = await collection_etag(database, "exercise_categories", request)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=etag_headers(etag))
+    response.headers.update(etag_headers(etag))
     categories = await database.exercise_categories.find().to_list(200)
     return [ExerciseCategory(**{k: v for k, v in c.items() if k != "_id"}) for c in categories]
 
@@ -870,6 +2331,8 @@ async def update_exercise_category(category_id: str, category_data: ExerciseCate
             {"category": old_category.get("name")},
             {"$set": {"category": update_data["name"]}}
         )
+        await bump_collection_version(database, "exercises")
+    await bump_collection_version(database, "exercise_categories")
 
     updated_category = await database.exercise_categories.find_one({"id": category_id})
     return ExerciseCategory(**{k: v for k, v in updated_category.items() if k != "_id"})
@@ -879,61 +2342,526 @@ async def delete_exercise_category(category_id: str, current_user: User = Depend
     result = await database.exercise_categories.delete_one({"id": category_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Category not found")
+    await bump_collection_version(database, "exercise_categories")
     return {"message": "Category deleted successfully"}
 
 @api_router.post("/exercises", response_model=Exercise)
-async def create_exercise(exercise_data: ExerciseCreate, current_user: User = Depends(get_current_user), database = Depends(get_database)):
-    exercise_obj = Exercise(**exercise_data.dict())
-    await database.exercises.insert_one(exercise_obj.dict())
-    return exercise_obj
+async def create_exercise(exercise_data: ExerciseCreate, current_user: User = Depends(get_current_user), database = Depends(get_database), base_url: str = Depends(get_public_base_url)):
+    exercise_dict = exercise_data.dict()
+    diagram = exercise_dict.pop("diagram", None)
+    exercise_dict_for_db = Exercise(**exercise_dict).dict()
+    diagram_fields, _ = await resolve_media_update(database, "diagram", diagram)
+    exercise_dict_for_db.update(diagram_fields)
+    await database.exercises.insert_one(exercise_dict_for_db)
+    await bump_collection_version(database, "exercises")
+    return Exercise(**with_media_urls(exercise_dict_for_db, "exercises", base_url, "full"))
 
 @api_router.get("/exercises", response_model=List[Exercise])
-async def get_exercises(category: Optional[str] = None, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+async def get_exercises(request: Request, response: Response, category: Optional[str] = None, fields: Optional[str] = None, current_user: User = Depends(get_current_user), database = Depends(get_database), base_url: str = Depends(get_public_base_url)):
+    etag = await collection_etag(database, "exercises", request, base_url)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=etag_headers(etag))
+    names = parse_fields("exercises", fields, Exercise)
+    projection = fields_projection("exercises", names) if names else None
     query = {"category": category} if category else {}
-    exercises = await database.exercises.find(query).to_list(2000)
-    return [Exercise(**{k: v for k, v in e.items() if k != "_id"}) for e in exercises]
+    exercises = await database.exercises.find(query, projection).to_list(2000)
+    exercises = [with_media_urls(e, "exercises", base_url, "avatar") for e in exercises]
+    if names:
+        return sparse_response(exercises, names, etag_headers(etag))
+    response.headers.update(etag_headers(etag))
+    return [Exercise(**e) for e in exercises]
+
+# Déclarée avant /exercises/{exercise_id}, sinon "search" serait pris pour un id
+@api_router.get("/exercises/search", response_model=List[Exercise])
+async def search_exercises(
+    request: Request,
+    response: Response,
+    q: Optional[str] = None,
+    category: Optional[str] = None,
+    positions: Optional[str] = None,
+    equipment: Optional[str] = None,
+    min_duration: Optional[int] = Query(None, ge=0),
+    max_duration: Optional[int] = Query(None, ge=0),
+    fields: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user),
+    database = Depends(get_database),
+    base_url: str = Depends(get_public_base_url)
+):
+    """Recherche plein texte (index texte français : insensible aux accents, avec racinisation)
+    sur le nom, l'objectif, le déroulé, les consignes et les variantes, classée par pertinence.
+    Filtres combinables : catégorie, postes (au moins un), matériel (tous), durée min/max."""
+    etag = await collection_etag(database, "exercises", request, base_url)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=etag_headers(etag))
+
+    query = {}
+    if q and q.strip():
+        query["$text"] = {"$search": q.strip(), "$language": "french"}
+    if category:
+        query["category"] = category
+    if positions:
+        query["positions"] = {"$in": [p.strip() for p in positions.split(",") if p.strip()]}
+    if equipment:
+        query["equipment"] = {"$all": [e.strip() for e in equipment.split(",") if e.strip()]}
+    if min_duration is not None or max_duration is not None:
+        query["duration_minutes"] = {}
+        if min_duration is not None:
+            query["duration_minutes"]["$gte"] = min_duration
+        if max_duration is not None:
+            query["duration_minutes"]["$lte"] = max_duration
+
+    names = parse_fields("exercises", fields, Exercise)
+    projection = fields_projection("exercises", names) if names else {}
+    if "$text" in query:
+        projection["score"] = {"$meta": "textScore"}
+        sort = [("score", {"$meta": "textScore"}), ("name", ASCENDING)]
+    else:
+        sort = [("name", ASCENDING)]
+    exercises = await database.exercises.find(query, projection or None).sort(sort).limit(limit).to_list(limit)
+    exercises = [with_media_urls(e, "exercises", base_url, "avatar") for e in exercises]
+    if names:
+        return sparse_response(exercises, names, etag_headers(etag))
+    response.headers.update(etag_headers(etag))
+    return [Exercise(**e) for e in exercises]
 
 @api_router.get("/exercises/{exercise_id}", response_model=Exercise)
-async def get_exercise(exercise_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+async def get_exercise(exercise_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database), base_url: str = Depends(get_public_base_url)):
     exercise = await database.exercises.find_one({"id": exercise_id})
     if not exercise:
         raise HTTPException(status_code=404, detail="Exercise not found")
-    return Exercise(**{k: v for k, v in exercise.items() if k != "_id"})
+    return Exercise(**with_media_urls(exercise, "exercises", base_url, "full"))
+
+@api_router.get("/exercises/{exercise_id}/diagram")
+async def get_exercise_diagram(exercise_id: str, v: str, sig: str, request: Request, size: str = "full", database = Depends(get_database)):
+    return await serve_media(request, database, f"exercises/{exercise_id}/diagram", v, size, sig)
 
 @api_router.put("/exercises/{exercise_id}", response_model=Exercise)
-async def update_exercise(exercise_id: str, exercise_data: ExerciseUpdate, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+async def update_exercise(exercise_id: str, exercise_data: ExerciseUpdate, current_user: User = Depends(get_current_user), database = Depends(get_database), base_url: str = Depends(get_public_base_url)):
     update_data = {k: v for k, v in exercise_data.dict().items() if v is not None}
     if not update_data:
         raise HTTPException(status_code=400, detail="No data to update")
-
-    result = await database.exercises.update_one({"id": exercise_id}, {"$set": update_data})
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Exercise not found")
+    diagram_fields, unset_fields = await resolve_media_update(database, "diagram", update_data.pop("diagram", None))
+    update_data.update(diagram_fields)
+
+    update = {"$set": update_data} if update_data else {}
+    if unset_fields:
+        update["$unset"] = unset_fields
+    if update:
+        result = await database.exercises.update_one({"id": exercise_id}, update)
+        if result.matched_count == 0:
+            raise HTTPException(status_code=404, detail="Exercise not found")
+        await bump_collection_version(database, "exercises")
 
     updated_exercise = await database.exercises.find_one({"id": exercise_id})
-    return Exercise(**{k: v for k, v in updated_exercise.items() if k != "_id"})
+    if not updated_exercise:
+        raise HTTPException(status_code=404, detail="Exercise not found")
+    return Exercise(**with_media_urls(updated_exercise, "exercises", base_url, "full"))
 
 @api_router.delete("/exercises/{exercise_id}")
 async def delete_exercise(exercise_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
     result = await database.exercises.delete_one({"id": exercise_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Exercise not found")
+    await bump_collection_version(database, "exercises")
     return {"message": "Exercise deleted successfully"}
 
+# --- Agrégats d'évaluations (evaluation_rollups) ---
+# Les moyennes club / poste ne relisent plus toutes les évaluations : des documents d'agrégat
+# gardent, par type d'évaluation, le nombre d'évaluations et la somme / le nombre des moyennes
+# de thème (> 0). _id : "club", "player:<id>", "position:<poste>", "team:<équipe>".
+# Chaque écriture d'évaluation applique un $inc (+ nouvelle version, - ancienne) ; un écart
+# éventuel (écriture directe en base, crash entre deux étapes) se répare avec
+# rebuild_evaluation_rollups (POST /api/admin/evaluation-rollups/rebuild ou
+# scripts/rebuild_evaluation_rollups.py).
+# Types et noms de thème sont des clés de by_type : "." et "$" (interdits dans un chemin de
+# champ) y sont échappés par rollup_key, et rétablis à la lecture par rollup_label.
+ROLLUP_KEY_ESCAPES = (("%", "%25"), (".", "%2E"), ("$", "%24"))
+
+def rollup_key(value: str) -> str:
+    for char, escaped in ROLLUP_KEY_ESCAPES:
+        value = value.replace(char, escaped)
+    return value
+
+def rollup_label(key: str) -> str:
+    for char, escaped in reversed(ROLLUP_KEY_ESCAPES):
+        key = key.replace(escaped, char)
+    return key
+
+def rollup_scope(player: dict) -> tuple:
+    team = player.get("team")
+    return player.get("position"), getattr(team, "value", team)
+
+def rollup_ids(player_id: str, position: Optional[str], team: Optional[str]) -> List[str]:
+    ids = ["club", f"player:{player_id}"]
+    if position:
+        ids.append(f"position:{position}")
+    if team:
+        ids.append(f"team:{team}")
+    return ids
+
+def evaluation_increments(evaluation: dict, sign: int = 1) -> dict:
+    prefix = f"by_type.{rollup_key(evaluation.get('evaluation_type') or 'initial')}"
+    increments = {f"{prefix}.evaluations": sign}
+    for theme in evaluation.get("themes", []):
+        score = theme.get("average_score") or 0
+        if theme.get("name") and score > 0:
+            theme_key = rollup_key(theme["name"])
+            increments[f"{prefix}.themes.{theme_key}.sum"] = sign * score
+            increments[f"{prefix}.themes.{theme_key}.count"] = sign
+    return increments
+
+def rollup_increments(rollup: dict, sign: int = 1) -> dict:
+    """$inc équivalent au contenu d'un agrégat (pour le déplacer d'un poste / d'une équipe à l'autre).
+
+    Les clés de by_type sont celles stockées, donc déjà échappées par rollup_key.
+    """
+    increments = {}
+    for evaluation_type, totals in rollup.get("by_type", {}).items():
+        prefix = f"by_type.{evaluation_type}"
+        increments[f"{prefix}.evaluations"] = sign * totals.get("evaluations", 0)
+        for theme_name, theme in totals.get("themes", {}).items():
+            increments[f"{prefix}.themes.{theme_name}.sum"] = sign * theme["sum"]
+            increments[f"{prefix}.themes.{theme_name}.count"] = sign * theme["count"]
+    return increments
+
+def merge_increments(*parts: dict) -> dict:
+    merged = {}
+    for part in parts:
+        for key, value in part.items():
+            merged[key] = merged.get(key, 0) + value
+    return merged
+
+async def apply_rollup_increments(database, player: dict, increments: dict):
+    await apply_rollup_increments_many(database, [(player, increments)])
+
+async def apply_rollup_increments_many(database, changes: list):
+    """Applique [(joueur, $inc)] en un seul bulk_write, les $inc d'un même agrégat fusionnés."""
+    per_rollup = {}
+    for player, increments in changes:
+        if not increments:
+            continue
+        # Le poste et l'équipe sont recopiés dans l'agrégat joueur : utiles pour le déplacer
+        # ou le retirer quand la fiche joueur a changé ou n'existe plus.
+        position, team = rollup_scope(player)
+        for rollup_id in rollup_ids(player["id"], position, team):
+            entry = per_rollup.setdefault(rollup_id, {"increments": {}, "set": {}})
+            entry["increments"] = merge_increments(entry["increments"], increments)
+            if rollup_id.startswith("player:"):
+                entry["set"] = {"position": position, "team": team}
+    if not per_rollup:
+        return
+    now = datetime.utcnow()
+    await database.evaluation_rollups.bulk_write([
+        UpdateOne({"_id": rollup_id}, {"$inc": entry["increments"], "$set": {"updated_at": now, **entry["set"]}}, upsert=True)
+        for rollup_id, entry in per_rollup.items()
+    ], ordered=False)
+
+async def move_player_rollup(database, player: dict):
+    """Reporte les évaluations d'un joueur vers son nouveau poste / sa nouvelle équipe."""
+    rollup = await database.evaluation_rollups.find_one({"_id": f"player:{player['id']}"})
+    position, team = rollup_scope(player)
+    if not rollup or (rollup.get("position"), rollup.get("team")) == (position, team):
+        return
+    now = datetime.utcnow()
+    operations = []
+    old_ids = set(rollup_ids(player["id"], rollup.get("position"), rollup.get("team")))
+    new_ids = set(rollup_ids(player["id"], position, team))
+    for rollup_id in old_ids - new_ids:
+        operations.append(UpdateOne({"_id": rollup_id}, {"$inc": rollup_increments(rollup, -1), "$set": {"updated_at": now}}))
+    for rollup_id in new_ids - old_ids:
+        operations.append(UpdateOne({"_id": rollup_id}, {"$inc": rollup_increments(rollup), "$set": {"updated_at": now}}, upsert=True))
+    operations.append(UpdateOne({"_id": f"player:{player['id']}"}, {"$set": {"position": position, "team": team}}))
+    await database.evaluation_rollups.bulk_write(operations, ordered=False)
+
+async def remove_player_rollup(database, player_id: str):
+    # find_one_and_delete d'abord : rejouée après un crash, l'étape ne retranche rien deux fois
+    rollup = await database.evaluation_rollups.find_one_and_delete({"_id": f"player:{player_id}"})
+    if not rollup:
+        return None
+    now = datetime.utcnow()
+    return await database.evaluation_rollups.bulk_write([
+        UpdateOne({"_id": rollup_id}, {"$inc": rollup_increments(rollup, -1), "$set": {"updated_at": now}})
+        for rollup_id in rollup_ids(player_id, rollup.get("position"), rollup.get("team"))
+        if rollup_id != f"player:{player_id}"
+    ], ordered=False)
+
+# --- Stockage compact des évaluations ---
+# La structure (thèmes et noms d'aspects) est enregistrée une fois dans evaluation_templates,
+# sous l'empreinte de son contenu : chaque grille différente est une nouvelle version, et
+# une version n'est jamais modifiée. Une évaluation ne garde que template_id, la liste à plat
+# des notes de ses aspects (scores) et la moyenne de chaque thème (theme_scores), dans l'ordre
+# du modèle. Les documents de l'ancien format (themes complets) restent lus tels quels.
+NON_NOTE_SCORE = -1  # sentinelle "non noté" dans scores ; None = aspect sans note
+
+_evaluation_templates = {}  # template_id -> structure (immuable, donc cache sans expiration)
+_missing_templates = set()  # template_id introuvables, déjà signalés dans les logs
+
+# Grille actuelle (EVALUATION_THEMES de frontend/src/App.js) : sert de repli pour décoder une
+# évaluation dont le modèle a disparu d'evaluation_templates
+EVALUATION_THEMES = [
+    {"name": "ADRESSE", "aspects": ["Gestuelle et arc", "Équilibre", "Lâcher", "Proche du cercle", "2 points",
+                                    "3 points", "Catch & shoot", "Tir après dribble"]},
+    {"name": "AISANCE", "aspects": ["Contrôle", "Mobilité du regard", "Main forte", "Main faible", "Sous pression",
+                                    "Rythme", "Dribble utile"]},
+    {"name": "PASSE", "aspects": ["Timing", "Force", "Précision", "2 mains", "1 main", "Diversité"]},
+    {"name": "DEFENSE", "aspects": ["Position", "Transition", "Duel", "NPB Placement", "NPB Aide", "Close out",
+                                    "Dureté"]},
+    {"name": "REBOND", "aspects": ["Anticipation", "Placement", "Contact", "Agressivité", "Box out",
+                                   "Protège la balle"]},
+    {"name": "ATHLETE", "aspects": ["Vitesse", "Latéralité", "Endurance", "Coordination", "Détente", "Réactivité",
+                                    "Puissance"]},
+    {"name": "TACTIQUE", "aspects": ["QI basket", "Jeu d'équipe", "Vision", "Anticipation"]},
+    {"name": "COACHABILITE", "aspects": ["Attitude", "Accepte la critique", "Concentration", "Leadership",
+                                         "Travailleur"]},
+]
+
+def evaluation_template_structure(themes: list) -> list:
+    return [{"name": theme["name"], "aspects": [aspect["name"] for aspect in theme.get("aspects", [])]} for theme in themes]
+
+def evaluation_template_id(structure: list) -> str:
+    return hashlib.sha256(
+        json.dumps(structure, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()[:16]
+
+async def ensure_evaluation_templates(database, themes_list: list) -> list:
+    """Identifiants de modèle de chaque liste de thèmes ; les modèles inconnus sont créés en un seul bulk_write."""
+    structures = [evaluation_template_structure(themes) for themes in themes_list]
+    template_ids = [evaluation_template_id(structure) for structure in structures]
+    missing = {
+        template_id: structure for template_id, structure in zip(template_ids, structures)
+        if template_id not in _evaluation_templates
+    }
+    if missing:
+        now = datetime.utcnow()
+        try:
+            await database.evaluation_templates.bulk_write([
+                UpdateOne({"_id": template_id}, {"$setOnInsert": {"themes": structure, "created_at": now}}, upsert=True)
+                for template_id, structure in missing.items()
+            ], ordered=False)
+        except BulkWriteError as e:
+            # Même modèle créé en parallèle : contenu identique, seuls les doublons sont tolérés
+            if any(error.get("code") != DUPLICATE_KEY_CODE for error in e.details.get("writeErrors", [])):
+                raise
+        _evaluation_templates.update(missing)
+    return template_ids
+
+async def ensure_evaluation_template(database, themes: list) -> str:
+    return (await ensure_evaluation_templates(database, [themes]))[0]
+
+async def load_evaluation_templates(database, template_ids) -> dict:
+    missing = [template_id for template_id in set(template_ids) if template_id and template_id not in _evaluation_templates]
+    if missing:
+        async for template in database.evaluation_templates.find({"_id": {"$in": missing}}):
+            _evaluation_templates[template["_id"]] = template["themes"]
+    return _evaluation_templates
+
+def evaluation_template(templates: dict, template_id: str) -> list:
+    """Structure du modèle ; grille actuelle si le modèle est introuvable (signalé une fois par id)."""
+    structure = templates.get(template_id)
+    if structure is None:
+        if template_id not in _missing_templates:
+            _missing_templates.add(template_id)
+            logger.error(f"Modèle d'évaluation {template_id} introuvable : décodage avec la grille actuelle")
+        structure = EVALUATION_THEMES
+    return structure
+
+def encode_evaluation_scores(themes: list) -> dict:
+    scores = []
+    for theme in themes:
+        for aspect in theme.get("aspects", []):
+            scores.append(NON_NOTE_SCORE if aspect.get("score") == "non_note" else aspect.get("score"))
+    return {"scores": scores, "theme_scores": [theme.get("average_score") for theme in themes]}
+
+def decode_evaluation(document: dict, templates: dict) -> dict:
+    """Document compact -> forme de l'API (themes / aspects / average_score)."""
+    if "template_id" not in document:
+        return document  # ancien format
+    scores = iter(document.get("scores", []))
+    themes = []
+    for theme, average_score in zip(evaluation_template(templates, document["template_id"]), document.get("theme_scores", [])):
+        aspects = []
+        for aspect_name in theme["aspects"]:
+            score = next(scores, None)
+            aspects.append({"name": aspect_name, "score": "non_note" if score == NON_NOTE_SCORE else score})
+        themes.append({"name": theme["name"], "aspects": aspects, "average_score": average_score})
+    decoded = {key: value for key, value in document.items() if key not in ("template_id", "scores", "theme_scores")}
+    decoded["themes"] = themes
+    return decoded
+
+async def decode_evaluations(database, documents: list) -> list:
+    templates = await load_evaluation_templates(database, [document.get("template_id") for document in documents])
+    return [decode_evaluation(document, templates) for document in documents]
+
+def theme_totals_pipeline(match: dict, by_player: bool = False) -> list:
+    """Somme et nombre des moyennes de thème (> 0) par (type, modèle, position du thème).
+
+    Une seule passe sur les tableaux de moyennes, quel que soit le format : theme_scores pour
+    les documents compacts, themes.average_score (et le nom du thème) pour l'ancien format.
+    Seules ces moyennes sortent de Mongo ; les noms sont résolus par theme_totals. Un thème
+    n'est jamais désigné par son nom dans un chemin de champ (regroupement par position,
+    nom en simple valeur) : "." ou "$" dans un nom ne changent rien au pipeline.
+    """
+    group_id = {
+        "type": {"$ifNull": ["$evaluation_type", "initial"]},
+        "template_id": "$template_id",
+        "theme_index": "$theme_index",
+        "name": {"$arrayElemAt": ["$names", "$theme_index"]},
+    }
+    if by_player:
+        group_id["player_id"] = "$player_id"
+    return [
+        {"$match": match},
+        {"$project": {
+            "_id": 0, "player_id": 1, "evaluation_type": 1, "template_id": 1,
+            "names": "$themes.name",
+            "averages": {"$ifNull": ["$theme_scores", "$themes.average_score"]},
+        }},
+        {"$unwind": {"path": "$averages", "includeArrayIndex": "theme_index"}},
+        {"$match": {"averages": {"$gt": 0}}},
+        {"$group": {"_id": group_id, "sum": {"$sum": "$averages"}, "count": {"$sum": 1}}},
+    ]
+
+async def theme_totals(database, match: dict, by_player: bool = False) -> list:
+    """Lignes {player_id, type, theme, sum, count} avec le nom du thème résolu via le modèle."""
+    rows = await database.evaluations.aggregate(theme_totals_pipeline(match, by_player)).to_list(None)
+    templates = await load_evaluation_templates(database, [row["_id"].get("template_id") for row in rows])
+    totals = {}
+    for row in rows:
+        key = row["_id"]
+        name = key.get("name")
+        if key.get("template_id"):
+            structure = evaluation_template(templates, key["template_id"])
+            if key["theme_index"] >= len(structure):
+                continue  # modèle disparu et plus long que la grille actuelle : thème sans nom
+            name = structure[key["theme_index"]]["name"]
+        # Plusieurs modèles peuvent placer un même thème à des positions différentes
+        total = totals.setdefault((key.get("player_id"), key["type"], name), {"sum": 0, "count": 0})
+        total["sum"] += row["sum"]
+        total["count"] += row["count"]
+    return [
+        {"player_id": player_id, "type": type_name, "theme": name, **total}
+        for (player_id, type_name, name), total in totals.items()
+    ]
+
+def averages_from_totals(totals: dict, counts: dict, evaluations: int) -> dict:
+    """Règle de calcul unique de toutes les moyennes d'évaluation (joueur, poste, équipe, club).
+
+    - Chaque évaluation porte déjà la moyenne de chacun de ses thèmes (aspects "non noté" exclus).
+    - Un thème sans note (moyenne 0) est ignoré.
+    - Moyenne d'un thème = moyenne de ses moyennes de thème sur les évaluations retenues.
+    - Moyenne générale = moyenne de toutes ces moyennes de thème (pondérée par leur nombre).
+    """
+    theme_averages = {name: round(totals[name] / counts[name], 2) for name in totals if counts[name] > 0}
+    total_count = sum(counts.values())
+    return {
+        "theme_averages": theme_averages,
+        "overall_average": round(sum(totals.values()) / total_count, 2) if total_count > 0 else 0,
+        "total_evaluations": evaluations,
+    }
+
+def rollup_averages(rollup: Optional[dict], evaluation_type: Optional[str] = None) -> dict:
+    totals, counts, evaluations = {}, {}, 0
+    for type_key, by_type in (rollup or {}).get("by_type", {}).items():
+        if evaluation_type and rollup_label(type_key) != evaluation_type:
+            continue
+        evaluations += by_type.get("evaluations", 0)
+        for theme_key, theme in by_type.get("themes", {}).items():
+            theme_name = rollup_label(theme_key)
+            totals[theme_name] = totals.get(theme_name, 0) + theme["sum"]
+            counts[theme_name] = counts.get(theme_name, 0) + theme["count"]
+    return averages_from_totals(totals, counts, evaluations)
+
+async def evaluation_totals_by_player(database, match: dict) -> dict:
+    """Contenu by_type de l'agrégat de chaque joueur, recalculé depuis les évaluations de `match`."""
+    per_player = {}
+    # Nombre d'évaluations par (joueur, type)
+    async for row in database.evaluations.aggregate([
+        {"$match": match},
+        {"$group": {"_id": {"player_id": "$player_id", "type": {"$ifNull": ["$evaluation_type", "initial"]}}, "evaluations": {"$sum": 1}}},
+    ]):
+        by_type = per_player.setdefault(row["_id"]["player_id"], {})
+        by_type.setdefault(rollup_key(row["_id"]["type"]), {"evaluations": 0, "themes": {}})["evaluations"] = row["evaluations"]
+    # Somme / nombre des moyennes de thème par (joueur, type, thème)
+    for row in await theme_totals(database, match, by_player=True):
+        by_type = per_player.setdefault(row["player_id"], {})
+        themes = by_type.setdefault(rollup_key(row["type"]), {"evaluations": 0, "themes": {}})["themes"]
+        themes[rollup_key(row["theme"])] = {"sum": row["sum"], "count": row["count"]}
+    return per_player
+
+async def refresh_player_rollups(database, players: list):
+    """Recalcule les agrégats de quelques joueurs depuis leurs évaluations.
+
+    L'écart entre l'agrégat joueur stocké et le recalcul est reporté par $inc sur le joueur,
+    le club, son poste et son équipe : le coût dépend du nombre de joueurs, pas du club.
+    """
+    player_ids = [player["id"] for player in players]
+    per_player = await evaluation_totals_by_player(database, {"player_id": {"$in": player_ids}})
+    stored = {
+        rollup["_id"]: rollup
+        async for rollup in database.evaluation_rollups.find({"_id": {"$in": [f"player:{player_id}" for player_id in player_ids]}})
+    }
+    changes = []
+    for player in players:
+        increments = merge_increments(
+            rollup_increments({"by_type": per_player.get(player["id"], {})}),
+            rollup_increments(stored.get(f"player:{player['id']}", {}), -1),
+        )
+        changes.append((player, {path: value for path, value in increments.items() if value}))
+    await apply_rollup_increments_many(database, changes)
+
+async def rebuild_evaluation_rollups(database) -> dict:
+    """Recalcule tous les agrégats depuis les évaluations (réparation d'écart)."""
+    started = time.perf_counter()
+    per_player = await evaluation_totals_by_player(database, {})
+
+    players = {}
+    if per_player:
+        async for player in database.players.find({"id": {"$in": list(per_player)}}, {"_id": 0, "id": 1, "position": 1, "team": 1}):
+            players[player["id"]] = player
+
+    now = datetime.utcnow()
+    rollups = {}
+    for player_id, by_type in per_player.items():
+        position, team = rollup_scope(players.get(player_id, {}))
+        increments = rollup_increments({"by_type": by_type})
+        for rollup_id in rollup_ids(player_id, position, team):
+            rollup = rollups.setdefault(rollup_id, {"_id": rollup_id, "increments": {}})
+            rollup["increments"] = merge_increments(rollup["increments"], increments)
+            if rollup_id.startswith("player:"):
+                rollup.update(position=position, team=team)
+
+    operations = []
+    for rollup_id, rollup in rollups.items():
+        document = {"_id": rollup_id, "by_type": {}, "updated_at": now}
+        if rollup_id.startswith("player:"):
+            document.update(position=rollup["position"], team=rollup["team"])
+        for path, value in rollup["increments"].items():
+            node = document
+            *parents, leaf = path.split(".")
+            for part in parents:
+                node = node.setdefault(part, {})
+            node[leaf] = value
+        operations.append(ReplaceOne({"_id": rollup_id}, document, upsert=True))
+    operations.append(DeleteMany({"_id": {"$nin": list(rollups)}}))
+    await database.evaluation_rollups.bulk_write(operations, ordered=False)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"📊 Agrégats d'évaluations reconstruits : {len(rollups)} documents en {elapsed_ms:.0f} ms")
+    return {"rollups": len(rollups), "players": len(per_player), "duration_ms": round(elapsed_ms)}
+
+@api_router.post("/admin/evaluation-rollups/rebuild")
+async def rebuild_evaluation_rollups_endpoint(current_user: User = Depends(get_admin_user), database = Depends(get_database)):
+    return await rebuild_evaluation_rollups(database)
+
 # Player Evaluation endpoints
-@api_router.post("/evaluations", response_model=PlayerEvaluation)
-async def create_evaluation(evaluation_data: EvaluationCreate, current_user: User = Depends(get_current_user), database = Depends(get_database)):
-    # Verify player exists
-    player = await database.players.find_one({"id": evaluation_data.player_id})
-    if not player:
-        raise HTTPException(status_code=404, detail="Player not found")
-    
+def compute_theme_averages(themes: List[EvaluationTheme]):
     # Calculate averages for each theme and overall, ignoring "non noté" aspects
     themes_with_averages = []
     total_score = 0
     total_aspects = 0
 
-    for theme in evaluation_data.themes:
+    for theme in themes:
         if theme.aspects:
             # Filter out non-noted aspects (None or string "non_note")
             valid_aspects = [
@@ -956,157 +2884,187 @@ async def create_evaluation(evaluation_data: EvaluationCreate, current_user: Use
         themes_with_averages.append(theme)
 
     overall_average = round(total_score / total_aspects, 2) if total_aspects > 0 else 0
+    return themes_with_averages, overall_average
+
+# Champs remplacés quand l'évaluation existe déjà (id conservé)
+EVALUATION_UPSERT_FIELDS = ("evaluator_id", "evaluation_date", "overall_average", "notes", "template_id", "scores", "theme_scores")
+
+@api_router.post("/evaluations", response_model=PlayerEvaluation)
+async def create_evaluation(evaluation_data: EvaluationCreate, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+    # Verify player exists
+    player = await database.players.find_one({"id": evaluation_data.player_id})
+    if not player:
+        raise HTTPException(status_code=404, detail="Player not found")
     
-    evaluation_type = evaluation_data.evaluation_type or "initial"
+    themes_with_averages, overall_average = compute_theme_averages(evaluation_data.themes)
     
-    # Check if an evaluation of this type already exists for this player
-    existing_evaluation = await database.evaluations.find_one({
-        "player_id": evaluation_data.player_id,
-        "evaluation_type": evaluation_type
-    })
+    evaluation_obj = PlayerEvaluation(
+        player_id=evaluation_data.player_id,
+        evaluator_id=current_user.id,
+        evaluation_date=evaluation_data.evaluation_date or datetime.utcnow(),
+        evaluation_type=evaluation_data.evaluation_type or "initial",
+        themes=themes_with_averages,
+        overall_average=overall_average,
+        notes=evaluation_data.notes
+    )
+    themes = [theme.dict() for theme in themes_with_averages]
+    evaluation_dict = {
+        **evaluation_obj.dict(exclude={"themes"}),
+        "template_id": await ensure_evaluation_template(database, themes),
+        **encode_evaluation_scores(themes),
+    }
     
-    if existing_evaluation:
-        # Update existing evaluation instead of creating a new one
-        updated_evaluation = {
-            "evaluator_id": current_user.id,
-            "evaluation_date": evaluation_data.evaluation_date if hasattr(evaluation_data, 'evaluation_date') and evaluation_data.evaluation_date else datetime.utcnow(),
-            "evaluation_type": evaluation_type,
-            "themes": [theme.dict() for theme in themes_with_averages],
-            "overall_average": overall_average,
-            "notes": evaluation_data.notes
-        }
-        
-        await database.evaluations.update_one(
-            {"id": existing_evaluation["id"]},
-            {"$set": updated_evaluation}
-        )
-        
-        # Return the updated evaluation
-        updated_eval = await database.evaluations.find_one({"id": existing_evaluation["id"]})
-        return PlayerEvaluation(**updated_eval)
-    else:
-        # Create new evaluation
+    # Une évaluation par joueur et par type, remplacée si elle existe.
+    # On récupère l'état précédent (atomique) pour corriger les agrégats : deux enregistrements
+    # simultanés voient chacun la version remplacée par l'autre, les cumuls restent justes.
+    # $unset themes : un document de l'ancien format passe au format compact
+    previous = await atomic_upsert(
+        database.evaluations,
+        {"player_id": evaluation_obj.player_id, "evaluation_type": evaluation_obj.evaluation_type},
+        evaluation_dict, EVALUATION_UPSERT_FIELDS, unset={"themes": ""}, return_document=ReturnDocument.BEFORE
+    )
+    increments = evaluation_increments({**evaluation_dict, "themes": themes})
+    if previous:
+        previous = (await decode_evaluations(database, [previous]))[0]
+        increments = merge_increments(evaluation_increments(previous, -1), increments)
+        evaluation_obj = evaluation_obj.copy(update={"id": previous["id"]})
+    await apply_rollup_increments(database, player, increments)
+    return evaluation_obj
+
+@api_router.post("/evaluations/batch")
+async def create_evaluations_batch(batch: EvaluationBatchCreate, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+    """Crée ou remplace les évaluations de tout un groupe en une requête.
+
+    Même règle que POST /evaluations (une évaluation par joueur et par type, remplacée si elle
+    existe) : une requête $in pour les joueurs, un bulk_write pour les modèles de thèmes, un
+    bulk_write non ordonné des upserts d'évaluations, une lecture $in des identifiants, puis
+    les agrégats des seuls joueurs concernés recalculés depuis leurs évaluations
+    (refresh_player_rollups). Le résultat est donné élément par élément.
+    """
+    if len(batch.evaluations) > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PAGE_SIZE} evaluations per batch")
+    player_ids = list({item.player_id for item in batch.evaluations})
+    players = {
+        player["id"]: player
+        async for player in database.players.find({"id": {"$in": player_ids}}, {"_id": 0, "id": 1, "position": 1, "team": 1})
+    }
+
+    results = [None] * len(batch.evaluations)
+    pending = []  # (index de l'élément, évaluation, thèmes)
+    seen = set()
+    now = datetime.utcnow()
+    for index, item in enumerate(batch.evaluations):
+        evaluation_type = item.evaluation_type or "initial"
+        key = (item.player_id, evaluation_type)
+        result = {"index": index, "player_id": item.player_id, "evaluation_type": evaluation_type}
+        if item.player_id not in players:
+            results[index] = {**result, "status": "error", "error": "Player not found"}
+            continue
+        if key in seen:
+            results[index] = {**result, "status": "error", "error": "Duplicate player and evaluation type in batch"}
+            continue
+        seen.add(key)
+
+        themes_with_averages, overall_average = compute_theme_averages(item.themes)
         evaluation_obj = PlayerEvaluation(
-            player_id=evaluation_data.player_id,
+            player_id=item.player_id,
             evaluator_id=current_user.id,
-            evaluation_date=evaluation_data.evaluation_date if hasattr(evaluation_data, 'evaluation_date') and evaluation_data.evaluation_date else datetime.utcnow(),
+            evaluation_date=item.evaluation_date or now,
             evaluation_type=evaluation_type,
             themes=themes_with_averages,
             overall_average=overall_average,
-            notes=evaluation_data.notes
+            notes=item.notes
         )
-        
-        await database.evaluations.insert_one(evaluation_obj.dict())
-        return evaluation_obj
+        pending.append((index, evaluation_obj, [theme.dict() for theme in themes_with_averages]))
+
+    template_ids = await ensure_evaluation_templates(database, [themes for _, _, themes in pending])
+    documents = [
+        {**evaluation_obj.dict(exclude={"themes"}), "template_id": template_id, **encode_evaluation_scores(themes)}
+        for (_, evaluation_obj, themes), template_id in zip(pending, template_ids)
+    ]
+    keys = [{"player_id": document["player_id"], "evaluation_type": document["evaluation_type"]} for document in documents]
+    # $unset themes : un document de l'ancien format passe au format compact
+    operations = [
+        UpdateOne(key, upsert_update(key, document, EVALUATION_UPSERT_FIELDS, unset={"themes": ""}), upsert=True)
+        for key, document in zip(keys, documents)
+    ]
+    failed = {}
+    pending_operations = list(range(len(operations)))
+    for attempt in range(2):
+        if not pending_operations:
+            break
+        try:
+            await database.evaluations.bulk_write([operations[i] for i in pending_operations], ordered=False)
+            pending_operations = []
+        except BulkWriteError as e:
+            errors = {pending_operations[error["index"]]: error for error in e.details.get("writeErrors", [])}
+            # Création simultanée de la même clé ailleurs : l'index unique rejette l'upsert, qui
+            # devient au second essai une mise à jour du document inséré par l'autre
+            pending_operations = [i for i, error in errors.items() if error.get("code") == DUPLICATE_KEY_CODE and not attempt]
+            failed.update({i: error.get("errmsg", "Write error") for i, error in errors.items() if i not in pending_operations})
+
+    # id n'est écrit qu'à la création ($setOnInsert) : l'id stocké dit si l'évaluation est nouvelle
+    saved_ids = {}
+    if len(failed) < len(documents):
+        async for evaluation in database.evaluations.find(
+            {"player_id": {"$in": list({key["player_id"] for key in keys})}}, {"_id": 0, "id": 1, "player_id": 1, "evaluation_type": 1}
+        ):
+            saved_ids[(evaluation["player_id"], evaluation.get("evaluation_type") or "initial")] = evaluation["id"]
+
+    for position, ((index, evaluation_obj, _), document) in enumerate(zip(pending, documents)):
+        result = {"index": index, "player_id": evaluation_obj.player_id, "evaluation_type": evaluation_obj.evaluation_type}
+        if position in failed:
+            logger.error("Évaluation %s/%s non enregistrée: %s", evaluation_obj.player_id, evaluation_obj.evaluation_type, failed[position])
+            results[index] = {**result, "status": "error", "error": failed[position]}
+            continue
+        saved_id = saved_ids.get((evaluation_obj.player_id, evaluation_obj.evaluation_type), document["id"])
+        results[index] = {
+            **result,
+            "status": "created" if saved_id == document["id"] else "updated",
+            "id": saved_id,
+            "overall_average": document["overall_average"],
+        }
+    saved_players = {documents[position]["player_id"] for position in range(len(documents)) if position not in failed}
+    if saved_players:
+        await refresh_player_rollups(database, [players[player_id] for player_id in saved_players])
+
+    return {
+        "saved": sum(1 for result in results if result["status"] != "error"),
+        "errors": sum(1 for result in results if result["status"] == "error"),
+        "results": results,
+    }
 
 @api_router.get("/evaluations/player/{player_id}", response_model=List[PlayerEvaluation])
-async def get_player_evaluations(player_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
-    evaluations = await database.evaluations.find({"player_id": player_id}).sort("evaluation_date", -1).to_list(100)
-    return [PlayerEvaluation(**evaluation) for evaluation in evaluations]
+async def get_player_evaluations(player_id: str, response: Response, limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+    evaluations, next_cursor = await paginate(
+        database.evaluations, {"player_id": player_id}, [("evaluation_date", DESCENDING), ("id", DESCENDING)], limit, cursor
+    )
+    response.headers.update(page_headers(next_cursor))
+    return [PlayerEvaluation(**evaluation) for evaluation in await decode_evaluations(database, evaluations)]
 
-@app.get("/api/evaluations/averages/all")
-async def get_all_players_averages(current_user: User = Depends(get_current_user), database = Depends(get_database)):
+# Moyennes de groupe : une lecture d'agrégat (cf. averages_from_totals pour la règle de calcul)
+@api_router.get("/evaluations/averages/all")
+async def get_all_players_averages(evaluation_type: Optional[str] = None, current_user: User = Depends(get_current_user), database = Depends(get_database)):
     """Get evaluation averages for all players"""
-    try:
-        evaluations = await database.evaluations.find({}).to_list(1000)
-        
-        if not evaluations:
-            return {"theme_averages": {}, "overall_average": 0, "total_evaluations": 0}
-        
-        # Calculate theme averages
-        theme_totals = {}
-        theme_counts = {}
-        total_scores = 0
-        total_aspects = 0
-        
-        for evaluation in evaluations:
-            for theme in evaluation.get('themes', []):
-                theme_name = theme.get('name')
-                theme_score = theme.get('average_score', 0)
-                
-                if theme_name and theme_score > 0:
-                    if theme_name not in theme_totals:
-                        theme_totals[theme_name] = 0
-                        theme_counts[theme_name] = 0
-                    
-                    theme_totals[theme_name] += theme_score
-                    theme_counts[theme_name] += 1
-                    total_scores += theme_score
-                    total_aspects += 1
-        
-        # Calculate averages
-        theme_averages = {}
-        for theme_name in theme_totals:
-            if theme_counts[theme_name] > 0:
-                theme_averages[theme_name] = round(theme_totals[theme_name] / theme_counts[theme_name], 2)
-        
-        overall_average = round(total_scores / total_aspects, 2) if total_aspects > 0 else 0
-        
-        return {
-            "theme_averages": theme_averages,
-            "overall_average": overall_average,
-            "total_evaluations": len(evaluations)
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calculating averages: {str(e)}")
+    rollup = await database.evaluation_rollups.find_one({"_id": "club"})
+    return rollup_averages(rollup, evaluation_type)
 
-@app.get("/api/evaluations/averages/position/{position}")
-async def get_position_averages(position: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+@api_router.get("/evaluations/averages/position/{position}")
+async def get_position_averages(position: str, evaluation_type: Optional[str] = None, current_user: User = Depends(get_current_user), database = Depends(get_database)):
     """Get evaluation averages for players of a specific position"""
-    try:
-        # Get players of the specified position
-        players = await database.players.find({"position": position}).to_list(100)
-        player_ids = [player["id"] for player in players]
-        
-        if not player_ids:
-            return {"theme_averages": {}, "overall_average": 0, "players_count": 0, "total_evaluations": 0}
-        
-        # Get evaluations for these players
-        evaluations = await database.evaluations.find({"player_id": {"$in": player_ids}}).to_list(1000)
-        
-        if not evaluations:
-            return {"theme_averages": {}, "overall_average": 0, "players_count": len(player_ids), "total_evaluations": 0}
-        
-        # Calculate theme averages
-        theme_totals = {}
-        theme_counts = {}
-        total_scores = 0
-        total_aspects = 0
-        
-        for evaluation in evaluations:
-            for theme in evaluation.get('themes', []):
-                theme_name = theme.get('name')
-                theme_score = theme.get('average_score', 0)
-                
-                if theme_name and theme_score > 0:
-                    if theme_name not in theme_totals:
-                        theme_totals[theme_name] = 0
-                        theme_counts[theme_name] = 0
-                    
-                    theme_totals[theme_name] += theme_score
-                    theme_counts[theme_name] += 1
-                    total_scores += theme_score
-                    total_aspects += 1
-        
-        # Calculate averages
-        theme_averages = {}
-        for theme_name in theme_totals:
-            if theme_counts[theme_name] > 0:
-                theme_averages[theme_name] = round(theme_totals[theme_name] / theme_counts[theme_name], 2)
-        
-        overall_average = round(total_scores / total_aspects, 2) if total_aspects > 0 else 0
-        
-        return {
-            "theme_averages": theme_averages,
-            "overall_average": overall_average,
-            "players_count": len(player_ids),
-            "total_evaluations": len(evaluations),
-            "position": position
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calculating position averages: {str(e)}")
+    rollup, players_count = await asyncio.gather(
+        database.evaluation_rollups.find_one({"_id": f"position:{position}"}),
+        database.players.count_documents({"position": position}),
+    )
+    return {**rollup_averages(rollup, evaluation_type), "players_count": players_count, "position": position}
+
+@api_router.get("/evaluations/averages/team/{team}")
+async def get_team_averages(team: TeamType, evaluation_type: Optional[str] = None, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+    rollup, players_count = await asyncio.gather(
+        database.evaluation_rollups.find_one({"_id": f"team:{team.value}"}),
+        database.players.count_documents({"team": team.value}),
+    )
+    return {**rollup_averages(rollup, evaluation_type), "players_count": players_count, "team": team.value}
 
 @api_router.get("/evaluations/player/{player_id}/latest", response_model=PlayerEvaluation)
 async def get_latest_player_evaluation(player_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
@@ -1116,159 +3074,95 @@ async def get_latest_player_evaluation(player_id: str, current_user: User = Depe
     )
     if not evaluation:
         raise HTTPException(status_code=404, detail="No evaluation found for this player")
-    return PlayerEvaluation(**evaluation)
+    return PlayerEvaluation(**(await decode_evaluations(database, [evaluation]))[0])
 
 @api_router.get("/evaluations/latest/all")
-async def get_latest_evaluations_all_players(current_user: User = Depends(get_current_user), database = Depends(get_database)):
+async def get_latest_evaluations_all_players(response: Response, evaluation_type: Optional[str] = None, themes: Optional[str] = None, aspects: bool = True, limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, current_user: User = Depends(get_current_user), database = Depends(get_database)):
     """Renvoie en UNE seule requête la dernière évaluation de chaque joueur (clé = player_id).
-    Évite de faire un appel séparé par joueur depuis le frontend (beaucoup plus rapide)."""
-    evaluations = await database.evaluations.find().sort("evaluation_date", -1).to_list(5000)
+    Évite de faire un appel séparé par joueur depuis le frontend (beaucoup plus rapide).
+    `evaluation_type` : dernière évaluation de ce type ; `themes=ADRESSE,PASSE` : ces thèmes seulement ;
+    `aspects=false` : moyennes de thème sans le détail des aspects.
+    Avec `limit`, pagine par joueur : le curseur est le dernier player_id renvoyé."""
+    match = {"player_id": {"$gt": decode_cursor(cursor, 1)[0]}} if cursor else {"player_id": {"$ne": None}}
+    if evaluation_type:
+        match["evaluation_type"] = evaluation_type
+    # $sort sur (player_id, evaluation_date desc) suivi d'un $group $first : servi par l'index
+    # (evaluation_type,) player_id, evaluation_date, Mongo ne garde qu'une évaluation par joueur
+    # et seuls ces documents sont renvoyés, quel que soit l'historique.
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"player_id": 1, "evaluation_date": -1}},
+        {"$group": {"_id": "$player_id", "evaluation": {"$first": "$$ROOT"}}},
+        {"$sort": {"_id": 1}},
+    ]
+    if limit:
+        pipeline.append({"$limit": limit + 1})
+    pipeline.append({"$replaceRoot": {"newRoot": "$evaluation"}})
+    pipeline.append({"$project": {"_id": 0}})
+
+    evaluations = await database.evaluations.aggregate(pipeline).to_list(None)
+    if limit and len(evaluations) > limit:
+        evaluations = evaluations[:limit]
+        response.headers.update(page_headers(encode_cursor([evaluations[-1]["player_id"]])))
+    # Décodage puis projection des thèmes : une évaluation par joueur, donc proportionnel à l'effectif
+    names = {name.strip() for name in themes.split(",") if name.strip()} if themes else None
     latest_by_player = {}
-    for evaluation in evaluations:
-        player_id = evaluation.get("player_id")
-        if player_id and player_id not in latest_by_player:
-            evaluation.pop("_id", None)
-            latest_by_player[player_id] = evaluation
+    for evaluation in await decode_evaluations(database, evaluations):
+        if names is not None:
+            evaluation["themes"] = [theme for theme in evaluation["themes"] if theme["name"] in names]
+        if not aspects:
+            evaluation["themes"] = [{"name": theme["name"], "average_score": theme.get("average_score")} for theme in evaluation["themes"]]
+        latest_by_player[evaluation["player_id"]] = evaluation
     return latest_by_player
 
 @api_router.get("/evaluations/player/{player_id}/average")
-async def get_player_evaluation_average(player_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
-    evaluations = await database.evaluations.find({"player_id": player_id}).to_list(100)
-    
-    if not evaluations:
+async def get_player_evaluation_average(player_id: str, evaluation_type: Optional[str] = None, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+    match = {"player_id": player_id}
+    if evaluation_type:
+        match["evaluation_type"] = evaluation_type
+    evaluation_count = await database.evaluations.count_documents(match)
+    if not evaluation_count:
         raise HTTPException(status_code=404, detail="No evaluations found for this player")
     
-    # Calculate average scores for each theme across all evaluations
-    theme_totals = {}
-    theme_counts = {}
-    
-    for evaluation in evaluations:
-        for theme in evaluation.get("themes", []):
-            theme_name = theme["name"]
-            if theme_name not in theme_totals:
-                theme_totals[theme_name] = 0
-                theme_counts[theme_name] = 0
-            
-            if theme.get("average_score"):
-                theme_totals[theme_name] += theme["average_score"]
-                theme_counts[theme_name] += 1
-    
-    # Calculate averages
-    theme_averages = {}
-    for theme_name in theme_totals:
-        if theme_counts[theme_name] > 0:
-            theme_averages[theme_name] = round(theme_totals[theme_name] / theme_counts[theme_name], 2)
-    
-    # Calculate overall average
-    if theme_averages:
-        overall_average = round(sum(theme_averages.values()) / len(theme_averages), 2)
-    else:
-        overall_average = 0
+    totals, counts = {}, {}
+    for row in await theme_totals(database, match):
+        totals[row["theme"]] = totals.get(row["theme"], 0) + row["sum"]
+        counts[row["theme"]] = counts.get(row["theme"], 0) + row["count"]
+    averages = averages_from_totals(totals, counts, evaluation_count)
     
     return {
         "player_id": player_id,
-        "theme_averages": theme_averages,
-        "overall_average": overall_average,
-        "evaluation_count": len(evaluations)
+        "theme_averages": averages["theme_averages"],
+        "overall_average": averages["overall_average"],
+        "evaluation_count": evaluation_count
     }
 
-@api_router.get("/evaluations/averages/all")
-async def get_all_players_averages(current_user: User = Depends(get_current_user), database = Depends(get_database)):
-    """Get average scores across all players"""
-    evaluations = await database.evaluations.find().to_list(1000)
-    
-    if not evaluations:
-        return {"theme_averages": {}, "overall_average": 0, "total_evaluations": 0}
-    
-    theme_totals = {}
-    theme_counts = {}
-    
-    for evaluation in evaluations:
-        for theme in evaluation.get("themes", []):
-            theme_name = theme["name"]
-            if theme_name not in theme_totals:
-                theme_totals[theme_name] = 0
-                theme_counts[theme_name] = 0
-            
-            if theme.get("average_score"):
-                theme_totals[theme_name] += theme["average_score"]
-                theme_counts[theme_name] += 1
-    
-    theme_averages = {}
-    for theme_name in theme_totals:
-        if theme_counts[theme_name] > 0:
-            theme_averages[theme_name] = round(theme_totals[theme_name] / theme_counts[theme_name], 2)
-    
-    overall_average = round(sum(theme_averages.values()) / len(theme_averages), 2) if theme_averages else 0
-    
-    return {
-        "theme_averages": theme_averages,
-        "overall_average": overall_average,
-        "total_evaluations": len(evaluations)
-    }
-
-@api_router.get("/evaluations/averages/position/{position}")
-async def get_position_averages(position: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
-    """Get average scores for players of a specific position"""
-    # Get all players of this position
-    players = await database.players.find({"position": position}).to_list(1000)
-    player_ids = [player["id"] for player in players]
-    
-    if not player_ids:
-        return {"theme_averages": {}, "overall_average": 0, "total_evaluations": 0}
-    
-    # Get evaluations for these players
-    evaluations = await database.evaluations.find({"player_id": {"$in": player_ids}}).to_list(1000)
-    
-    if not evaluations:
-        return {"theme_averages": {}, "overall_average": 0, "total_evaluations": 0}
-    
-    theme_totals = {}
-    theme_counts = {}
-    
-    for evaluation in evaluations:
-        for theme in evaluation.get("themes", []):
-            theme_name = theme["name"]
-            if theme_name not in theme_totals:
-                theme_totals[theme_name] = 0
-                theme_counts[theme_name] = 0
-            
-            if theme.get("average_score"):
-                theme_totals[theme_name] += theme["average_score"]
-                theme_counts[theme_name] += 1
-    
-    theme_averages = {}
-    for theme_name in theme_totals:
-        if theme_counts[theme_name] > 0:
-            theme_averages[theme_name] = round(theme_totals[theme_name] / theme_counts[theme_name], 2)
-    
-    overall_average = round(sum(theme_averages.values()) / len(theme_averages), 2) if theme_averages else 0
-    
-    return {
-        "position": position,
-        "theme_averages": theme_averages,
-        "overall_average": overall_average,
-        "total_evaluations": len(evaluations),
-        "players_count": len(players)
-    }
-
-@app.delete("/api/evaluations/{evaluation_id}")
-async def delete_evaluation(evaluation_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
-    """Delete a specific evaluation"""
-    try:
-        result = await database.evaluations.delete_one({"id": evaluation_id})
-        if result.deleted_count == 0:
-            raise HTTPException(status_code=404, detail="Evaluation not found")
-        return {"message": "Evaluation deleted successfully"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error deleting evaluation: {str(e)}")
+@app.delete("/api/evaluations/{evaluation_id}")
+async def delete_evaluation(evaluation_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+    """Delete a specific evaluation"""
+    try:
+        evaluation = await database.evaluations.find_one_and_delete({"id": evaluation_id}, {"_id": 0})
+        if not evaluation:
+            raise HTTPException(status_code=404, detail="Evaluation not found")
+        evaluation = (await decode_evaluations(database, [evaluation]))[0]
+        player = await database.players.find_one(
+            {"id": evaluation["player_id"]}, {"_id": 0, "id": 1, "position": 1, "team": 1}
+        )
+        if player:
+            await apply_rollup_increments(database, player, evaluation_increments(evaluation, -1))
+        return {"message": "Evaluation deleted successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting evaluation: {str(e)}")
 
 @app.get("/api/evaluations")
-async def get_all_evaluations(current_user: User = Depends(get_current_user), database = Depends(get_database)):
+async def get_all_evaluations(response: Response, limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, current_user: User = Depends(get_current_user), database = Depends(get_database)):
     """Get all evaluations (for admin purposes)"""
     try:
-        evaluations = await database.evaluations.find({}).to_list(1000)
-        return evaluations
+        evaluations, next_cursor = await paginate(
+            database.evaluations, {}, [("evaluation_date", DESCENDING), ("id", DESCENDING)], limit, cursor, {"_id": 0}
+        )
+        response.headers.update(page_headers(next_cursor))
+        return await decode_evaluations(database, evaluations)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching evaluations: {str(e)}")
 
@@ -1287,9 +3181,12 @@ async def create_collective_session(session_data: CollectiveSessionCreate, curre
 
 @api_router.get("/collective-sessions", response_model=List[CollectiveSession])
 async def get_collective_sessions(
+    response: Response,
     month: Optional[int] = None,
     year: Optional[int] = None,
     session_type: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     database = Depends(get_database)
 ):
@@ -1310,7 +3207,10 @@ async def get_collective_sessions(
     if session_type:
         query["session_type"] = session_type
     
-    sessions = await database.collective_sessions.find(query).sort("session_date", -1).to_list(100)
+    sessions, next_cursor = await paginate(
+        database.collective_sessions, query, [("session_date", DESCENDING), ("id", DESCENDING)], limit, cursor
+    )
+    response.headers.update(page_headers(next_cursor))
     return [CollectiveSession(**session) for session in sessions]
 
 @api_router.get("/collective-sessions/{session_id}", response_model=CollectiveSession)
@@ -1338,14 +3238,12 @@ async def update_collective_session(session_id: str, session_data: CollectiveSes
     return CollectiveSession(**updated_session)
 
 @api_router.delete("/collective-sessions/{session_id}")
-async def delete_collective_session(session_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
-    # Also delete all attendances for this session
-    await database.attendances.delete_many({"collective_session_id": session_id})
-    
-    result = await database.collective_sessions.delete_one({"id": session_id})
-    if result.deleted_count == 0:
+async def delete_collective_session(session_id: str, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+    # Les présences sont supprimées en tâche de fond
+    cascade = await delete_with_cascade("collective_session", session_id, database.collective_sessions, background_tasks, database, current_user)
+    if cascade is None:
         raise HTTPException(status_code=404, detail="Collective session not found")
-    return {"message": "Collective session deleted successfully"}
+    return {"message": "Collective session deleted successfully", **cascade}
 
 # Match endpoints
 @api_router.post("/matches", response_model=Match)
@@ -1361,12 +3259,17 @@ async def create_match(match_data: MatchCreate, current_user: User = Depends(get
 
 @api_router.get("/matches", response_model=List[Match])
 async def get_matches(
+    response: Response,
     month: Optional[int] = None,
     year: Optional[int] = None,
     team: Optional[TeamType] = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     database = Depends(get_database)
 ):
+    names = parse_fields("matches", fields, Match)
     query = {}
     
     # Filter by month and year if provided
@@ -1386,7 +3289,13 @@ async def get_matches(
     if team:
         query["team"] = team
     
-    matches = await database.matches.find(query).sort("match_date", -1).to_list(100)
+    projection = fields_projection("matches", names) if names else None
+    matches, next_cursor = await paginate(
+        database.matches, query, [("match_date", DESCENDING), ("id", DESCENDING)], limit, cursor, projection
+    )
+    if names:
+        return sparse_response(matches, names, page_headers(next_cursor))
+    response.headers.update(page_headers(next_cursor))
     return [Match(**match) for match in matches]
 
 @api_router.get("/matches/{match_id}", response_model=Match)
@@ -1421,44 +3330,30 @@ async def update_match(match_id: str, match_data: MatchUpdate, current_user: Use
     return Match(**updated_match)
 
 @api_router.delete("/matches/{match_id}")
-async def delete_match(match_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
-    # Also delete all participations for this match
-    await database.match_participations.delete_many({"match_id": match_id})
-    
-    result = await database.matches.delete_one({"id": match_id})
-    if result.deleted_count == 0:
+async def delete_match(match_id: str, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+    # Les participations sont supprimées en tâche de fond
+    cascade = await delete_with_cascade("match", match_id, database.matches, background_tasks, database, current_user)
+    if cascade is None:
         raise HTTPException(status_code=404, detail="Match not found")
-    return {"message": "Match deleted successfully"}
+    return {"message": "Match deleted successfully", **cascade}
 
 # Match Participation endpoints
 @api_router.post("/match-participations", response_model=MatchParticipation)
 async def create_match_participation(participation_data: MatchParticipationCreate, current_user: User = Depends(get_current_user), database = Depends(get_database)):
-    # Check if participation already exists for this player and match
-    existing_participation = await database.match_participations.find_one({
-        "match_id": participation_data.match_id,
-        "player_id": participation_data.player_id
-    })
-    
-    if existing_participation:
-        # Update existing participation
-        update_data = participation_data.dict()
-        await database.match_participations.update_one(
-            {"id": existing_participation["id"]},
-            {"$set": update_data}
-        )
-        updated_participation = await database.match_participations.find_one({"id": existing_participation["id"]})
-        return MatchParticipation(**updated_participation)
-    else:
-        # Create new participation
-        participation_obj = MatchParticipation(**participation_data.dict())
-        participation_dict_for_db = participation_obj.dict()
-        await database.match_participations.insert_one(participation_dict_for_db)
-        return participation_obj
+    participation = await atomic_upsert(
+        database.match_participations,
+        {"match_id": participation_data.match_id, "player_id": participation_data.player_id},
+        MatchParticipation(**participation_data.dict()).dict(), ("is_present", "is_starter", "play_time", "notes")
+    )
+    return MatchParticipation(**participation)
 
 @api_router.get("/match-participations/match/{match_id}", response_model=List[dict])
-async def get_match_participations(match_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+async def get_match_participations(match_id: str, response: Response, limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, current_user: User = Depends(get_current_user), database = Depends(get_database), base_url: str = Depends(get_public_base_url)):
     # Get all participations for the match
-    participations = await database.match_participations.find({"match_id": match_id}).to_list(100)
+    participations, next_cursor = await paginate(
+        database.match_participations, {"match_id": match_id}, [("created_at", ASCENDING), ("id", ASCENDING)], limit, cursor
+    )
+    response.headers.update(page_headers(next_cursor))
 
     # Récupère tous les joueurs concernés en UNE seule requête
     # (au lieu d'une requête par joueur, ce qui rendait l'écran très lent à charger)
@@ -1475,15 +3370,18 @@ async def get_match_participations(match_id: str, current_user: User = Depends(g
         if player:
             result.append({
                 "participation": MatchParticipation(**participation),
-                "player": Player(**{k: v for k, v in player.items() if k != "_id"})
+                "player": Player(**with_media_urls(player, "players", base_url, "avatar"))
             })
 
     return result
 
 @api_router.get("/match-participations/player/{player_id}", response_model=List[dict])
-async def get_player_match_participations(player_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+async def get_player_match_participations(player_id: str, response: Response, limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, current_user: User = Depends(get_current_user), database = Depends(get_database)):
     # Get all participations for the player
-    participations = await database.match_participations.find({"player_id": player_id}).to_list(100)
+    participations, next_cursor = await paginate(
+        database.match_participations, {"player_id": player_id}, [("created_at", ASCENDING), ("id", ASCENDING)], limit, cursor
+    )
+    response.headers.update(page_headers(next_cursor))
 
     # Récupère tous les matchs concernés en UNE seule requête
     match_ids = list({p["match_id"] for p in participations if p.get("match_id")})
@@ -1564,77 +3462,70 @@ async def delete_match_participation(participation_id: str, current_user: User =
 # Attendance endpoints
 @api_router.post("/attendances", response_model=Attendance)
 async def create_attendance(attendance_data: AttendanceCreate, current_user: User = Depends(get_current_user), database = Depends(get_database)):
-    # Check if attendance already exists for this player and session
-    existing_attendance = await database.attendances.find_one({
-        "collective_session_id": attendance_data.collective_session_id,
-        "player_id": attendance_data.player_id
-    })
-    
-    if existing_attendance:
-        # Update existing attendance
-        result = await database.attendances.update_one(
-            {"id": existing_attendance["id"]},
-            {"$set": attendance_data.dict()}
-        )
-        updated_attendance = await database.attendances.find_one({"id": existing_attendance["id"]})
-        return Attendance(**updated_attendance)
-    else:
-        # Create new attendance
-        attendance_obj = Attendance(**attendance_data.dict())
-        await database.attendances.insert_one(attendance_obj.dict())
-        return attendance_obj
+    attendance = await atomic_upsert(
+        database.attendances,
+        {"collective_session_id": attendance_data.collective_session_id, "player_id": attendance_data.player_id},
+        Attendance(**attendance_data.dict()).dict(), ("status", "notes")
+    )
+    return Attendance(**attendance)
 
 @api_router.get("/attendances/session/{session_id}")
-async def get_session_attendances(session_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
-    attendances = await database.attendances.find({"collective_session_id": session_id}).to_list(100)
+async def get_session_attendances(session_id: str, response: Response, limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, current_user: User = Depends(get_current_user), database = Depends(get_database), base_url: str = Depends(get_public_base_url)):
+    attendances, next_cursor = await paginate(
+        database.attendances, {"collective_session_id": session_id}, [("created_at", ASCENDING), ("id", ASCENDING)], limit, cursor, {"_id": 0}
+    )
+    response.headers.update(page_headers(next_cursor))
     
-    # Get player info for each attendance
+    # Récupère tous les joueurs concernés en UNE seule requête (au lieu d'un find_one par présence)
+    player_ids = list({a["player_id"] for a in attendances if a.get("player_id")})
+    players_by_id = {}
+    if player_ids:
+        async for pl in database.players.find({"id": {"$in": player_ids}}, {"_id": 0}):
+            players_by_id[pl["id"]] = pl
+
     result = []
     for attendance in attendances:
-        player = await database.players.find_one({"id": attendance["player_id"]})
+        player = players_by_id.get(attendance["player_id"])
         if player:
             attendance_with_player = {
                 **attendance,
-                "player": player
+                "player": with_media_urls(player, "players", base_url, "avatar")
             }
             result.append(attendance_with_player)
     
     return result
 
+def player_attendances_pipeline(player_id: str, start_date: Optional[str], end_date: Optional[str]) -> list:
+    """Présences d'un joueur jointes à leur séance collective ($lookup), filtrées sur la date de séance."""
+    pipeline = [
+        {"$match": {"player_id": player_id}},
+        {"$lookup": {"from": "collective_sessions", "localField": "collective_session_id", "foreignField": "id", "as": "session"}},
+        {"$unwind": "$session"},
+        {"$project": {"_id": 0, "session._id": 0}},
+    ]
+    if start_date and end_date:
+        # Dates ISO stockées en chaînes : l'ordre des chaînes est celui des dates
+        pipeline.append({"$match": {"session.session_date": {"$gte": start_date, "$lte": end_date}}})
+    return pipeline
+
 @api_router.get("/attendances/player/{player_id}")
 async def get_player_attendances(
     player_id: str,
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     database = Depends(get_database)
 ):
-    # Get all attendances for the player
-    attendances = await database.attendances.find({"player_id": player_id}).to_list(1000)
-    
-    # Get session info for each attendance
-    result = []
-    for attendance in attendances:
-        session = await database.collective_sessions.find_one({"id": attendance["collective_session_id"]})
-        if session:
-            # Apply date filter if provided
-            if start_date and end_date:
-                session_date = datetime.fromisoformat(session["session_date"])
-                filter_start = datetime.fromisoformat(start_date)
-                filter_end = datetime.fromisoformat(end_date)
-                
-                if not (filter_start <= session_date <= filter_end):
-                    continue
-            
-            attendance_with_session = {
-                **attendance,
-                "session": session
-            }
-            result.append(attendance_with_session)
-    
-    # Sort by session date
-    result.sort(key=lambda x: x["session"]["session_date"], reverse=True)
-    return result
+    # Jointure et tri sur la date de la séance faits par Mongo : avec ?limit=, une page en mémoire
+    attendances, next_cursor = await paginate_pipeline(
+        database.attendances, player_attendances_pipeline(player_id, start_date, end_date),
+        [("session.session_date", DESCENDING), ("id", DESCENDING)], limit, cursor
+    )
+    response.headers.update(page_headers(next_cursor))
+    return attendances
 
 @api_router.get("/attendances/reports/player/{player_id}")
 async def get_player_attendance_report(
@@ -1642,54 +3533,19 @@ async def get_player_attendance_report(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    database = Depends(get_database)
+    database = Depends(get_database),
+    base_url: str = Depends(get_public_base_url)
 ):
     # Get player info
     player = await database.players.find_one({"id": player_id})
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
     
-    # Get all attendances for the player
-    attendances = await database.attendances.find({"player_id": player_id}).to_list(1000)
-
-    # Récupère toutes les séances collectives concernées en UNE seule requête
-    # (au lieu d'une requête par séance, ce qui était lent)
-    collective_session_ids = list({a["collective_session_id"] for a in attendances if a.get("collective_session_id")})
-    sessions_by_id = {}
-    if collective_session_ids:
-        sessions_cursor = database.collective_sessions.find({"id": {"$in": collective_session_ids}})
-        async for s in sessions_cursor:
-            sessions_by_id[s["id"]] = s
-
-    # Get session info and apply filters
-    attendance_data = []
-    for attendance in attendances:
-        session = sessions_by_id.get(attendance["collective_session_id"])
-        if session:
-            # Convert session_date to datetime for comparison
-            if isinstance(session["session_date"], str):
-                session_date = datetime.fromisoformat(session["session_date"])
-            elif isinstance(session["session_date"], date):
-                session_date = datetime.combine(session["session_date"], datetime.min.time())
-            else:
-                # Skip if we can't parse the date
-                continue
-            
-            # Apply date filter
-            if start_date and end_date:
-                filter_start = datetime.fromisoformat(start_date)
-                filter_end = datetime.fromisoformat(end_date)
-                if not (filter_start <= session_date <= filter_end):
-                    continue
-            
-            attendance_data.append({
-                "attendance": attendance,
-                "session": session
-            })
-    
     # Calculate statistics
+    # Présences lues en flux (jointure $lookup, plus récentes d'abord) : compteurs mis à jour
+    # au fil de l'eau, seules les 10 dernières sont gardées en mémoire
     stats = {
-        "total_sessions": len(attendance_data),
+        "total_sessions": 0,
         "present": 0,
         "absent": 0,
         "injured": 0,
@@ -1698,9 +3554,13 @@ async def get_player_attendance_report(
         "recent_attendances": []
     }
     
-    for item in attendance_data:
-        status = item["attendance"]["status"]
-        session_type = item["session"]["session_type"]
+    pipeline = player_attendances_pipeline(player_id, start_date, end_date)
+    pipeline.append({"$sort": {"session.session_date": DESCENDING, "id": DESCENDING}})
+    async for attendance in database.attendances.aggregate(pipeline, allowDiskUse=True):
+        session = attendance.pop("session")
+        stats["total_sessions"] += 1
+        status = attendance["status"]
+        session_type = session["session_type"]
         
         # Count by status
         if status == "present":
@@ -1724,18 +3584,15 @@ async def get_player_attendance_report(
         
         stats["by_type"][session_type]["total"] += 1
         stats["by_type"][session_type][status] += 1
-    
-    # Get recent attendances (last 10)
-    recent_data = sorted(attendance_data, key=lambda x: x["session"]["session_date"], reverse=True)[:10]
-    stats["recent_attendances"] = [
-        {
-            "session_date": item["session"]["session_date"],
-            "session_type": item["session"]["session_type"],
-            "status": item["attendance"]["status"],
-            "notes": item["attendance"].get("notes", "")
-        }
-        for item in recent_data
-    ]
+        
+        # Recent attendances (last 10)
+        if len(stats["recent_attendances"]) < 10:
+            stats["recent_attendances"].append({
+                "session_date": session["session_date"],
+                "session_type": session_type,
+                "status": status,
+                "notes": attendance.get("notes", "")
+            })
     
     # Calculate percentages (exclude OFF from total_sessions)
     effective_sessions = stats["total_sessions"] - stats["off"]
@@ -1750,23 +3607,29 @@ async def get_player_attendance_report(
         stats["injury_rate"] = 0
     
     return {
-        "player": {k: v for k, v in player.items() if k != "_id"},
+        "player": with_media_urls(player, "players", base_url, "avatar"),
         "statistics": stats
     }
 
 @api_router.post("/sessions", response_model=Session)
 async def create_session(session_data: SessionCreate, current_user: User = Depends(get_current_user), database = Depends(get_database)):
-    # Verify all players exist
-    for player_id in session_data.player_ids:
-        player = await database.players.find_one({"id": player_id})
-        if not player:
+    # Verify all players exist (une seule requête pour tous les joueurs)
+    requested_ids = list(dict.fromkeys(session_data.player_ids))
+    found_ids = set()
+    if requested_ids:
+        async for pl in database.players.find({"id": {"$in": requested_ids}}, {"_id": 0, "id": 1}):
+            found_ids.add(pl["id"])
+    for player_id in requested_ids:
+        if player_id not in found_ids:
             raise HTTPException(status_code=404, detail=f"Player with id {player_id} not found")
     
     session_dict = session_data.dict()
+    session_dict["trainer_ids"] = await resolve_trainer_ids(database, session_dict["trainers"])
     session_obj = Session(**session_dict)
     
     # Convert date objects to ISO format strings for MongoDB storage
     session_dict_for_db = session_obj.dict()
+    session_dict_for_db["trainer_keys"] = trainer_keys(session_obj.trainers)
     if isinstance(session_dict_for_db["session_date"], date):
         session_dict_for_db["session_date"] = session_dict_for_db["session_date"].isoformat()
     
@@ -1774,8 +3637,12 @@ async def create_session(session_data: SessionCreate, current_user: User = Depen
     return session_obj
 
 @api_router.get("/sessions", response_model=List[Session])
-async def get_sessions(current_user: User = Depends(get_current_user), database = Depends(get_database)):
-    sessions = await database.sessions.find().sort("session_date", -1).to_list(1000)
+async def get_sessions(response: Response, fields: Optional[str] = None, limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+    names = parse_fields("sessions", fields, Session)
+    projection = fields_projection("sessions", names) if names else None
+    sessions, next_cursor = await paginate(
+        database.sessions, {}, [("session_date", DESCENDING), ("id", DESCENDING)], limit, cursor, projection
+    )
     result = []
     for session in sessions:
         # Handle both old and new format
@@ -1791,18 +3658,22 @@ async def get_sessions(current_user: User = Depends(get_current_user), database
             session["player_ids"] = [session["player_id"]]
             del session["player_id"]
         
-        result.append(Session(**session))
+        result.append(session if names else Session(**session))
+    if names:
+        return sparse_response(result, names, page_headers(next_cursor))
+    response.headers.update(page_headers(next_cursor))
     return result
 
 @api_router.get("/sessions/player/{player_id}", response_model=List[Session])
-async def get_player_sessions(player_id: str, current_user: User = Depends(get_current_user), database = Depends(get_database)):
+async def get_player_sessions(player_id: str, response: Response, limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, current_user: User = Depends(get_current_user), database = Depends(get_database)):
     # Find sessions where the player is in player_ids array OR in old player_id field
-    sessions = await database.sessions.find({
+    sessions, next_cursor = await paginate(database.sessions, {
         "$or": [
             {"player_ids": {"$in": [player_id]}},
             {"player_id": player_id}  # For backward compatibility
         ]
-    }).sort("session_date", -1).to_list(1000)
+    }, [("session_date", DESCENDING), ("id", DESCENDING)], limit, cursor)
+    response.headers.update(page_headers(next_cursor))
     
     result = []
     for session in sessions:
@@ -1845,6 +3716,9 @@ async def update_session(session_id: str, session_data: SessionUpdate, current_u
     # Convert date objects to ISO format strings for MongoDB storage
     if "session_date" in update_data and isinstance(update_data["session_date"], date):
         update_data["session_date"] = update_data["session_date"].isoformat()
+    if "trainers" in update_data:
+        update_data["trainer_ids"] = await resolve_trainer_ids(database, update_data["trainers"])
+        update_data["trainer_keys"] = trainer_keys(update_data["trainers"])
     
     result = await database.sessions.update_one({"id": session_id}, {"$set": update_data})
     if result.matched_count == 0:
@@ -1860,8 +3734,30 @@ async def delete_session(session_id: str, current_user: User = Depends(get_curre
         raise HTTPException(status_code=404, detail="Session not found")
     return {"message": "Session deleted successfully"}
 
+def report_session(session: dict) -> Session:
+    """Séance stockée (ancien ou nouveau format) -> Session, pour les rapports."""
+    # Handle both old and new format
+    if "themes" not in session:
+        # Convert old format to new format
+        session["themes"] = [session.get("content", "")] if session.get("content") else []
+        session["trainers"] = [session.get("trainer", "")] if session.get("trainer") else []
+        session["content_details"] = session.get("results", "")
+    
+    # Handle both old single player and new multiple players format
+    if "player_id" in session and "player_ids" not in session:
+        session["player_ids"] = [session["player_id"]]
+        # Remove old field to avoid conflicts
+        del session["player_id"]
+    elif "player_ids" not in session:
+        # If neither field exists, create empty list
+        session["player_ids"] = []
+    
+    # Remove MongoDB ObjectId field if present
+    session.pop("_id", None)
+    return Session(**session)
+
 @api_router.get("/reports/player/{player_id}", response_model=PlayerReport)
-async def get_player_report(player_id: str, current_user: User = Depends(get_current_user), start_date: Optional[str] = None, end_date: Optional[str] = None, database = Depends(get_database)):
+async def get_player_report(player_id: str, current_user: User = Depends(get_current_user), start_date: Optional[str] = None, end_date: Optional[str] = None, database = Depends(get_database), base_url: str = Depends(get_public_base_url)):
     # Get player
     player = await database.players.find_one({"id": player_id})
     if not player:
@@ -1883,88 +3779,62 @@ async def get_player_report(player_id: str, current_user: User = Depends(get_cur
         }
     
     # Get sessions for this player (filtered by date if provided)
-    sessions = await database.sessions.find(base_query).to_list(1000)
-    
-    session_objects = []
-    
-    for session in sessions:
-        # Handle both old and new format
-        if "themes" not in session:
-            # Convert old format to new format
-            session["themes"] = [session.get("content", "")] if session.get("content") else []
-            session["trainers"] = [session.get("trainer", "")] if session.get("trainer") else []
-            session["content_details"] = session.get("results", "")
-        
-        # Handle both old single player and new multiple players format
-        if "player_id" in session and "player_ids" not in session:
-            session["player_ids"] = [session["player_id"]]
-            # Remove old field to avoid conflicts
-            del session["player_id"]
-        elif "player_ids" not in session:
-            # If neither field exists, create empty list
-            session["player_ids"] = []
-        
-        # Remove MongoDB ObjectId field if present
-        if "_id" in session:
-            del session["_id"]
-        
-        session_objects.append(Session(**session))
-    
-    # Calculate statistics
-    total_sessions = len(session_objects)
-    
-    # Theme breakdown (using converted session objects)
+    # Lues en flux, plus récentes d'abord : compteurs incrémentaux, 10 séances gardées en mémoire
+    total_sessions = 0
     content_breakdown = {}
-    for session_obj in session_objects:
-        themes = session_obj.themes or []
-        for theme in themes:
+    trainer_breakdown = {}
+    recent_sessions = []
+    async for session in database.sessions.find(base_query).sort([("session_date", DESCENDING), ("id", DESCENDING)]):
+        session_obj = report_session(session)
+        total_sessions += 1
+        
+        # Theme breakdown
+        for theme in session_obj.themes or []:
             if theme.strip():  # Ignore empty themes
                 content_breakdown[theme] = content_breakdown.get(theme, 0) + 1
-    
-    # Trainer breakdown (using converted session objects)
-    trainer_breakdown = {}
-    for session_obj in session_objects:
-        trainers = session_obj.trainers or []
-        for trainer in trainers:
+        
+        # Trainer breakdown
+        for trainer in session_obj.trainers or []:
             if trainer.strip():  # Ignore empty trainers
                 trainer_breakdown[trainer] = trainer_breakdown.get(trainer, 0) + 1
-    
-    # Recent sessions (last 10)
-    recent_sessions = sorted(session_objects, key=lambda x: x.session_date, reverse=True)[:10]
+        
+        # Recent sessions (last 10)
+        if len(recent_sessions) < 10:
+            recent_sessions.append(session_obj)
     
     # Get match statistics for this player
-    match_participations = await database.match_participations.find({"player_id": player_id}).to_list(1000)
+    # Participations jointes à leur match ($lookup) et lues en flux, matchs les plus récents d'abord
     match_stats = {
-        "total_matches": len(match_participations),
-        "matches_played": len([p for p in match_participations if p["is_present"]]),
-        "matches_started": len([p for p in match_participations if p["is_present"] and p["is_starter"]]),
-        "total_play_time": sum([p.get("play_time", 0) for p in match_participations if p["is_present"] and p.get("play_time")]),
+        "total_matches": 0,
+        "matches_played": 0,
+        "matches_started": 0,
+        "total_play_time": 0,
         "average_play_time": 0,
         "average_play_time_u18": 0,
         "average_play_time_u21": 0,
         "team_breakdown": {},
         "recent_matches": []
     }
-    
-    # Calculate average play time (global and by team)
-    played_matches = [p for p in match_participations if p["is_present"] and p.get("play_time")]
-    u18_play_times = []
-    u21_play_times = []
-    
-    if played_matches:
-        match_stats["average_play_time"] = round(sum([p["play_time"] for p in played_matches]) / len(played_matches), 1)
-    
-    # Get match details for team breakdown and separate U18/U21 averages
-    # (une seule requête groupée au lieu d'une requête par match, pour aller plus vite)
-    match_ids = list({p["match_id"] for p in match_participations if p.get("match_id")})
-    matches_by_id = {}
-    if match_ids:
-        matches_cursor = database.matches.find({"id": {"$in": match_ids}})
-        async for m in matches_cursor:
-            matches_by_id[m["id"]] = m
-
-    for participation in match_participations:
-        match = matches_by_id.get(participation["match_id"])
+    # (somme, nombre) des temps de jeu : global, U18, U21
+    play_times = {"all": [0, 0], "U18": [0, 0], "U21": [0, 0]}
+    
+    async for participation in database.match_participations.aggregate([
+        {"$match": {"player_id": player_id}},
+        {"$lookup": {"from": "matches", "localField": "match_id", "foreignField": "id", "as": "match"}},
+        {"$unwind": {"path": "$match", "preserveNullAndEmptyArrays": True}},
+        {"$sort": {"match.match_date": DESCENDING, "id": DESCENDING}},
+    ], allowDiskUse=True):
+        match = participation.pop("match", None)
+        match_stats["total_matches"] += 1
+        if participation["is_present"]:
+            match_stats["matches_played"] += 1
+            if participation["is_starter"]:
+                match_stats["matches_started"] += 1
+            if participation.get("play_time"):
+                match_stats["total_play_time"] += participation["play_time"]
+                play_times["all"][0] += participation["play_time"]
+                play_times["all"][1] += 1
+        
         if match:
             # Team breakdown
             team = match["team"]
@@ -1982,11 +3852,9 @@ async def get_player_report(player_id: str, current_user: User = Depends(get_cur
                     match_stats["team_breakdown"][team]["started"] += 1
                 
                 # Collect play times by team for separate averages
-                if participation.get("play_time"):
-                    if team == "U18":
-                        u18_play_times.append(participation["play_time"])
-                    elif team == "U21":
-                        u21_play_times.append(participation["play_time"])
+                if participation.get("play_time") and team in play_times:
+                    play_times[team][0] += participation["play_time"]
+                    play_times[team][1] += 1
             
             # Recent matches (last 5)
             if len(match_stats["recent_matches"]) < 5:
@@ -1995,21 +3863,14 @@ async def get_player_report(player_id: str, current_user: User = Depends(get_cur
                     "participation": MatchParticipation(**participation)
                 })
     
-    # Calculate separate averages for U18 and U21
-    if u18_play_times:
-        match_stats["average_play_time_u18"] = round(sum(u18_play_times) / len(u18_play_times), 1)
-    
-    if u21_play_times:
-        match_stats["average_play_time_u21"] = round(sum(u21_play_times) / len(u21_play_times), 1)
-    # Sort recent matches by date
-    match_stats["recent_matches"] = sorted(
-        match_stats["recent_matches"], 
-        key=lambda x: x["match"].match_date, 
-        reverse=True
-    )[:5]
+    # Calculate average play time (global and by team)
+    for key, stat in (("all", "average_play_time"), ("U18", "average_play_time_u18"), ("U21", "average_play_time_u21")):
+        total, count = play_times[key]
+        if count:
+            match_stats[stat] = round(total / count, 1)
     
     return PlayerReport(
-        player=Player(**{k: v for k, v in player.items() if k != "_id"}),
+        player=Player(**with_media_urls(player, "players", base_url, "avatar")),
         total_sessions=total_sessions,
         content_breakdown=content_breakdown,
         trainer_breakdown=trainer_breakdown,
@@ -2018,18 +3879,16 @@ async def get_player_report(player_id: str, current_user: User = Depends(get_cur
     )
 
 @api_router.get("/reports/coach/{coach_name}", response_model=CoachReport)
-async def get_coach_report(coach_name: str, current_user: User = Depends(get_current_user), start_date: Optional[str] = None, end_date: Optional[str] = None, database = Depends(get_database)):
-    # Get coach by name (since coaches are referenced by name in sessions)
-    coach = await database.coaches.find_one({
-        "$or": [
-            {"first_name": coach_name},
-            {"last_name": coach_name},
-            {"$expr": {"$eq": [{"$concat": ["$first_name", " ", "$last_name"]}, coach_name]}}
-        ]
-    })
-    
-    # If coach not found in coaches collection, create a virtual coach object
-    if not coach:
+async def get_coach_report(coach_name: str, current_user: User = Depends(get_current_user), start_date: Optional[str] = None, end_date: Optional[str] = None, database = Depends(get_database), base_url: str = Depends(get_public_base_url)):
+    # coach_name : nom complet, prénom, nom ou slug — résolu via l'index name_keys
+    candidates = await database.coaches.find({"name_keys": name_slug(coach_name)}).to_list(None)
+    coach = match_coach(candidates, coach_name)
+    
+    if coach:
+        # Séances rattachées au coach par identifiant (index trainer_ids)
+        query = {"trainer_ids": coach["id"]}
+    else:
+        # If coach not found in coaches collection, create a virtual coach object
         coach = {
             "id": "virtual",
             "first_name": coach_name,
@@ -2037,9 +3896,9 @@ async def get_coach_report(coach_name: str, current_user: User = Depends(get_cur
             "photo": None,
             "created_at": datetime.utcnow()
         }
+        query = {"trainers": coach_name}
     
-    # Build query with date filter if provided
-    query = {"trainers": {"$in": [coach_name]}}
+    # Date filter if provided
     if start_date and end_date:
         query["session_date"] = {
             "$gte": start_date,
@@ -2047,59 +3906,41 @@ async def get_coach_report(coach_name: str, current_user: User = Depends(get_cur
         }
     
     # Get sessions for this coach (filtered by date if provided)
-    sessions = await database.sessions.find(query).to_list(1000)
-    session_objects = []
-    
-    for session in sessions:
-        # Handle both old and new format
-        if "themes" not in session:
-            # Convert old format to new format
-            session["themes"] = [session.get("content", "")] if session.get("content") else []
-            session["trainers"] = [session.get("trainer", "")] if session.get("trainer") else []
-            session["content_details"] = session.get("results", "")
-        
-        # Handle both old single player and new multiple players format
-        if "player_id" in session and "player_ids" not in session:
-            session["player_ids"] = [session["player_id"]]
-            # Remove old field to avoid conflicts
-            del session["player_id"]
-        elif "player_ids" not in session:
-            # If neither field exists, create empty list
-            session["player_ids"] = []
-        
-        # Remove MongoDB ObjectId field if present
-        if "_id" in session:
-            del session["_id"]
-            
-        session_objects.append(Session(**session))
-    
-    # Calculate statistics
-    total_sessions = len(session_objects)
-    
-    # Theme breakdown
+    # Lues en flux, plus récentes d'abord : compteurs incrémentaux, 10 séances gardées en mémoire
+    total_sessions = 0
     theme_breakdown = {}
-    for session_obj in session_objects:
-        themes = session_obj.themes or []
-        for theme in themes:
+    sessions_per_player = {}
+    recent_sessions = []
+    async for session in database.sessions.find(query).sort([("session_date", DESCENDING), ("id", DESCENDING)]):
+        session_obj = report_session(session)
+        total_sessions += 1
+        
+        # Theme breakdown
+        for theme in session_obj.themes or []:
             if theme.strip():
                 theme_breakdown[theme] = theme_breakdown.get(theme, 0) + 1
+        
+        for player_id in session_obj.player_ids or []:
+            sessions_per_player[player_id] = sessions_per_player.get(player_id, 0) + 1
+        
+        # Recent sessions (last 10)
+        if len(recent_sessions) < 10:
+            recent_sessions.append(session_obj)
     
-    # Player breakdown
-    player_breakdown = {}
-    players = await database.players.find().to_list(1000)
-    player_lookup = {player["id"]: f"{player['first_name']} {player['last_name']}" for player in players}
-    
-    for session_obj in session_objects:
-        player_ids = session_obj.player_ids or []
-        for player_id in player_ids:
-            player_name = player_lookup.get(player_id, "Joueur Inconnu")
-            player_breakdown[player_name] = player_breakdown.get(player_name, 0) + 1
+    # Player breakdown (seulement les joueurs présents dans ces séances)
+    player_lookup = {}
+    async for player in database.players.find(
+        {"id": {"$in": list(sessions_per_player)}}, {"_id": 0, "id": 1, "first_name": 1, "last_name": 1}
+    ):
+        player_lookup[player["id"]] = f"{player['first_name']} {player['last_name']}"
     
-    # Recent sessions (last 10)
-    recent_sessions = sorted(session_objects, key=lambda x: x.session_date, reverse=True)[:10]
+    player_breakdown = {}
+    for player_id, count in sessions_per_player.items():
+        player_name = player_lookup.get(player_id, "Joueur Inconnu")
+        player_breakdown[player_name] = player_breakdown.get(player_name, 0) + count
     
     return CoachReport(
-        coach=Coach(**coach),
+        coach=Coach(**with_media_urls(coach, "coaches", base_url, "avatar")),
         total_sessions=total_sessions,
         theme_breakdown=theme_breakdown,
         player_breakdown=player_breakdown,
@@ -2107,12 +3948,30 @@ async def get_coach_report(coach_name: str, current_user: User = Depends(get_cur
     )
 
 @api_router.get("/calendar")
-async def get_calendar_data(current_user: User = Depends(get_current_user), database = Depends(get_database)):
-    sessions = await database.sessions.find().to_list(1000)
-    players = await database.players.find().to_list(1000)
+async def get_calendar_data(
+    response: Response,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    database = Depends(get_database)
+):
+    # Fenêtre de dates et ?limit=&cursor= optionnels, comme GET /sessions
+    query = {}
+    if start_date and end_date:
+        query["session_date"] = {"$gte": start_date, "$lte": end_date}
+    sessions, next_cursor = await paginate(
+        database.sessions, query, [("session_date", DESCENDING), ("id", DESCENDING)], limit, cursor, {"_id": 0}
+    )
+    response.headers.update(page_headers(next_cursor))
     
-    # Create player lookup
-    player_lookup = {player["id"]: f"{player['first_name']} {player['last_name']}" for player in players}
+    # Create player lookup (seulement les joueurs de ces séances, noms uniquement)
+    player_ids = list({player_id for session in sessions for player_id in session.get("player_ids", [])}
+                      | {session["player_id"] for session in sessions if session.get("player_id")})
+    player_lookup = {}
+    async for player in database.players.find({"id": {"$in": player_ids}}, {"_id": 0, "id": 1, "first_name": 1, "last_name": 1}):
+        player_lookup[player["id"]] = f"{player['first_name']} {player['last_name']}"
     
     # Format calendar data
     calendar_data = []
@@ -2156,73 +4015,92 @@ async def get_calendar_data(current_user: User = Depends(get_current_user), data
     
     return calendar_data
 
+# Champs des séances lus par les tableaux de bord (anciens formats compris)
+ANALYTICS_SESSION_FIELDS = {"_id": 0, "session_date": 1, "themes": 1, "content": 1, "trainers": 1, "trainer": 1,
+                            "player_ids": 1, "player_id": 1}
+
+def parse_session_date(session: dict) -> Optional[datetime]:
+    session_date_str = session.get("session_date")
+    if isinstance(session_date_str, str):
+        try:
+            return datetime.fromisoformat(session_date_str)
+        except ValueError:
+            return None
+    return None
+
 @api_router.get("/analytics/dashboard")
 async def get_dashboard_analytics(current_user: User = Depends(get_current_user), database = Depends(get_database), days: int = 30):
-    # Get all sessions and players
-    all_sessions = await database.sessions.find().to_list(1000)
-    players = await database.players.find().to_list(1000)
+    import calendar as cal
+    
+    # Players: noms uniquement (player_activity liste tous les joueurs)
+    players = [
+        player async for player in database.players.find({}, {"_id": 0, "id": 1, "first_name": 1, "last_name": 1})
+    ]
     
     # Create player lookup
     player_lookup = {player["id"]: f"{player['first_name']} {player['last_name']}" for player in players}
     
-    # Convert ALL sessions to consistent format first
-    all_processed_sessions = []
-    for session in all_sessions:
+    # Séances lues en flux, champs utiles seulement : chaque statistique est un compteur
+    # incrémenté au passage, la mémoire ne dépend plus du nombre de séances.
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days) if days < 365 else None  # Don't filter for "all time"
+    # Inactive players alert (no sessions in last 5 days) - USE ALL SESSIONS FOR THIS ALERT
+    start_date_alert = end_date - timedelta(days=5)
+    query = {}
+    if start_date:
+        # Pré-filtre sur la chaîne ISO (jour de début inclus) ; le filtre exact est refait ci-dessous
+        query["session_date"] = {"$gte": min(start_date, start_date_alert).date().isoformat()}
+    
+    total_sessions = 0
+    theme_stats = {}
+    coach_stats = {}
+    sessions_by_month = {}
+    sessions_per_player = {}
+    recently_active = set()
+    async for session in database.sessions.find(query, ANALYTICS_SESSION_FIELDS):
         # Handle both old and new format
         if "themes" not in session:
             session["themes"] = [session.get("content", "")] if session.get("content") else []
             session["trainers"] = [session.get("trainer", "")] if session.get("trainer") else []
-            session["content_details"] = session.get("results", "")
         
-        # Handle both old single player and new multiple players format
-        if "player_id" in session and "player_ids" not in session:
-            session["player_ids"] = [session["player_id"]]
+        session_date = parse_session_date(session)
+        if session_date and start_date_alert <= session_date <= end_date:
+            # Old format: single player_id
+            recently_active.update([session["player_id"]] if "player_id" in session else session.get("player_ids", []))
         
-        all_processed_sessions.append(session)
-    
-    # Filter sessions by date range for ALL calculations
-    from datetime import datetime, timedelta
-    if days < 365:  # Don't filter for "all time"
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
+        # Filter sessions by date range for ALL calculations
+        if start_date and not (session_date and start_date <= session_date <= end_date):
+            continue
+        total_sessions += 1
         
-        filtered_sessions = []
-        for session in all_processed_sessions:
-            session_date_str = session.get("session_date")
-            if isinstance(session_date_str, str):
-                try:
-                    session_date = datetime.fromisoformat(session_date_str)
-                    if start_date <= session_date <= end_date:
-                        filtered_sessions.append(session)
-                except:
-                    continue
-        processed_sessions = filtered_sessions
-    else:
-        processed_sessions = all_processed_sessions
+        if session_date:
+            month = (session_date.year, session_date.month)
+            sessions_by_month[month] = sessions_by_month.get(month, 0) + 1
+        
+        # Theme progression - FROM FILTERED SESSIONS
+        for theme in session.get("themes", []):
+            if theme.strip():
+                theme_stats[theme] = theme_stats.get(theme, 0) + 1
+        
+        # Coach comparison - FROM FILTERED SESSIONS
+        for trainer in session.get("trainers", []):
+            if trainer.strip():
+                coach_stats[trainer] = coach_stats.get(trainer, 0) + 1
+        
+        # Handle both old single player and new multiple players format
+        player_ids = session["player_ids"] if "player_ids" in session else ([session["player_id"]] if "player_id" in session else [])
+        for player_id in player_ids:
+            sessions_per_player[player_id] = sessions_per_player.get(player_id, 0) + 1
     
     # Monthly evolution (last 12 months) - SORTED CHRONOLOGICALLY
-    import calendar as cal
-    
     monthly_stats = []
     current_date = datetime.now()
     
     # Go back 12 months and collect data chronologically
     for i in range(11, -1, -1):  # 11 months ago to current month
         target_date = current_date - timedelta(days=30*i)  # Approximate month calculation
-        month_key = f"{target_date.year}-{target_date.month:02d}"
         month_name = f"{cal.month_name[target_date.month]} {target_date.year}"
-        
-        # Count sessions for this month FROM FILTERED SESSIONS
-        session_count = 0
-        for session in processed_sessions:
-            session_date_str = session.get("session_date")
-            if isinstance(session_date_str, str):
-                try:
-                    session_date = datetime.fromisoformat(session_date_str)
-                    if session_date.year == target_date.year and session_date.month == target_date.month:
-                        session_count += 1
-                except:
-                    continue
+        session_count = sessions_by_month.get((target_date.year, target_date.month), 0)
         
         if session_count > 0:  # Only include months with data
             monthly_stats.append({
@@ -2234,22 +4112,6 @@ async def get_dashboard_analytics(current_user: User = Depends(get_current_user)
     # Convert to dict to maintain compatibility
     monthly_evolution = {item["month"]: item["count"] for item in monthly_stats}
     
-    # Theme progression - FROM FILTERED SESSIONS
-    theme_stats = {}
-    for session in processed_sessions:
-        themes = session.get("themes", [])
-        for theme in themes:
-            if theme.strip():
-                theme_stats[theme] = theme_stats.get(theme, 0) + 1
-    
-    # Coach comparison - FROM FILTERED SESSIONS
-    coach_stats = {}
-    for session in processed_sessions:
-        trainers = session.get("trainers", [])
-        for trainer in trainers:
-            if trainer.strip():
-                coach_stats[trainer] = coach_stats.get(trainer, 0) + 1
-    
     # Player activity analysis - FROM FILTERED SESSIONS ONLY
     player_activity = {}
     
@@ -2259,54 +4121,26 @@ async def get_dashboard_analytics(current_user: User = Depends(get_current_user)
         player_activity[player_name] = 0
     
     # Count actual sessions for each player FROM FILTERED SESSIONS
-    for session in processed_sessions:
-        player_ids = session.get("player_ids", [])
-        for player_id in player_ids:
-            player_name = player_lookup.get(player_id, "Unknown")
-            if player_name in player_activity:
-                player_activity[player_name] += 1
+    for player_id, count in sessions_per_player.items():
+        player_name = player_lookup.get(player_id, "Unknown")
+        if player_name in player_activity:
+            player_activity[player_name] += count
     
     # Sort players by activity (least active first for alerts)
     sorted_players = sorted(player_activity.items(), key=lambda x: x[1])
     least_active_players = sorted_players[:5] if len(sorted_players) >= 5 else sorted_players
     
-    # Inactive players alert (no sessions in last 5 days) - USE ALL SESSIONS FOR THIS ALERT
-    inactive_players = []
-    end_date = datetime.now()
-    start_date_alert = end_date - timedelta(days=5)
-    
-    for player in players:
-        player_id = player["id"]
-        player_name = f"{player['first_name']} {player['last_name']}"
-        
-        # Check if player has sessions in last 5 days (use ALL sessions, not filtered)
-        has_recent_session = False
-        for session in all_processed_sessions:  # Use all sessions for inactivity alert
-            session_date_str = session.get("session_date")
-            if isinstance(session_date_str, str):
-                try:
-                    session_date = datetime.fromisoformat(session_date_str)
-                    if start_date_alert <= session_date <= end_date:
-                        player_ids = session.get("player_ids", [])
-                        if "player_id" in session:  # Old format
-                            player_ids = [session["player_id"]]
-                        if player_id in player_ids:
-                            has_recent_session = True
-                            break
-                except:
-                    continue
-        
-        if not has_recent_session:
-            inactive_players.append(player_name)
+    inactive_players = [
+        f"{player['first_name']} {player['last_name']}" for player in players if player["id"] not in recently_active
+    ]
     
     # Theme imbalance detection - FROM FILTERED SESSIONS
     theme_imbalances = []
     if theme_stats:
-        total_sessions = sum(theme_stats.values())
-        avg_per_theme = total_sessions / len(theme_stats)
+        total_theme_sessions = sum(theme_stats.values())
         
         for theme, count in theme_stats.items():
-            percentage = (count / total_sessions) * 100 if total_sessions > 0 else 0
+            percentage = (count / total_theme_sessions) * 100 if total_theme_sessions > 0 else 0
             if percentage < 5:  # Less than 5% is considered underworked
                 theme_imbalances.append({
                     "theme": theme,
@@ -2321,45 +4155,29 @@ async def get_dashboard_analytics(current_user: User = Depends(get_current_user)
         "least_active_players": least_active_players,
         "monthly_evolution": monthly_evolution,
         "total_players": len(players),
-        "total_sessions": len(processed_sessions),  # Now filtered
-        "average_sessions_per_player": round(len(processed_sessions) / len(players), 1) if len(players) > 0 else 0,
+        "total_sessions": total_sessions,  # Now filtered
+        "average_sessions_per_player": round(total_sessions / len(players), 1) if len(players) > 0 else 0,
         "inactive_players": inactive_players,
         "theme_imbalances": theme_imbalances,
         "period_days": days
     }
 
 @api_router.get("/analytics/heatmap")
-async def get_heatmap_data(current_user: User = Depends(get_current_user), days: int = 30):
-    from datetime import datetime, timedelta
-    import calendar as cal
-    
+async def get_heatmap_data(current_user: User = Depends(get_current_user), database = Depends(get_database), days: int = 30):
     # Get sessions from the last X days
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days)
     
-    sessions = await database.sessions.find().to_list(1000)
-    
-    # Convert sessions to consistent format and filter by date
-    processed_sessions = []
-    for session in sessions:
-        # Handle both old and new format
-        if "themes" not in session:
-            session["themes"] = [session.get("content", "")] if session.get("content") else []
-            session["trainers"] = [session.get("trainer", "")] if session.get("trainer") else []
-            session["content_details"] = session.get("results", "")
-        
-        if "player_id" in session and "player_ids" not in session:
-            session["player_ids"] = [session["player_id"]]
-        
-        # Filter by date
-        session_date_str = session.get("session_date")
-        if isinstance(session_date_str, str):
-            try:
-                session_date = datetime.fromisoformat(session_date_str)
-                if start_date <= session_date <= end_date:
-                    processed_sessions.append(session)
-            except:
-                continue
+    # Séances de la période seulement (pré-filtre sur la chaîne ISO), lues en flux : un compteur par jour
+    sessions_per_day = {}
+    total_sessions = 0
+    async for session in database.sessions.find(
+        {"session_date": {"$gte": start_date.date().isoformat()}}, {"_id": 0, "session_date": 1}
+    ):
+        session_date = parse_session_date(session)
+        if session_date and start_date <= session_date <= end_date:
+            total_sessions += 1
+            sessions_per_day[session["session_date"]] = sessions_per_day.get(session["session_date"], 0) + 1
     
     # Create heatmap data - count sessions per day
     heatmap_data = {}
@@ -2367,10 +4185,9 @@ async def get_heatmap_data(current_user: User = Depends(get_current_user), days:
     
     while current_date <= end_date:
         date_str = current_date.strftime("%Y-%m-%d")
-        day_sessions = [s for s in processed_sessions if s.get("session_date") == date_str]
         
         # Calculate intensity (number of sessions)
-        intensity = len(day_sessions)
+        intensity = sessions_per_day.get(date_str, 0)
         
         heatmap_data[date_str] = {
             "date": date_str,
@@ -2389,132 +4206,591 @@ async def get_heatmap_data(current_user: User = Depends(get_current_user), days:
         "start_date": start_date.strftime("%Y-%m-%d"),
         "end_date": end_date.strftime("%Y-%m-%d"),
         "total_days": days,
-        "total_sessions": len(processed_sessions)
+        "total_sessions": total_sessions
     }
 
-# Include the router in the main app
-app.include_router(api_router)
+# Pas d'include_router : les routes de api_router sont ajoutées à l'application domaine
+# par domaine, au premier appel (LazyRoutesMiddleware)
+
+# --- Index MongoDB ---
+# Spécification déclarative : collection -> [(clés, options)].
+# Toute modification change l'empreinte stockée dans schema_meta, ce qui relance
+# la création des index au prochain démarrage ; sinon l'étape est entièrement sautée.
+INDEX_SPEC = {
+    "users": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("email", ASCENDING)], {"unique": True}),
+    ],
+    "players": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("position", ASCENDING)], {}),
+        ([("team", ASCENDING)], {}),
+        # Pagination par curseur : (clé de tri, id)
+        ([("created_at", ASCENDING), ("id", ASCENDING)], {}),
+        # Détection des doublons à l'import (non unique : homonymes possibles en base)
+        ([("last_name", ASCENDING), ("first_name", ASCENDING), ("date_of_birth", ASCENDING)], {}),
+    ],
+    "coaches": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("slug", ASCENDING)], {}),
+        # Résolution d'un nom d'entraîneur (nom complet, prénom ou nom normalisés)
+        ([("name_keys", ASCENDING)], {}),
+    ],
+    "sessions": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("player_ids", ASCENDING), ("session_date", DESCENDING), ("id", DESCENDING)], {}),
+        ([("session_date", DESCENDING), ("id", DESCENDING)], {}),
+        ([("trainers", ASCENDING)], {}),
+        # Rapport coach : séances par identifiant de coach, filtrées par date
+        ([("trainer_ids", ASCENDING), ("session_date", DESCENDING)], {}),
+        # Rattachement d'un nouveau coach aux séances qui le citent (noms normalisés)
+        ([("trainer_keys", ASCENDING)], {}),
+    ],
+    "evaluations": [
+        ([("id", ASCENDING)], {"unique": True}),
+        # Une seule évaluation par joueur et par type ("initial" / "final")
+        ([("player_id", ASCENDING), ("evaluation_type", ASCENDING)], {"unique": True}),
+        ([("player_id", ASCENDING), ("evaluation_date", DESCENDING), ("id", DESCENDING)], {}),
+        ([("evaluation_date", DESCENDING), ("id", DESCENDING)], {}),
+        # Dernière évaluation d'un type donné par joueur ($sort + $group $first)
+        ([("evaluation_type", ASCENDING), ("player_id", ASCENDING), ("evaluation_date", DESCENDING)], {}),
+    ],
+    "collective_sessions": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("session_date", DESCENDING), ("id", DESCENDING)], {}),
+        ([("session_type", ASCENDING), ("session_date", DESCENDING), ("id", DESCENDING)], {}),
+    ],
+    "attendances": [
+        ([("id", ASCENDING)], {"unique": True}),
+        # Une seule présence par joueur et par séance collective
+        ([("collective_session_id", ASCENDING), ("player_id", ASCENDING)], {"unique": True}),
+        ([("collective_session_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], {}),
+        ([("player_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], {}),
+    ],
+    "matches": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("team", ASCENDING), ("match_date", DESCENDING), ("id", DESCENDING)], {}),
+        ([("match_date", DESCENDING), ("id", DESCENDING)], {}),
+    ],
+    "match_participations": [
+        ([("id", ASCENDING)], {"unique": True}),
+        # Une seule participation par joueur et par match
+        ([("match_id", ASCENDING), ("player_id", ASCENDING)], {"unique": True}),
+        ([("match_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], {}),
+        ([("player_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], {}),
+    ],
+    "exercise_categories": [
+        ([("id", ASCENDING)], {"unique": True}),
+    ],
+    # evaluation_rollups : lectures par _id uniquement, pas d'index supplémentaire
+    "cascade_jobs": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("status", ASCENDING)], {}),
+    ],
+    "exercises": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("category", ASCENDING)], {}),
+        ([("positions", ASCENDING)], {}),
+        # Recherche plein texte (un seul index texte par collection) ; les poids règlent le classement
+        ([("name", "text"), ("objective", "text"), ("key_instructions", "text"), ("steps", "text"), ("variants", "text")],
+         {"name": "exercises_text", "default_language": "french",
+          "weights": {"name": 10, "objective": 5, "key_instructions": 3, "steps": 2, "variants": 1}}),
+    ],
+}
+
+# Index créés par d'anciennes versions et devenus inutiles
+# (attendances.session_id n'a jamais existé : les requêtes utilisent collective_session_id ;
+# les autres sont remplacés par leur version suffixée par id, pour la pagination par curseur)
+OBSOLETE_INDEXES = {
+    "attendances": ["session_id_1", "player_id_1"],
+    "sessions": ["player_ids_1", "session_date_-1"],
+    "evaluations": ["player_id_1_evaluation_date_-1", "evaluation_date_-1"],
+    "collective_sessions": ["session_date_-1", "session_type_1_session_date_-1"],
+    "matches": ["team_1_match_date_-1", "match_date_-1"],
+    "match_participations": ["player_id_1"],
+}
+
+INDEX_CONFLICT_CODES = (85, 86)  # IndexOptionsConflict, IndexKeySpecsConflict
+DUPLICATE_KEY_CODE = 11000  # E11000 : valeur déjà présente dans un index unique
+
+def index_spec_hash() -> str:
+    spec = {
+        "indexes": {name: [[keys, options] for keys, options in specs] for name, specs in INDEX_SPEC.items()},
+        "obsolete": OBSOLETE_INDEXES,
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+
+async def _replace_conflicting_indexes(collection, models) -> bool:
+    """Crée les index un par un : ceux dont une ancienne version (ex. "id_1" non unique) existe
+    sont recréés, et un index unique bloqué par des doublons n'empêche pas les autres."""
+    ok = True
+    existing = await collection.index_information()
+    for model in models:
+        document = model.document
+        keys = list(document["key"].items())
+        try:
+            await collection.create_indexes([model])
+            continue
+        except OperationFailure as e:
+            if e.code == DUPLICATE_KEY_CODE:
+                # Les doublons sont supprimés par la migration dedupe_natural_keys ; nouvel essai au prochain démarrage
+                logger.error("Index unique %s.%s impossible : doublons en base (%s)", collection.name, document["name"], e)
+                ok = False
+                continue
+            if e.code not in INDEX_CONFLICT_CODES:
+                logger.error("Index %s.%s impossible à créer: %s", collection.name, document["name"], e)
+                ok = False
+                continue
+        for name, info in existing.items():
+            if name != "_id_" and (name == document["name"] or list(info["key"]) == keys):
+                await collection.drop_index(name)
+        try:
+            await collection.create_indexes([model])
+            logger.info("Index %s.%s recréé", collection.name, document["name"])
+        except OperationFailure as e:
+            logger.error("Index %s.%s impossible à recréer: %s", collection.name, document["name"], e)
+            ok = False
+    return ok
+
+async def _ensure_collection_indexes(database, collection_name: str, specs) -> bool:
+    collection = database[collection_name]
+    models = [IndexModel(keys, **options) for keys, options in specs]
+    try:
+        # Un seul aller-retour par collection
+        await collection.create_indexes(models)
+        ok = True
+    except OperationFailure as e:
+        # createIndexes est tout ou rien : sur conflit ou doublons, on reprend index par index
+        if e.code not in INDEX_CONFLICT_CODES + (DUPLICATE_KEY_CODE,):
+            logger.error("Index de %s impossibles à créer: %s", collection_name, e)
+            return False
+        ok = await _replace_conflicting_indexes(collection, models)
+
+    for name in OBSOLETE_INDEXES.get(collection_name, []):
+        try:
+            await collection.drop_index(name)
+            logger.info("Index obsolète %s.%s supprimé", collection_name, name)
+        except OperationFailure:
+            pass  # déjà absent
+    return ok
+
+async def ensure_indexes(database) -> bool:
+    """Applique INDEX_SPEC si son empreinte a changé. Retourne True si des index ont été (re)créés."""
+    spec_hash = index_spec_hash()
+    meta = await database.schema_meta.find_one({"_id": "indexes"})
+    if meta and meta.get("hash") == spec_hash:
+        return False
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        _ensure_collection_indexes(database, name, specs) for name, specs in INDEX_SPEC.items()
+    ])
+    if all(results):
+        # On ne mémorise l'empreinte que si tout est passé, pour réessayer sinon
+        await database.schema_meta.update_one(
+            {"_id": "indexes"},
+            {"$set": {"hash": spec_hash, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        logger.info("Index MongoDB créés/vérifiés en %.0f ms", (time.perf_counter() - started) * 1000)
+    else:
+        logger.warning("Certains index MongoDB n'ont pas pu être créés, nouvel essai au prochain démarrage")
+    return True
+
+# --- Migrations de données ---
+# Chaque étape s'exécute une seule fois (version enregistrée dans schema_migrations),
+# sous un verrou partagé pour que deux instances ne la lancent pas en même temps.
+# Au démarrage, une fois tout appliqué, il ne reste qu'une lecture de la version.
+MIGRATION_BATCH_SIZE = int(os.environ.get('MIGRATION_BATCH_SIZE', '500'))
+MIGRATION_LOCK_SECONDS = int(os.environ.get('MIGRATION_LOCK_SECONDS', '300'))
+
+async def migrate_in_batches(collection, query: dict, update: dict, label: str) -> int:
+    """Applique `update` aux documents correspondant à `query`, par lots, avec suivi de progression.
+    L'update doit faire sortir les documents de `query` (sinon seul le premier lot est traité)."""
+    total = 0
+    while True:
+        ids = [doc["_id"] async for doc in collection.find(query, {"_id": 1}).limit(MIGRATION_BATCH_SIZE)]
+        if not ids:
+            break
+        result = await collection.update_many({**query, "_id": {"$in": ids}}, update)
+        total += result.modified_count
+        logger.info("Migration %s : %d documents traités", label, total)
+        if result.modified_count == 0:
+            break
+    return total
+
+async def _migration_seed_admin_user(database):
+    admin_user = await database.users.find_one({"role": "admin"}, {"_id": 1})
+    if admin_user:
+        return
+    admin_password_hash = await hash_password_async("admin123")
+    await database.users.insert_one({
+        "id": str(uuid.uuid4()),
+        "email": "admin@staderochelais.com",
+        "password_hash": admin_password_hash,
+        "role": "admin",
+        "first_name": "Admin",
+        "last_name": "Stade Rochelais",
+        "must_change_password": False,
+        "created_at": datetime.utcnow(),
+        "last_login": None,
+    })
+    logger.info("Admin user created: admin@staderochelais.com / admin123")
+
+async def _migration_seed_default_coaches(database):
+    if await database.coaches.count_documents({}, limit=1):
+        return
+    default_coaches = [
+        {
+            "id": str(uuid.uuid4()),
+            "first_name": first_name,
+            "last_name": "",
+            "photo": None,
+            "created_at": datetime.utcnow(),
+        }
+        for first_name in ["Léo", "J-E", "David", "Mike", "Loan"]
+    ]
+    await database.coaches.insert_many(default_coaches)
+    logger.info("Coaches initialisés avec succès")
+
+async def _migration_seed_exercise_categories(database):
+    # Catégories de départ, librement modifiables ensuite
+    if await database.exercise_categories.count_documents({}, limit=1):
+        return
+    default_category_names = [
+        "Warm-Up", "Défense", "Tir", "Finition", "Dribble",
+        "Passe", "Physique", "Pré-collectif", "Collectif"
+    ]
+    default_categories = [
+        {"id": str(uuid.uuid4()), "name": name, "created_at": datetime.utcnow()}
+        for name in default_category_names
+    ]
+    await database.exercise_categories.insert_many(default_categories)
+    logger.info("Catégories d'exercices initialisées avec succès")
+
+async def _migration_rename_screen_theme(database):
+    await migrate_in_batches(
+        database.sessions,
+        {"themes": "Écran et remise"},
+        {"$set": {"themes.$": "Écran et lecture"}},
+        "renommage du thème 'Écran et remise'"
+    )
+
+async def _extract_inline_images(database, collection, field: str):
+    """Images base64 stockées dans les documents -> GridFS, par lots."""
+    id_field = MEDIA_FIELDS[field]
+    total = 0
+    while True:
+        batch = await collection.find(
+            {field: {"$regex": "^data:"}}, {"_id": 1, field: 1}
+        ).limit(MIGRATION_BATCH_SIZE).to_list(MIGRATION_BATCH_SIZE)
+        if not batch:
+            break
+        for doc in batch:
+            try:
+                data, content_type = decode_data_url(doc[field])
+                media_id = await store_image(database, data, content_type)
+            except HTTPException:
+                logger.warning("Image illisible ignorée (%s %s)", collection.name, doc["_id"])
+                await collection.update_one({"_id": doc["_id"]}, {"$set": {field: None}})
+                continue
+            await collection.update_one(
+                {"_id": doc["_id"]}, {"$set": {field: None, id_field: media_id}}
+            )
+        total += len(batch)
+        logger.info("Migration %s.%s : %d documents traités", collection.name, field, total)
+
+async def _migration_extract_inline_photos(database):
+    for collection in (database.players, database.coaches):
+        await _extract_inline_images(database, collection, "photo")
+
+async def _migration_extract_inline_diagrams(database):
+    await _extract_inline_images(database, database.exercises, "diagram")
+
+async def _migration_coach_identity(database):
+    # slug / name_keys des coachs, puis trainer_ids des séances existantes
+    while True:
+        batch = await database.coaches.find(
+            {"name_keys": {"$exists": False}}, {"_id": 1, "first_name": 1, "last_name": 1}
+        ).limit(MIGRATION_BATCH_SIZE).to_list(MIGRATION_BATCH_SIZE)
+        if not batch:
+            break
+        await database.coaches.bulk_write([
+            UpdateOne({"_id": coach["_id"]}, {"$set": coach_identity(coach.get("first_name"), coach.get("last_name"))})
+            for coach in batch
+        ], ordered=False)
+    coaches = await database.coaches.find({}, {"_id": 0, "id": 1, "slug": 1, "name_keys": 1}).to_list(None)
+    total = 0
+    while True:
+        batch = await database.sessions.find(
+            {"trainer_ids": {"$exists": False}}, {"_id": 1, "trainers": 1, "trainer": 1}
+        ).limit(MIGRATION_BATCH_SIZE).to_list(MIGRATION_BATCH_SIZE)
+        if not batch:
+            break
+        await database.sessions.bulk_write([
+            # Ancien format : un seul champ `trainer`
+            UpdateOne({"_id": session["_id"]}, {"$set": {"trainer_ids": match_trainer_ids(
+                coaches, session.get("trainers") or ([session["trainer"]] if session.get("trainer") else [])
+            )}})
+            for session in batch
+        ], ordered=False)
+        total += len(batch)
+        logger.info("Migration sessions.trainer_ids : %d documents traités", total)
+
+async def _migration_session_trainer_keys(database):
+    # Noms d'entraîneurs normalisés des séances existantes (rattachement des coachs créés ensuite)
+    total = 0
+    while True:
+        batch = await database.sessions.find(
+            {"trainer_keys": {"$exists": False}}, {"_id": 1, "trainers": 1, "trainer": 1}
+        ).limit(MIGRATION_BATCH_SIZE).to_list(MIGRATION_BATCH_SIZE)
+        if not batch:
+            break
+        await database.sessions.bulk_write([
+            # Ancien format : un seul champ `trainer`
+            UpdateOne({"_id": session["_id"]}, {"$set": {"trainer_keys": trainer_keys(
+                session.get("trainers") or ([session["trainer"]] if session.get("trainer") else [])
+            )}})
+            for session in batch
+        ], ordered=False)
+        total += len(batch)
+        logger.info("Migration sessions.trainer_keys : %d documents traités", total)
+
+# Listes paginées par (created_at, id) : un curseur construit sur un document sans created_at
+# vaudrait None et la page suivante serait vide
+CREATED_AT_COLLECTIONS = ("players", "attendances", "match_participations")
+
+async def _migration_backfill_created_at(database):
+    # Date de création reprise de l'ObjectId (horodatage d'insertion), à défaut l'epoch
+    for collection_name in CREATED_AT_COLLECTIONS:
+        collection = database[collection_name]
+        total = 0
+        while True:
+            batch = await collection.find(
+                {"created_at": None}, {"_id": 1}
+            ).limit(MIGRATION_BATCH_SIZE).to_list(MIGRATION_BATCH_SIZE)
+            if not batch:
+                break
+            await collection.bulk_write([
+                UpdateOne({"_id": doc["_id"]}, {"$set": {"created_at": (
+                    doc["_id"].generation_time.replace(tzinfo=None) if hasattr(doc["_id"], "generation_time") else datetime(1970, 1, 1)
+                )}})
+                for doc in batch
+            ], ordered=False)
+            total += len(batch)
+            logger.info("Migration %s.created_at : %d documents traités", collection_name, total)
+
+async def _migration_compact_evaluations(database):
+    # Ancien format (themes complets) -> template_id + scores / theme_scores
+    total = 0
+    while True:
+        batch = await database.evaluations.find(
+            {"template_id": {"$exists": False}}, {"_id": 1, "themes": 1}
+        ).limit(MIGRATION_BATCH_SIZE).to_list(MIGRATION_BATCH_SIZE)
+        if not batch:
+            break
+        operations = []
+        for evaluation in batch:
+            themes = evaluation.get("themes") or []
+            operations.append(UpdateOne({"_id": evaluation["_id"]}, {
+                "$set": {"template_id": await ensure_evaluation_template(database, themes), **encode_evaluation_scores(themes)},
+                "$unset": {"themes": ""},
+            }))
+        await database.evaluations.bulk_write(operations, ordered=False)
+        total += len(batch)
+        logger.info("Migration evaluations (format compact) : %d documents traités", total)
+
+# Clés naturelles protégées par un index unique (voir INDEX_SPEC) et champ de date du document à garder
+NATURAL_KEYS = {
+    "evaluations": (("player_id", "evaluation_type"), "evaluation_date"),
+    "attendances": (("collective_session_id", "player_id"), "created_at"),
+    "match_participations": (("match_id", "player_id"), "created_at"),
+}
+
+async def _migration_dedupe_natural_keys(database):
+    # Doublons créés par l'ancien find_one -> insert_one sous écritures concurrentes :
+    # ils empêchent la création des index uniques. On garde le plus récent de chaque clé
+    # (à date égale ou absente, le dernier inséré) et on archive les autres dans
+    # <collection>_duplicates avant de les supprimer.
+    # Évaluations sans type (anciennes versions) : "initial", la valeur déjà utilisée à la lecture
+    await migrate_in_batches(
+        database.evaluations, {"evaluation_type": None}, {"$set": {"evaluation_type": "initial"}}, "evaluations (type par défaut)"
+    )
+    removed_evaluations = 0
+    for collection_name, (fields, date_field) in NATURAL_KEYS.items():
+        collection = database[collection_name]
+        archive = database[f"{collection_name}_duplicates"]
+        removed = 0
+        async for group in collection.aggregate([
+            {"$sort": {date_field: DESCENDING, "_id": DESCENDING}},
+            {"$group": {"_id": {field: f"${field}" for field in fields}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+        ], allowDiskUse=True):
+            kept, duplicate_ids = group["ids"][0], group["ids"][1:]
+            duplicates = await collection.find({"_id": {"$in": duplicate_ids}}).to_list(None)
+            archived_at = datetime.utcnow()
+            # Upsert : une reprise après interruption ne réarchive pas deux fois le même document
+            await archive.bulk_write([
+                ReplaceOne({"_id": doc["_id"]}, {**doc, "duplicate_of": kept, "archived_at": archived_at}, upsert=True)
+                for doc in duplicates
+            ], ordered=False)
+            result = await collection.delete_many({"_id": {"$in": duplicate_ids}})
+            removed += result.deleted_count
+            logger.info(
+                "Migration %s : clé %s, conservé %s, archivés puis supprimés %s", collection_name, group["_id"], kept,
+                [f"{doc['_id']} (id {doc.get('id')})" for doc in duplicates]
+            )
+        if removed:
+            logger.info("Migration %s : %d doublons archivés dans %s_duplicates", collection_name, removed, collection_name)
+        if collection_name == "evaluations":
+            removed_evaluations = removed
+    if removed_evaluations:
+        await rebuild_evaluation_rollups(database)
+
+async def _migration_render_media_renditions(database):
+    # Images déjà dans GridFS en version d'origine seulement (envoyées avant les déclinaisons)
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        logger.warning("Pillow absent : les images d'origine restent servies pour toutes les tailles")
+        return
+    import gridfs
+    files = database[f"{MEDIA_BUCKET}.files"]
+    async for original in files.find({"_id": {"$not": {"$regex": ":"}}}, {"_id": 1}):
+        media_id = original["_id"]
+        if await files.find_one({"_id": f"{media_id}:full"}, {"_id": 1}):
+            continue
+        # Une image illisible ne doit pas bloquer les migrations suivantes : on la saute
+        try:
+            media = await read_media(database, media_id, "full")
+        except gridfs.errors.GridFSError as e:  # chunks manquants ou corrompus
+            logger.warning("Image ignorée, contenu GridFS illisible (media %s): %s", media_id, e)
+            continue
+        if media is None:
+            logger.warning("Image ignorée, fichier GridFS introuvable (media %s)", media_id)
+            continue
+        try:
+            renditions = await asyncio.get_running_loop().run_in_executor(None, render_renditions, media[0])
+        except HTTPException:
+            logger.warning("Image illisible ignorée (media %s)", media_id)
+            continue
+        except Exception as e:  # erreurs du décodeur non prévues par render_renditions
+            logger.warning("Image ignorée, échec des déclinaisons (media %s): %s", media_id, e)
+            continue
+        for size, rendition in renditions.items():
+            await _upload_media(database, f"{media_id}:{size}", rendition, "image/webp")
+
+# (version, nom, étape) — n'ajouter qu'à la fin, ne jamais renuméroter
+MIGRATIONS = [
+    (1, "seed_admin_user", _migration_seed_admin_user),
+    (2, "seed_default_coaches", _migration_seed_default_coaches),
+    (3, "seed_default_exercise_categories", _migration_seed_exercise_categories),
+    (4, "rename_screen_and_roll_theme", _migration_rename_screen_theme),
+    (5, "extract_inline_photos", _migration_extract_inline_photos),
+    (6, "extract_inline_diagrams", _migration_extract_inline_diagrams),
+    (7, "render_media_renditions", _migration_render_media_renditions),
+    (8, "coach_identity", _migration_coach_identity),
+    (9, "build_evaluation_rollups", rebuild_evaluation_rollups),
+    (10, "compact_evaluations", _migration_compact_evaluations),
+    (11, "dedupe_natural_keys", _migration_dedupe_natural_keys),
+    (12, "session_trainer_keys", _migration_session_trainer_keys),
+    (13, "backfill_created_at", _migration_backfill_created_at),
+    # Agrégats écrits avant l'échappement des clés : un thème contenant "." y était éclaté
+    (14, "rebuild_rollups_escaped_keys", rebuild_evaluation_rollups),
+]
 
-# Startup event to initialize coaches, update themes and create admin user
+async def _acquire_migration_lock(database, owner: str) -> bool:
+    now = datetime.utcnow()
+    try:
+        # Si le verrou est détenu et non expiré, le filtre ne correspond pas et
+        # l'upsert échoue sur le _id déjà existant.
+        await database.schema_migrations.find_one_and_update(
+            {"_id": "lock", "$or": [{"expires_at": {"$lt": now}}, {"owner": owner}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=MIGRATION_LOCK_SECONDS)}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+async def _schema_version(database) -> int:
+    state = await database.schema_migrations.find_one({"_id": "state"}, {"version": 1})
+    return state.get("version", 0) if state else 0
+
+async def run_migrations(database) -> int:
+    """Applique les migrations en attente et retourne la version du schéma."""
+    latest_version = MIGRATIONS[-1][0]
+    current_version = await _schema_version(database)
+    if current_version >= latest_version:
+        return current_version
+
+    owner = str(uuid.uuid4())
+    if not await _acquire_migration_lock(database, owner):
+        logger.info("Migrations déjà en cours sur une autre instance")
+        return current_version
+    try:
+        # Relecture sous verrou : une autre instance a pu terminer entre-temps
+        current_version = await _schema_version(database)
+        initial_version = current_version
+        for version, name, step in MIGRATIONS:
+            if version <= current_version:
+                continue
+            logger.info("Migration %d (%s) : début", version, name)
+            started = time.perf_counter()
+            await step(database)
+            duration_ms = round((time.perf_counter() - started) * 1000)
+            await database.schema_migrations.update_one(
+                {"_id": "state"},
+                {
+                    "$set": {"version": version, "updated_at": datetime.utcnow()},
+                    "$push": {"applied": {
+                        "version": version,
+                        "name": name,
+                        "applied_at": datetime.utcnow(),
+                        "duration_ms": duration_ms,
+                    }},
+                },
+                upsert=True
+            )
+            current_version = version
+            logger.info("Migration %d (%s) : terminée en %d ms", version, name, duration_ms)
+            # Prolonge le verrou pour l'étape suivante
+            await _acquire_migration_lock(database, owner)
+        if current_version > initial_version:
+            # Les migrations écrivent directement dans les collections : invalide les ETag des listes
+            await bump_collection_version(database, *VERSIONED_COLLECTIONS)
+    finally:
+        await database.schema_migrations.delete_one({"_id": "lock", "owner": owner})
+    return current_version
+
+# Startup event: warm the pool, apply pending migrations and indexes
 @app.on_event("startup")
 async def initialize_data():
     database = _get_mongo_client()[DB_NAME]
     try:
         logger.info("Startup: ENV=%s DB_NAME=%s", ENVIRONMENT, os.environ.get("DB_NAME"))
 
-        # Index sur les champs "id" (uuid) et champs de recherche fréquents.
-        # Accélère fortement les recherches (find_one/find par id, par joueur, etc.)
-        # au lieu d'un parcours complet de chaque collection.
         try:
-            await database.players.create_index("id")
-            await database.coaches.create_index("id")
-            await database.users.create_index("id")
-            await database.users.create_index("email")
-            await database.sessions.create_index("id")
-            await database.sessions.create_index("player_ids")
-            await database.sessions.create_index("session_date")
-            await database.evaluations.create_index("id")
-            await database.evaluations.create_index("player_id")
-            await database.collective_sessions.create_index("id")
-            await database.attendances.create_index("id")
-            await database.attendances.create_index("player_id")
-            await database.attendances.create_index("session_id")
-            await database.matches.create_index("id")
-            await database.match_participations.create_index("id")
-            await database.match_participations.create_index("player_id")
-            await database.match_participations.create_index("match_id")
-            await database.exercise_categories.create_index("id")
-            await database.exercises.create_index("id")
-            await database.exercises.create_index("category")
-            logger.info("Index MongoDB vérifiés/créés avec succès")
+            await warm_mongo_pool()
         except Exception as e:
-            logger.error("Erreur lors de la création des index: %s", e)
-
-        # Check if admin user exists
-        admin_user = await database.users.find_one({"role": "admin"})
-        if not admin_user:
-            admin_password_hash = hash_password("admin123")
-            admin_user_data = {
-                "id": str(uuid.uuid4()),
-                "email": "admin@staderochelais.com",
-                "password_hash": admin_password_hash,
-                "role": "admin",
-                "first_name": "Admin",
-                "last_name": "Stade Rochelais",
-                "must_change_password": False,
-                "created_at": datetime.utcnow(),
-                "last_login": None,
-            }
-            await database.users.insert_one(admin_user_data)
-            logger.info("Admin user created: admin@staderochelais.com / admin123")
-
-        # Check if coaches already exist
-        existing_coaches = await database.coaches.count_documents({})
-        if existing_coaches == 0:
-            default_coaches = [
-                {
-                    "id": str(uuid.uuid4()),
-                    "first_name": "Léo",
-                    "last_name": "",
-                    "photo": None,
-                    "created_at": datetime.utcnow(),
-                },
-                {
-                    "id": str(uuid.uuid4()),
-                    "first_name": "J-E",
-                    "last_name": "",
-                    "photo": None,
-                    "created_at": datetime.utcnow(),
-                },
-                {
-                    "id": str(uuid.uuid4()),
-                    "first_name": "David",
-                    "last_name": "",
-                    "photo": None,
-                    "created_at": datetime.utcnow(),
-                },
-                {
-                    "id": str(uuid.uuid4()),
-                    "first_name": "Mike",
-                    "last_name": "",
-                    "photo": None,
-                    "created_at": datetime.utcnow(),
-                },
-                {
-                    "id": str(uuid.uuid4()),
-                    "first_name": "Loan",
-                    "last_name": "",
-                    "photo": None,
-                    "created_at": datetime.utcnow(),
-                },
-            ]
+            logger.error("Erreur lors du préchauffage du pool Mongo: %s", e)
 
-            await database.coaches.insert_many(default_coaches)
-            logger.info("Coaches initialisés avec succès")
+        # Migrations avant les index : dedupe_natural_keys supprime les doublons qui
+        # empêcheraient la création des index uniques sur les clés naturelles
+        try:
+            await run_migrations(database)
+        except Exception as e:
+            logger.error("Erreur lors des migrations: %s", e)
 
-        # Check if exercise categories already exist (catégories de départ, librement modifiables ensuite)
-        existing_categories = await database.exercise_categories.count_documents({})
-        if existing_categories == 0:
-            default_category_names = [
-                "Warm-Up", "Défense", "Tir", "Finition", "Dribble",
-                "Passe", "Physique", "Pré-collectif", "Collectif"
-            ]
-            default_categories = [
-                {"id": str(uuid.uuid4()), "name": name, "created_at": datetime.utcnow()}
-                for name in default_category_names
-            ]
-            await database.exercise_categories.insert_many(default_categories)
-            logger.info("Catégories d'exercices initialisées avec succès")
+        try:
+            await ensure_indexes(database)
+        except Exception as e:
+            logger.error("Erreur lors de la création des index: %s", e)
 
-        # Update theme names in existing sessions
         try:
-            await database.sessions.update_many(
-                {"themes": {"$in": ["Écran et remise"]}},
-                {"$set": {"themes.$": "Écran et lecture"}}
-            )
-            logger.info("Thèmes mis à jour avec succès")
+            await resume_cascade_jobs(database)
         except Exception as e:
-            logger.error("Erreur lors de la mise à jour des thèmes: %s", e)
+            logger.error("Erreur lors de la reprise des suppressions en cascade: %s", e)
 
     except Exception as e:
         logger.error("Erreur lors de l'initialisation au démarrage: %s", e)
@@ -2537,4 +4813,10 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    global _mongo_client, _mongo_client_loop
+    if _mongo_client is not None:
+        _mongo_client.close()
+        _mongo_client, _mongo_client_loop = None, None
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False)
     logger.info("Shutdown complete")
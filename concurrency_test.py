@@ -0,0 +1,246 @@
+import requests
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from dotenv import load_dotenv
+
+# Load environment variables from frontend/.env
+load_dotenv('/app/frontend/.env')
+
+# Get the backend URL from environment variables
+BACKEND_URL = os.environ.get('REACT_APP_BACKEND_URL')
+API_URL = f"{BACKEND_URL}/api"
+
+print(f"Testing concurrent upserts at: {API_URL}")
+
+# Authentication data
+auth_data = {
+    "email": "admin@staderochelais.com",
+    "password": "admin123"
+}
+
+# Authentication token
+auth_token = None
+
+# Number of simultaneous writes on the same natural key
+PARALLEL_WRITES = int(os.environ.get("PARALLEL_WRITES", "20"))
+
+# Created during the tests, removed by test_cleanup
+player_id = None
+session_id = None
+match_id = None
+
+test_player = {
+    "first_name": "Concurrence",
+    "last_name": "Test",
+    "date_of_birth": "2007-03-12",
+    "position": "Meneur",
+    "team": "U18"
+}
+
+test_collective_session = {
+    "session_type": "U18",
+    "session_date": date.today().isoformat(),
+    "session_time": "18:00",
+    "location": "Gymnase Gaston Neveur",
+    "coach": "Léo"
+}
+
+test_match = {
+    "team": "U18",
+    "opponent": "Basket Club Rochelais",
+    "match_date": date.today().isoformat(),
+    "match_time": "15:00",
+    "location": "Gymnase Gaston Neveur",
+    "is_home": True
+}
+
+# Helper functions
+def print_separator():
+    print("\n" + "="*80 + "\n")
+
+def print_response(response):
+    print(f"Status Code: {response.status_code}")
+    try:
+        print(f"Response: {json.dumps(response.json(), indent=2)}")
+    except:
+        print(f"Response: {response.text}")
+
+def run_test(test_func):
+    print_separator()
+    print(f"Running test: {test_func.__name__}")
+    try:
+        result = test_func()
+        print(f"Test {test_func.__name__} {'PASSED' if result else 'FAILED'}")
+        return result
+    except Exception as e:
+        print(f"Test {test_func.__name__} FAILED with exception: {str(e)}")
+        return False
+
+def auth_headers():
+    return {"Authorization": f"Bearer {auth_token}"}
+
+def fire_in_parallel(path, payloads):
+    """POST every payload at once, each from its own HTTP session."""
+    def post(payload):
+        with requests.Session() as session:
+            return session.post(f"{API_URL}{path}", json=payload, headers=auth_headers())
+    with ThreadPoolExecutor(max_workers=len(payloads)) as pool:
+        responses = list(pool.map(post, payloads))
+    statuses = [response.status_code for response in responses]
+    print(f"{len(payloads)} parallel POST {path}: statuses {sorted(set(statuses))}")
+    return responses
+
+def check_single_document(responses, documents, label):
+    ids = {response.json()["id"] for response in responses if response.status_code == 200}
+    print(f"{label}: {len(ids)} distinct id(s) returned, {len(documents)} document(s) stored")
+    return all(response.status_code == 200 for response in responses) and len(ids) == 1 and len(documents) == 1
+
+def recompute_averages(evaluations, evaluation_type):
+    """Same rule as the backend (averages_from_totals): mean of the non-zero theme averages."""
+    totals, counts, total_evaluations = {}, {}, 0
+    for evaluation in evaluations:
+        if (evaluation.get("evaluation_type") or "initial") != evaluation_type:
+            continue
+        total_evaluations += 1
+        for theme in evaluation.get("themes", []):
+            score = theme.get("average_score") or 0
+            if score > 0:
+                totals[theme["name"]] = totals.get(theme["name"], 0) + score
+                counts[theme["name"]] = counts.get(theme["name"], 0) + 1
+    total_count = sum(counts.values())
+    return {
+        "theme_averages": {name: round(totals[name] / counts[name], 2) for name in totals},
+        "overall_average": round(sum(totals.values()) / total_count, 2) if total_count > 0 else 0,
+        "total_evaluations": total_evaluations,
+    }
+
+def test_login():
+    print("Logging in...")
+    response = requests.post(f"{API_URL}/auth/login", json=auth_data)
+    print_response(response)
+
+    if response.status_code != 200:
+        return False
+
+    global auth_token
+    auth_token = response.json()['token']
+    return auth_token is not None and len(auth_token) > 0
+
+def test_create_fixtures():
+    global player_id, session_id, match_id
+    response = requests.post(f"{API_URL}/players", json=test_player, headers=auth_headers())
+    print_response(response)
+    if response.status_code != 200:
+        return False
+    player_id = response.json()["id"]
+
+    response = requests.post(f"{API_URL}/collective-sessions", json=test_collective_session, headers=auth_headers())
+    print_response(response)
+    if response.status_code != 200:
+        return False
+    session_id = response.json()["id"]
+
+    response = requests.post(f"{API_URL}/matches", json=test_match, headers=auth_headers())
+    print_response(response)
+    if response.status_code != 200:
+        return False
+    match_id = response.json()["id"]
+    return True
+
+def test_parallel_evaluations():
+    # Several coaches saving the same player's evaluation at the same time
+    payloads = [{
+        "player_id": player_id,
+        "evaluation_type": "initial",
+        "themes": [{"name": "ADRESSE", "aspects": [{"name": "Tir en course", "score": i % 5 + 1}]}],
+        "notes": f"Écriture {i}"
+    } for i in range(PARALLEL_WRITES)]
+    responses = fire_in_parallel("/evaluations", payloads)
+
+    response = requests.get(f"{API_URL}/evaluations/player/{player_id}", headers=auth_headers())
+    documents = [e for e in response.json() if e["evaluation_type"] == "initial"]
+    if not check_single_document(responses, documents, "Evaluations"):
+        return False
+
+    # Club averages are served from evaluation_rollups, which every save updates incrementally:
+    # whatever the interleaving, they must match a recomputation from the stored evaluations
+    response = requests.get(f"{API_URL}/evaluations/averages/all", params={"evaluation_type": "initial"}, headers=auth_headers())
+    print_response(response)
+    if response.status_code != 200:
+        return False
+    from_rollups = response.json()
+
+    response = requests.get(f"{API_URL}/evaluations", headers=auth_headers())
+    if response.status_code != 200:
+        return False
+    recomputed = recompute_averages(response.json(), "initial")
+    print(f"Recomputed from raw evaluations: {json.dumps(recomputed, indent=2)}")
+    return from_rollups == recomputed
+
+def test_parallel_attendances():
+    payloads = [{
+        "collective_session_id": session_id,
+        "player_id": player_id,
+        "status": "present" if i % 2 else "absent"
+    } for i in range(PARALLEL_WRITES)]
+    responses = fire_in_parallel("/attendances", payloads)
+
+    response = requests.get(f"{API_URL}/attendances/session/{session_id}", headers=auth_headers())
+    documents = [a for a in response.json() if a["player_id"] == player_id]
+    return check_single_document(responses, documents, "Attendances")
+
+def test_parallel_match_participations():
+    payloads = [{
+        "match_id": match_id,
+        "player_id": player_id,
+        "is_present": True,
+        "is_starter": i % 2 == 0,
+        "play_time": i
+    } for i in range(PARALLEL_WRITES)]
+    responses = fire_in_parallel("/match-participations", payloads)
+
+    response = requests.get(f"{API_URL}/match-participations/match/{match_id}", headers=auth_headers())
+    documents = [p for p in response.json() if p["participation"]["player_id"] == player_id]
+    return check_single_document(responses, documents, "Match participations")
+
+def test_cleanup():
+    ok = True
+    for path, target_id in (("matches", match_id), ("collective-sessions", session_id), ("players", player_id)):
+        if target_id:
+            response = requests.delete(f"{API_URL}/{path}/{target_id}", headers=auth_headers())
+            print(f"DELETE /{path}/{target_id}: {response.status_code}")
+            ok = ok and response.status_code in (200, 202)
+    return ok
+
+def run_all_tests():
+    tests = [
+        test_login,
+        test_create_fixtures,
+        test_parallel_evaluations,
+        test_parallel_attendances,
+        test_parallel_match_participations,
+        test_cleanup
+    ]
+
+    results = []
+    for test in tests:
+        results.append(run_test(test))
+
+    print_separator()
+    print("Test Summary:")
+    for i, test in enumerate(tests):
+        print(f"{test.__name__}: {'PASSED' if results[i] else 'FAILED'}")
+
+    print_separator()
+    print(f"Total Tests: {len(tests)}")
+    print(f"Passed: {results.count(True)}")
+    print(f"Failed: {results.count(False)}")
+
+    return all(results)
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -2313,7 +2313,7 @@ const SessionsList = () => {
 
   const fetchPlayers = async () => {
     try {
-      const response = await axios.get(`${API}/players`);
+      const response = await axios.get(`${API}/players?fields=summary`);
       setPlayers(response.data);
     } catch (error) {
       console.error('Erreur lors du chargement des joueurs:', error);
@@ -2322,7 +2322,7 @@ const SessionsList = () => {
 
   const fetchExercises = async () => {
     try {
-      const response = await axios.get(`${API}/exercises`);
+      const response = await axios.get(`${API}/exercises?fields=summary`);
       setExercises(response.data);
     } catch (error) {
       console.error('Erreur lors du chargement des exercices:', error);
@@ -2695,7 +2695,7 @@ const Reports = () => {
 
   const fetchPlayers = async () => {
     try {
-      const response = await axios.get(`${API}/players`);
+      const response = await axios.get(`${API}/players?fields=summary`);
       setPlayers(response.data);
     } catch (error) {
       console.error('Erreur lors du chargement des joueurs:', error);
@@ -3255,7 +3255,7 @@ const CalendarView = () => {
 
   const fetchPlayers = async () => {
     try {
-      const response = await axios.get(`${API}/players`);
+      const response = await axios.get(`${API}/players?fields=summary`);
       setPlayers(response.data);
     } catch (error) {
       console.error('Erreur lors du chargement des joueurs:', error);
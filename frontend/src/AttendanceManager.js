@@ -57,7 +57,7 @@ const AttendanceManager = () => {
 
   const fetchPlayers = async () => {
     try {
-      const response = await axios.get(`${API}/players`);
+      const response = await axios.get(`${API}/players?fields=summary`);
       setPlayers(response.data);
     } catch (error) {
       console.error('Erreur lors du chargement des joueurs:', error);
@@ -66,7 +66,7 @@ const AttendanceManager = () => {
 
   const fetchExercises = async () => {
     try {
-      const response = await axios.get(`${API}/exercises`);
+      const response = await axios.get(`${API}/exercises?fields=summary`);
       setExercises(response.data);
     } catch (error) {
       console.error('Erreur lors du chargement des exercices:', error);
@@ -113,7 +113,7 @@ const EvaluationManager = () => {
 
   const fetchPlayers = async () => {
     try {
-      const response = await axios.get(`${API}/players`);
+      const response = await axios.get(`${API}/players?fields=summary`);
       setPlayers(response.data);
     } catch (error) {
       console.error('Erreur lors du chargement des joueurs:', error);
@@ -193,74 +193,60 @@ const EvaluationManager = () => {
     try {
       // Au lieu de créer une évaluation par joueur avec un seul thème,
       // on va mettre à jour ou créer une évaluation complète avec ce thème
+      const evaluationType = isInitialEvaluation ? 'initial' : 'final';
       
-      const savePromises = players.map(async (player) => {
-        if (!evaluationData[player.id]) return;
-        
-        try {
-          // D'abord, récupérer l'évaluation existante de ce type pour ce joueur
-          let existingEvaluation = null;
-          try {
-            const response = await axios.get(`${API}/evaluations/player/${player.id}`);
-            const playerEvaluations = response.data;
-            existingEvaluation = playerEvaluations.find(e => e.evaluation_type === (isInitialEvaluation ? 'initial' : 'final'));
-          } catch (error) {
-            // Pas d'évaluation existante, on va en créer une nouvelle
-          }
+      // D'abord, récupérer en une requête l'évaluation existante de ce type pour chaque joueur
+      let existingByPlayer = {};
+      try {
+        const response = await axios.get(`${API}/evaluations/latest/all`, { params: { evaluation_type: evaluationType } });
+        existingByPlayer = response.data;
+      } catch (error) {
+        // Pas d'évaluation existante, on va en créer de nouvelles
+      }
+      
+      const evaluationPayloads = players
+        .filter(player => evaluationData[player.id])
+        .map(player => {
+          const existingEvaluation = existingByPlayer[player.id];
+          const newThemeData = {
+            name: selectedTheme.name,
+            aspects: selectedTheme.aspects.map(aspect => ({
+              name: aspect,
+              score: evaluationData[player.id][aspect] || 3
+            }))
+          };
           
           let allThemes = [];
           
           if (existingEvaluation && existingEvaluation.themes) {
-            // Commencer avec les thèmes existants
+            // Commencer avec les thèmes existants, remplacer ou ajouter le thème actuel
             allThemes = [...existingEvaluation.themes];
-            
-            // Remplacer ou ajouter le thème actuel
             const themeIndex = allThemes.findIndex(t => t.name === selectedTheme.name);
-            
-            const newThemeData = {
-              name: selectedTheme.name,
-              aspects: selectedTheme.aspects.map(aspect => ({
-                name: aspect,
-                score: evaluationData[player.id][aspect] || 3
-              }))
-            };
-            
             if (themeIndex >= 0) {
-              // Remplacer le thème existant
               allThemes[themeIndex] = newThemeData;
             } else {
-              // Ajouter le nouveau thème
               allThemes.push(newThemeData);
             }
           } else {
             // Nouvelle évaluation, commencer avec juste ce thème
-            allThemes = [{
-              name: selectedTheme.name,
-              aspects: selectedTheme.aspects.map(aspect => ({
-                name: aspect,
-                score: evaluationData[player.id][aspect] || 3
-              }))
-            }];
+            allThemes = [newThemeData];
           }
           
           // Créer l'évaluation complète avec tous les thèmes
-          const evaluationPayload = {
+          return {
             player_id: player.id,
             themes: allThemes,
             notes: `Évaluation ${isInitialEvaluation ? 'initiale' : 'finale'} - Mise à jour du thème ${selectedTheme.name}`,
-            evaluation_type: isInitialEvaluation ? 'initial' : 'final'
+            evaluation_type: evaluationType
           };
-          
-          return axios.post(`${API}/evaluations`, evaluationPayload);
-          
-        } catch (error) {
-          console.error(`Erreur pour le joueur ${player.first_name} ${player.last_name}:`, error);
-          return null;
-        }
-      });
+        });
       
-      const results = await Promise.all(savePromises);
-      const successCount = results.filter(r => r && r.status === 200).length;
+      // Un seul appel pour tout le groupe (résultat détaillé joueur par joueur)
+      const response = await axios.post(`${API}/evaluations/batch`, { evaluations: evaluationPayloads });
+      response.data.results
+        .filter(result => result.status === 'error')
+        .forEach(result => console.error(`Erreur pour le joueur ${result.player_id}:`, result.error));
+      const successCount = response.data.saved;
       
       setConfirmationMessage(`✅ Évaluations sauvegardées pour le thème ${selectedTheme.name} (${successCount}/${players.length} joueurs)`);
       setShowConfirmation(true);
@@ -6,6 +6,15 @@ const API = `${BACKEND_URL}/api`;
 
 const POSITIONS = ['Arrière', 'Ailier', 'Intérieur'];
 
+// Les schémas sont servis en plusieurs tailles (paramètre `size` de l'URL) :
+// la liste reçoit la miniature, le détail affiche la grande taille.
+const diagramSize = (url, size) => {
+  if (!url || url.startsWith('data:')) return url;
+  const parsed = new URL(url);
+  parsed.searchParams.set('size', size);
+  return parsed.toString();
+};
+
 const emptyExerciseForm = {
   name: '',
   category: '',
@@ -27,6 +36,8 @@ const ExerciseLibrary = () => {
   const [exercises, setExercises] = useState([]);
   const [selectedCategory, setSelectedCategory] = useState('all'); // 'all' ou nom de catégorie
   const [selectedPosition, setSelectedPosition] = useState('all'); // 'all' ou 'Arrière'/'Ailier'/'Intérieur'
+  const [searchQuery, setSearchQuery] = useState('');
+  const [searchResults, setSearchResults] = useState(null); // null = pas de recherche en cours
   const [loading, setLoading] = useState(false);
 
   const [showExerciseForm, setShowExerciseForm] = useState(false);
@@ -44,6 +55,24 @@ const ExerciseLibrary = () => {
     fetchExercises();
   }, []);
 
+  // Recherche plein texte côté serveur (index texte français : accents ignorés, résultats classés)
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (!query) {
+      setSearchResults(null);
+      return undefined;
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const response = await axios.get(`${API}/exercises/search`, { params: { q: query, limit: 200 } });
+        setSearchResults(response.data);
+      } catch (error) {
+        console.error('Erreur lors de la recherche d\'exercices:', error);
+      }
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [searchQuery, exercises]);
+
   const fetchCategories = async () => {
     try {
       const response = await axios.get(`${API}/exercise-categories`);
@@ -238,7 +267,7 @@ const ExerciseLibrary = () => {
     }
   };
 
-  const filteredExercises = exercises.filter(ex => {
+  const filteredExercises = (searchResults ?? exercises).filter(ex => {
     const matchesCategory = selectedCategory === 'all' || ex.category === selectedCategory;
     const matchesPosition = selectedPosition === 'all' || (ex.positions || []).includes(selectedPosition);
     return matchesCategory && matchesPosition;
@@ -347,6 +376,15 @@ const ExerciseLibrary = () => {
 
         {/* Liste des exercices */}
         <div className="lg:col-span-3">
+          {/* Recherche */}
+          <input
+            type="search"
+            value={searchQuery}
+            onChange={(e) => setSearchQuery(e.target.value)}
+            placeholder="Rechercher un exercice (nom, objectif, consignes...)"
+            className="w-full bg-white rounded-2xl shadow-lg p-4 mb-4 focus:outline-none focus:ring-2 focus:ring-blue-500"
+          />
+
           {/* Filtre par poste */}
           <div className="bg-white rounded-2xl shadow-lg p-4 mb-4 flex items-center flex-wrap gap-2">
             <span className="text-sm font-medium text-gray-600 mr-1">Poste :</span>
@@ -460,7 +498,7 @@ const ExerciseLibrary = () => {
             </div>
 
             {selectedExercise.diagram && (
-              <img src={selectedExercise.diagram} alt="Schéma de l'exercice" className="w-full rounded-xl mb-4 border border-gray-200" />
+              <img src={diagramSize(selectedExercise.diagram, 'full')} alt="Schéma de l'exercice" className="w-full rounded-xl mb-4 border border-gray-200" />
             )}
 
             <div className="space-y-3">
@@ -661,7 +699,7 @@ const ExerciseLibrary = () => {
                 <label className="block text-sm font-medium text-gray-700 mb-1">Schéma (image)</label>
                 <input type="file" accept="image/*" onChange={handleDiagramChange} className="w-full text-sm" />
                 {exerciseForm.diagram && (
-                  <img src={exerciseForm.diagram} alt="Aperçu du schéma" className="mt-2 max-h-40 rounded-xl border border-gray-200" />
+                  <img src={diagramSize(exerciseForm.diagram, 'card')} alt="Aperçu du schéma" className="mt-2 max-h-40 rounded-xl border border-gray-200" />
                 )}
               </div>
 
@@ -48,7 +48,7 @@ const MatchManager = () => {
 
   const fetchPlayers = async () => {
     try {
-      const response = await axios.get(`${API}/players`);
+      const response = await axios.get(`${API}/players?fields=summary`);
       setPlayers(response.data);
     } catch (error) {
       console.error('Erreur lors du chargement des joueurs:', error);
@@ -142,7 +142,7 @@ const ReportsWithEvaluation = () => {
 
   const fetchPlayers = async () => {
     try {
-      const response = await axios.get(`${API}/players`);
+      const response = await axios.get(`${API}/players?fields=summary`);
       setPlayers(response.data);
     } catch (error) {
       console.error('Erreur lors du chargement des joueurs:', error);
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Login storm benchmark.
+
+Fires a burst of concurrent logins (a whole staff connecting on a match
+morning) while probing /api/health in parallel, then prints login
+throughput and the latency of the health probes. With bcrypt running off
+the event loop the probes should stay in the low milliseconds even while
+logins are queued.
+
+Usage: python scripts/benchmark_login_storm.py --logins 50 --concurrency 25
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from dotenv import load_dotenv
+
+# Load environment variables from frontend/.env
+load_dotenv('/app/frontend/.env')
+
+# Get the backend URL from environment variables
+BACKEND_URL = os.environ.get('REACT_APP_BACKEND_URL')
+API_URL = f"{BACKEND_URL}/api"
+
+# Authentication data
+auth_data = {
+    "email": os.environ.get("BENCH_EMAIL", "admin@staderochelais.com"),
+    "password": os.environ.get("BENCH_PASSWORD", "admin123")
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def login_once(session):
+    start = time.perf_counter()
+    response = session.post(f"{API_URL}/auth/login", json=auth_data)
+    return response.status_code, time.perf_counter() - start
+
+
+def probe_health(stop_event, latencies):
+    session = requests.Session()
+    while not stop_event.is_set():
+        start = time.perf_counter()
+        session.get(f"{API_URL}/health")
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.05)
+
+
+def fetch_stats(token):
+    response = requests.get(f"{API_URL}/admin/stats", headers={"Authorization": f"Bearer {token}"})
+    if response.status_code == 200:
+        return response.json().get("password_hashing")
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50, help="total number of logins")
+    parser.add_argument("--concurrency", type=int, default=25, help="parallel login clients")
+    args = parser.parse_args()
+
+    print(f"🔐 Login storm against {API_URL}: {args.logins} logins, {args.concurrency} in parallel")
+
+    # Baseline health latency, without any login in flight
+    baseline = []
+    stop = threading.Event()
+    prober = threading.Thread(target=probe_health, args=(stop, baseline))
+    prober.start()
+    time.sleep(1)
+    stop.set()
+    prober.join()
+
+    # Health latency during the storm
+    during = []
+    stop = threading.Event()
+    prober = threading.Thread(target=probe_health, args=(stop, during))
+    prober.start()
+
+    sessions = [requests.Session() for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda i: login_once(sessions[i % args.concurrency]), range(args.logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    prober.join()
+
+    ok = [duration for status, duration in results if status == 200]
+    failed = len(results) - len(ok)
+
+    print("\n📊 Results")
+    print(f"   - Successful logins: {len(ok)} ({failed} failed)")
+    print(f"   - Throughput: {len(ok) / elapsed:.1f} logins/s over {elapsed:.2f}s")
+    if ok:
+        print(f"   - Login latency p50/p95: {statistics.median(ok) * 1000:.0f} / {percentile(ok, 95) * 1000:.0f} ms")
+    if baseline:
+        print(f"   - /health p50 idle: {statistics.median(baseline) * 1000:.1f} ms")
+    if during:
+        print(f"   - /health p50/p95/max during storm: {statistics.median(during) * 1000:.1f} / "
+              f"{percentile(during, 95) * 1000:.1f} / {max(during) * 1000:.1f} ms")
+
+    token_response = requests.post(f"{API_URL}/auth/login", json=auth_data)
+    if token_response.status_code == 200:
+        stats = fetch_stats(token_response.json()["token"])
+        if stats:
+            print(f"   - Hash pool: {stats['max_workers']} workers, peak queue depth {stats['peak_queue_depth']}")
+
+
+if __name__ == "__main__":
+    main()
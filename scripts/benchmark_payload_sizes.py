@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Payload size benchmark for list endpoints.
+
+Fetches each list endpoint with full documents and with ?fields=summary,
+and prints the response size (raw and gzip-compressed) and latency of both,
+so the gain of the lightweight views can be measured on real data.
+
+Usage: python scripts/benchmark_payload_sizes.py --repeat 5
+"""
+import argparse
+import gzip
+import os
+import statistics
+import time
+
+import requests
+from dotenv import load_dotenv
+
+# Load environment variables from frontend/.env
+load_dotenv('/app/frontend/.env')
+
+# Get the backend URL from environment variables
+BACKEND_URL = os.environ.get('REACT_APP_BACKEND_URL')
+API_URL = f"{BACKEND_URL}/api"
+
+# Authentication data
+auth_data = {
+    "email": os.environ.get("BENCH_EMAIL", "admin@staderochelais.com"),
+    "password": os.environ.get("BENCH_PASSWORD", "admin123")
+}
+
+ENDPOINTS = ["/players", "/exercises", "/sessions", "/matches"]
+
+
+def measure(session, path, repeat):
+    durations = []
+    body = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        # identity : on mesure la taille réelle du JSON, la compression est calculée à part
+        response = session.get(f"{API_URL}{path}", headers={"Accept-Encoding": "identity"})
+        durations.append(time.perf_counter() - start)
+        response.raise_for_status()
+        body = response.content
+    return len(body), len(gzip.compress(body)), statistics.median(durations), len(response.json())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="requests per endpoint and variant")
+    parser.add_argument("--fields", default="summary", help="value passed to ?fields= (default: summary)")
+    args = parser.parse_args()
+
+    session = requests.Session()
+    response = session.post(f"{API_URL}/auth/login", json=auth_data)
+    if response.status_code != 200:
+        print(f"Login failed: {response.status_code}")
+        return
+    session.headers["Authorization"] = f"Bearer {response.json()['token']}"
+
+    print(f"📦 Payload sizes against {API_URL} (full vs ?fields={args.fields})\n")
+    print(f"{'endpoint':<12} {'items':>6} {'full':>10} {'sparse':>10} {'gzip full':>10} {'gzip sparse':>12} "
+          f"{'p50 full':>9} {'p50 sparse':>11}")
+    for path in ENDPOINTS:
+        full = measure(session, path, args.repeat)
+        sparse = measure(session, f"{path}?fields={args.fields}", args.repeat)
+        print(f"{path:<12} {full[3]:>6} {full[0] / 1024:>8.1f}kB {sparse[0] / 1024:>8.1f}kB "
+              f"{full[1] / 1024:>8.1f}kB {sparse[1] / 1024:>10.1f}kB "
+              f"{full[2] * 1000:>7.0f}ms {sparse[2] * 1000:>9.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
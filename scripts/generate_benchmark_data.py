@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""Scalable benchmark data generator.
+
+Writes players, individual sessions, collective sessions with attendance,
+matches with participations and initial/final evaluations straight into
+MongoDB with `insert_many`, in the same storage format as the API (ISO date
+strings, compact evaluations referencing an evaluation template, evaluation
+rollups kept in step). The same --seed always yields the same dataset, so
+runs at 1x, 10x and 100x the club's size are comparable.
+
+Usage:
+    python scripts/generate_benchmark_data.py --scale 10 --drop
+    python scripts/generate_benchmark_data.py --players 40 --seasons 3 --seed 7
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# Load environment variables from backend/.env
+load_dotenv(BACKEND_DIR / ".env")
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Helpers de stockage partagés avec l'API, pour écrire exactement le même format
+import server  # noqa: E402
+
+FIRST_NAMES = ["Antoine", "Romain", "Damian", "Thomas", "Grégory", "Dylan", "Cameron", "Paul", "Cyril",
+               "Julien", "Mohamed", "Arthur", "Gabin", "Melvyn", "Matthieu", "Louis", "Hugo", "Nathan",
+               "Enzo", "Théo", "Lucas", "Mathis", "Noah", "Ethan"]
+LAST_NAMES = ["Dupont", "Ntamack", "Penaud", "Ramos", "Alldritt", "Cretin", "Woki", "Willemse", "Baille",
+              "Marchand", "Haouas", "Vincent", "Villière", "Jaminet", "Jalibert", "Martin", "Bernard",
+              "Petit", "Durand", "Leroy", "Moreau", "Fournier", "Girard", "Lambert"]
+POSITIONS = ["Meneur", "Arrière", "Ailier", "Ailier Fort", "Pivot"]
+TEAMS = ["U18", "U21", "Pro"]
+COACHES = ["Léo", "J-E", "David", "Mike", "Loan"]
+
+SESSION_THEMES = ["Physique", "Défense porteur", "Défense non-porteur", "Rebond", "Près du cercle",
+                  "Dextérité", "Passe", "Vidéo", "Tir extérieur", "Finitions", "Écran et lecture", "1v1"]
+COLLECTIVE_TYPES = ["U18", "U21", "CDF", "Musculation"]
+LOCATIONS = ["Gymnase Gaston Neveur", "Gymnase Michel Crépeau", "Salle de musculation"]
+ATTENDANCE_STATUSES = ["present", "absent", "injured", "off"]
+ATTENDANCE_WEIGHTS = [80, 10, 5, 5]
+OPPONENTS = ["Poitiers", "Niort", "Angers", "Tours", "Nantes", "Cholet", "Limoges", "Rouen"]
+
+COLLECTIONS = ["players", "sessions", "collective_sessions", "attendances", "matches",
+               "match_participations", "evaluations"]
+# Agrégats dérivés des évaluations : vidés avec elles, puis mis à jour par $inc
+DERIVED_COLLECTIONS = ["evaluation_rollups"]
+
+
+class Generator:
+    def __init__(self, seed, now):
+        self.rng = random.Random(seed)
+        self.now = now
+
+    def new_id(self):
+        # uuid4-shaped ids drawn from the seeded RNG, so reruns are reproducible
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def players(self, count):
+        players = []
+        for _ in range(count):
+            players.append({
+                "id": self.new_id(),
+                "first_name": self.rng.choice(FIRST_NAMES),
+                "last_name": self.rng.choice(LAST_NAMES),
+                "date_of_birth": (date(1995, 1, 1) + timedelta(days=self.rng.randrange(0, 365 * 12))).isoformat(),
+                "position": self.rng.choice(POSITIONS),
+                "team": self.rng.choice(TEAMS),
+                "coach_referent": self.rng.choice(COACHES),
+                "photo": None,
+                "created_at": self.now,
+                "objectives": None,
+                "work_axes": None,
+                "strengths_to_keep": None,
+                "stat_objectives": [],
+            })
+        return players
+
+    def season_days(self, season_start):
+        # Saison de septembre à juin
+        return [season_start + timedelta(days=offset) for offset in range(300)]
+
+    def individual_sessions(self, players, season_start, per_player):
+        player_ids = [p["id"] for p in players]
+        days = self.season_days(season_start)
+        sessions = []
+        for _ in range(len(players) * per_player // 2):
+            sessions.append({
+                "id": self.new_id(),
+                "player_ids": self.rng.sample(player_ids, k=min(len(player_ids), self.rng.choice([1, 1, 2, 3]))),
+                "session_date": self.rng.choice(days).isoformat(),
+                "themes": self.rng.sample(SESSION_THEMES, k=self.rng.randint(1, 3)),
+                "trainers": self.rng.sample(COACHES, k=self.rng.randint(1, 2)),
+                "content_details": "Séance générée pour le benchmark",
+                "notes": None,
+                "exercise_ids": [],
+                "created_at": self.now,
+            })
+        return sessions
+
+    def collective_sessions(self, players, season_start, per_week):
+        by_team = {}
+        for player in players:
+            by_team.setdefault(player["team"], []).append(player["id"])
+
+        sessions, attendances = [], []
+        for week in range(43):
+            monday = season_start + timedelta(weeks=week)
+            for _ in range(per_week):
+                session_type = self.rng.choice(COLLECTIVE_TYPES)
+                session = {
+                    "id": self.new_id(),
+                    "session_type": session_type,
+                    "session_date": (monday + timedelta(days=self.rng.randrange(0, 5))).isoformat(),
+                    "session_time": self.rng.choice(["18:00", "19:00", "20:00"]),
+                    "location": self.rng.choice(LOCATIONS),
+                    "coach": self.rng.choice(COACHES),
+                    "notes": None,
+                    "exercise_ids": [],
+                    "created_at": self.now,
+                }
+                sessions.append(session)
+
+                roster = by_team.get(session_type) or [p["id"] for p in players]
+                for player_id in roster:
+                    attendances.append({
+                        "id": self.new_id(),
+                        "collective_session_id": session["id"],
+                        "player_id": player_id,
+                        "status": self.rng.choices(ATTENDANCE_STATUSES, weights=ATTENDANCE_WEIGHTS)[0],
+                        "notes": None,
+                        "created_at": self.now,
+                    })
+        return sessions, attendances
+
+    def matches(self, players, season_start, per_team):
+        matches, participations = [], []
+        for team in ["U18", "U21"]:
+            roster = [p["id"] for p in players if p["team"] == team]
+            for index in range(per_team):
+                match = {
+                    "id": self.new_id(),
+                    "team": team,
+                    "opponent": self.rng.choice(OPPONENTS),
+                    "match_date": (season_start + timedelta(days=6 + 7 * (index % 43))).isoformat(),
+                    "match_time": self.rng.choice(["15:00", "17:30", "20:00"]),
+                    "location": self.rng.choice(LOCATIONS[:2]),
+                    "is_home": self.rng.random() < 0.5,
+                    "competition": "Championnat",
+                    "final_score_us": self.rng.randint(50, 95),
+                    "final_score_opponent": self.rng.randint(50, 95),
+                    "coach": self.rng.choice(COACHES),
+                    "notes": None,
+                    "created_at": self.now,
+                }
+                matches.append(match)
+
+                squad = self.rng.sample(roster, k=min(len(roster), 12))
+                starters = set(squad[:5])
+                for player_id in squad:
+                    is_present = self.rng.random() < 0.9
+                    participations.append({
+                        "id": self.new_id(),
+                        "match_id": match["id"],
+                        "player_id": player_id,
+                        "is_present": is_present,
+                        "is_starter": player_id in starters,
+                        "play_time": self.rng.randint(0, 35) if is_present else None,
+                        "notes": None,
+                        "created_at": self.now,
+                    })
+        return matches, participations
+
+    def evaluation(self, player_id, evaluation_type, evaluation_date, evaluator_id):
+        # Même calcul que create_evaluation : "non_note" ne compte pas dans les moyennes.
+        # Forme de l'API (themes complets) ; compact_evaluation en tire le document stocké.
+        themes = []
+        total_score = 0
+        total_aspects = 0
+        # Grille actuelle (EVALUATION_THEMES de server.py, copie de celle de App.js)
+        for theme in server.EVALUATION_THEMES:
+            aspects = []
+            for aspect_name in theme["aspects"]:
+                score = "non_note" if self.rng.random() < 0.05 else self.rng.randint(1, 5)
+                aspects.append({"name": aspect_name, "score": score})
+            scores = [a["score"] for a in aspects if a["score"] != "non_note"]
+            themes.append({
+                "name": theme["name"],
+                "aspects": aspects,
+                "average_score": round(sum(scores) / len(scores), 2) if scores else 0,
+            })
+            total_score += sum(scores)
+            total_aspects += len(scores)
+
+        return {
+            "id": self.new_id(),
+            "player_id": player_id,
+            "evaluator_id": evaluator_id,
+            "evaluation_date": evaluation_date,
+            "evaluation_type": evaluation_type,
+            "themes": themes,
+            "overall_average": round(total_score / total_aspects, 2) if total_aspects else 0,
+            "notes": None,
+        }
+
+
+def compact_evaluation(evaluation, template_id):
+    """Document stocké par l'API : template_id + scores / theme_scores à la place de themes."""
+    document = {key: value for key, value in evaluation.items() if key != "themes"}
+    document["template_id"] = template_id
+    document.update(server.encode_evaluation_scores(evaluation["themes"]))
+    return document
+
+
+def rollup_operations(players, evaluations):
+    """$inc des agrégats (club, joueur, poste, équipe), fusionnés par agrégat comme le fait l'API."""
+    players_by_id = {player["id"]: player for player in players}
+    per_rollup = {}
+    for evaluation in evaluations:
+        player = players_by_id[evaluation["player_id"]]
+        position, team = server.rollup_scope(player)
+        increments = server.evaluation_increments(evaluation)
+        for rollup_id in server.rollup_ids(player["id"], position, team):
+            entry = per_rollup.setdefault(rollup_id, {"increments": {}, "set": {}})
+            entry["increments"] = server.merge_increments(entry["increments"], increments)
+            if rollup_id.startswith("player:"):
+                entry["set"] = {"position": position, "team": team}
+    now = datetime.utcnow()
+    return [
+        UpdateOne({"_id": rollup_id}, {"$inc": entry["increments"], "$set": {"updated_at": now, **entry["set"]}}, upsert=True)
+        for rollup_id, entry in per_rollup.items()
+    ]
+
+
+def insert_in_chunks(collection, documents, chunk_size):
+    for start in range(0, len(documents), chunk_size):
+        collection.insert_many(documents[start:start + chunk_size], ordered=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1, help="multiplier applied to --players (10 = 10x the club)")
+    parser.add_argument("--players", type=int, default=30, help="players at scale 1")
+    parser.add_argument("--seasons", type=int, default=1, help="number of seasons of history")
+    parser.add_argument("--sessions-per-player", type=int, default=20, help="individual sessions per player and season")
+    parser.add_argument("--collective-per-week", type=int, default=4, help="collective sessions per week")
+    parser.add_argument("--matches-per-team", type=int, default=22, help="matches per team and season")
+    parser.add_argument("--seed", type=int, default=42, help="random seed (same seed = same dataset)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="documents per insert_many")
+    parser.add_argument("--drop", action="store_true", help="empty the generated collections first")
+    args = parser.parse_args()
+
+    mongo_url = os.environ["MONGO_URL"]
+    db_name = os.environ["DB_NAME"]
+    database = MongoClient(mongo_url)[db_name]
+
+    player_count = args.players * args.scale
+    print(f"🏀 Generating data into {db_name}: {player_count} players, {args.seasons} season(s), seed {args.seed}")
+
+    if args.drop:
+        for name in COLLECTIONS + DERIVED_COLLECTIONS:
+            database[name].delete_many({})
+        print(f"   - Emptied {', '.join(COLLECTIONS + DERIVED_COLLECTIONS)}")
+
+    admin = database.users.find_one({"role": "admin"}, {"id": 1})
+    evaluator_id = admin["id"] if admin else "benchmark"
+
+    generator = Generator(args.seed, datetime(2024, 9, 1))
+    players = generator.players(player_count)
+    documents = {name: [] for name in COLLECTIONS}
+    documents["players"] = players
+
+    first_season = 2024 - args.seasons + 1
+    for year in range(first_season, 2025):
+        season_start = date(year, 9, 2)
+        documents["sessions"] += generator.individual_sessions(players, season_start, args.sessions_per_player)
+        sessions, attendances = generator.collective_sessions(players, season_start, args.collective_per_week)
+        documents["collective_sessions"] += sessions
+        documents["attendances"] += attendances
+        matches, participations = generator.matches(players, season_start, args.matches_per_team)
+        documents["matches"] += matches
+        documents["match_participations"] += participations
+
+    # trainer_ids / trainer_keys comme le ferait l'API (coachs créés par la migration seed_default_coaches)
+    coach_ids = {coach["first_name"]: coach["id"] for coach in database.coaches.find({"first_name": {"$in": COACHES}})}
+    for session in documents["sessions"]:
+        session["trainer_ids"] = [coach_ids[name] for name in session["trainers"] if name in coach_ids]
+        session["trainer_keys"] = server.trainer_keys(session["trainers"])
+
+    # Une évaluation initiale et une finale par joueur (saison en cours)
+    evaluations = []
+    for player in players:
+        evaluations.append(generator.evaluation(player["id"], "initial", datetime(2024, 9, 15), evaluator_id))
+        evaluations.append(generator.evaluation(player["id"], "final", datetime(2025, 6, 15), evaluator_id))
+    if evaluations:
+        # Même grille pour toutes : un seul modèle, créé s'il n'existe pas encore
+        structure = server.evaluation_template_structure(evaluations[0]["themes"])
+        template_id = server.evaluation_template_id(structure)
+        database.evaluation_templates.update_one(
+            {"_id": template_id}, {"$setOnInsert": {"themes": structure, "created_at": datetime.utcnow()}}, upsert=True
+        )
+        documents["evaluations"] = [compact_evaluation(evaluation, template_id) for evaluation in evaluations]
+
+    start = time.perf_counter()
+    for name in COLLECTIONS:
+        insert_in_chunks(database[name], documents[name], args.chunk_size)
+        print(f"   - {name}: {len(documents[name])}")
+    elapsed = time.perf_counter() - start
+
+    # Moyennes servies par evaluation_rollups : mises à jour comme le ferait chaque enregistrement
+    operations = rollup_operations(players, evaluations)
+    if operations:
+        database.evaluation_rollups.bulk_write(operations, ordered=False)
+    print(f"   - evaluation_rollups: {len(operations)} updated")
+
+    # Écritures hors API : invalide l'ETag de la liste des joueurs (cf. collection_versions)
+    database.collection_versions.update_one({"_id": "players"}, {"$inc": {"version": 1}}, upsert=True)
+
+    total = sum(len(docs) for docs in documents.values())
+    print(f"\n✅ Inserted {total} documents in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} docs/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Import-time report for the backend (serverless cold start).
+
+Imports backend/server.py in a fresh interpreter with `python -X importtime`
+and lists the slowest modules, so cold-start regressions can be tracked
+from one deploy to the next.
+
+Usage:
+    python scripts/import_time_report.py --top 25
+    python scripts/import_time_report.py --budget-ms 800   # exit 1 above budget
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+def measure(module):
+    env = dict(os.environ)
+    # server.py lit ces variables à l'import ; le client Mongo, lui, n'est créé
+    # qu'à la première requête, donc une URL factice suffit pour mesurer.
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "import_time_report")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        print(completed.stderr, file=sys.stderr)
+        raise SystemExit(f"Import of {module} failed")
+
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="server", help="module to import (default: server)")
+    parser.add_argument("--top", type=int, default=20, help="number of modules to list")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail if total import time exceeds this")
+    parser.add_argument("--json", action="store_true", help="print machine-readable output")
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    target = next(i for i, r in enumerate(rows) if r["module"] == args.module and r["depth"] == 0)
+    total_ms = rows[target]["cumulative_ms"]
+
+    # -X importtime affiche les dépendances avant le module qui les importe :
+    # les imports directs sont les lignes de profondeur 1 qui précèdent la cible.
+    first = target
+    while first > 0 and rows[first - 1]["depth"] > 0:
+        first -= 1
+    imported = rows[first:target + 1]
+    top_level = sorted((r for r in imported if r["depth"] == 1), key=lambda r: r["cumulative_ms"], reverse=True)
+    slowest_self = sorted(imported, key=lambda r: r["self_ms"], reverse=True)
+
+    if args.json:
+        print(json.dumps({
+            "module": args.module,
+            "total_ms": total_ms,
+            "top_level": top_level[:args.top],
+            "slowest_self": slowest_self[:args.top],
+        }, indent=2))
+    else:
+        print(f"⏱️  Import of '{args.module}': {total_ms:.1f} ms")
+        print("\nSlowest direct imports (cumulative):")
+        for row in top_level[:args.top]:
+            print(f"   {row['cumulative_ms']:8.1f} ms  {row['module']}")
+        print("\nSlowest modules (self time):")
+        for row in slowest_self[:args.top]:
+            print(f"   {row['self_ms']:8.1f} ms  {row['module']}")
+
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"\n❌ Import time {total_ms:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""Rebuild the evaluation rollups (club / position / team / player averages).
+
+The rollups are updated incrementally on every evaluation write; this
+recomputes them from the evaluations collection, to repair drift after
+direct database writes (imports, manual fixes). Same code
+path as POST /api/admin/evaluation-rollups/rebuild.
+
+Usage: python scripts/rebuild_evaluation_rollups.py
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# Load environment variables from backend/.env (MONGO_URL, DB_NAME)
+load_dotenv(BACKEND_DIR / ".env")
+sys.path.insert(0, str(BACKEND_DIR))
+
+import server  # noqa: E402
+
+
+async def main():
+    database = server._get_mongo_client()[server.DB_NAME]
+    result = await server.rebuild_evaluation_rollups(database)
+    print(f"✅ {result['rollups']} rollups rebuilt for {result['players']} players in {result['duration_ms']} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())